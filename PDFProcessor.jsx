@@ -3,6 +3,45 @@ import { FiUpload, FiFileText, FiBook, FiGlobe, FiLayers, FiBookOpen, FiUser, Fi
 import MermaidRenderer from './MermaidRenderer';
 import HandwrittenNotes from './HandwrittenNotes';
 
+// Reads a Server-Sent Events response from the /stream endpoints, calling
+// onText with the text assembled so far. Resolves with the final text.
+const readEventStream = async (response, onText) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let assembled = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const rawEvent of events) {
+      let eventName = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) eventName = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (!data) continue;
+
+      const eventData = JSON.parse(data);
+      if (eventName === 'delta') {
+        assembled += eventData.text;
+        onText(assembled);
+      } else if (eventName === 'done') {
+        assembled = eventData.text;
+        onText(assembled);
+      } else if (eventName === 'error') {
+        throw new Error(eventData.detail || 'Streaming failed');
+      }
+    }
+  }
+  return assembled;
+};
+
 const PDFProcessor = () => {
   const [mode, setMode] = useState('questions');
   const [text, setText] = useState('');
@@ -184,6 +223,7 @@ const PDFProcessor = () => {
     try {
       let endpoint = '';
       let payload = {};
+      let onStreamText = null;
 
       switch (mode) {
         case 'questions':
@@ -191,8 +231,9 @@ const PDFProcessor = () => {
           payload = { text: contentToProcess, difficulty, count: questionCount };
           break;
         case 'summary':
-          endpoint = `${API_BASE}/api/summarize`;
+          endpoint = `${API_BASE}/api/summarize/stream`;
           payload = { text: contentToProcess };
+          onStreamText = (summary) => setResult({ summary });
           break;
         case 'flashcards':
           endpoint = `${API_BASE}/api/generate-flashcards`;
@@ -203,8 +244,9 @@ const PDFProcessor = () => {
           payload = { text: contentToProcess };
           break;
         case 'humanize':
-          endpoint = `${API_BASE}/api/humanize-text`;
+          endpoint = `${API_BASE}/api/humanize-text/stream`;
           payload = { text: contentToProcess };
+          onStreamText = setHumanizedText;
           break;
         case 'mindmap':
           endpoint = `${API_BASE}/api/generate-mindmap`;
@@ -215,8 +257,9 @@ const PDFProcessor = () => {
           payload = { text: contentToProcess, diagram_type: diagramType };
           break;
         case 'handwritten':
-          endpoint = `${API_BASE}/api/generate-handwritten`;
+          endpoint = `${API_BASE}/api/generate-handwritten/stream`;
           payload = { text: contentToProcess, style: handwrittenStyle };
+          onStreamText = setHandwrittenText;
           break;
         default:
           setResult({ error: "Invalid mode selected." });
@@ -235,6 +278,15 @@ const PDFProcessor = () => {
         throw new Error(`API Error: ${response.status} - ${errorData.detail || 'Unknown error'}`);
       }
 
+      if (onStreamText) {
+        // Render tokens progressively as the summary/rewrite is generated
+        const finalText = await readEventStream(response, onStreamText);
+        if (!finalText.trim()) {
+          setResult({ error: `Failed to generate ${mode} output.` });
+        }
+        return;
+      }
+
       const data = await response.json();
 
       switch (mode) {
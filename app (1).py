@@ -1,6 +1,7 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List, Dict
+import asyncio
 import os
 import psutil
 import logging
@@ -8,6 +9,22 @@ import logging
 # Import the router and TOGETHER_MODEL from your pdf_processor.py file
 # Assuming pdf_processor.py is in the same directory as app.py
 from pdf_processor import router as pdf_processor_router, TOGETHER_MODEL
+from llm_client import get_http_client, close_http_client
+from llm_cache import llm_cache
+from singleflight import llm_singleflight
+from rate_limiter import llm_rate_limiter
+from resilience import llm_circuit_breaker, llm_latency
+from token_budget import budget_stats
+from extraction_pool import extraction_pool
+from extraction_cache import extraction_cache
+from ocr_service import ocr_pool, ocr_timings
+from url_fetch import close_fetch_client, url_fetch_stats
+from article_cache import article_cache
+from youtube_transcripts import youtube_stats
+from jwt_verify import token_verifier
+from usage_limiter import flush_reserved_usage
+from usage_reservations import usage_reservations
+from upload_ingest import UploadSizeLimitMiddleware, upload_request_limit, UPLOAD_BATCH_MAX_FILES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,6 +33,16 @@ logger = logging.getLogger(__name__)
 # Initialize FastAPI app
 app = FastAPI(title="NexNotes AI Backend API")
 
+# Reject oversized uploads while they stream in, before they are fully spooled.
+# Added before CORS so CORS wraps it and its early 413s carry CORS headers
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/upload-and-extract": upload_request_limit(),
+        "/api/upload-batch": upload_request_limit(max_files=UPLOAD_BATCH_MAX_FILES)
+    }
+)
+
 # Update CORS for frontend deployment (e.g., Vercel, local development)
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +61,56 @@ app.add_middleware(
 # This registers all endpoints defined in pdf_processor.py under the root path
 app.include_router(pdf_processor_router)
 
+# --- Shared LLM HTTP client lifecycle ---
+@app.on_event("startup")
+async def open_llm_client():
+    """Warm up the pooled Together AI client on the server's event loop"""
+    get_http_client()
+
+@app.on_event("shutdown")
+async def shutdown_llm_client():
+    """Drain keep-alive connections to Together AI"""
+    await close_http_client()
+
+# --- Web page fetch client lifecycle ---
+@app.on_event("shutdown")
+async def shutdown_fetch_client():
+    """Drain keep-alive connections to fetched sites"""
+    await close_fetch_client()
+
+# --- JWT signing key lifecycle ---
+@app.on_event("startup")
+async def start_token_verifier():
+    """Load Supabase's signing keys so access tokens verify locally from the first request"""
+    await token_verifier.start()
+
+@app.on_event("shutdown")
+async def stop_token_verifier():
+    await token_verifier.stop()
+
+# --- Usage write-behind lifecycle ---
+@app.on_event("startup")
+async def start_usage_write_behind():
+    """Periodically write usage counted against in-process reservations"""
+    if usage_reservations is not None:
+        await usage_reservations.start(flush_reserved_usage)
+
+@app.on_event("shutdown")
+async def stop_usage_write_behind():
+    if usage_reservations is not None:
+        await usage_reservations.stop()
+
+# --- Extraction worker pool lifecycle ---
+@app.on_event("startup")
+async def start_extraction_pool():
+    """Pre-warm document extraction and OCR workers so the first uploads don't pay process start-up"""
+    await asyncio.gather(extraction_pool.start(), ocr_pool.start())
+
+@app.on_event("shutdown")
+async def stop_extraction_pool():
+    extraction_pool.shutdown()
+    ocr_pool.shutdown()
+
 # --- Utility function to get memory usage (retained for health check) ---
 def get_memory_usage():
     """Get current memory usage"""
@@ -50,6 +127,20 @@ async def health_check():
         "status": "healthy",
         "memory_usage_mb": f"{memory_usage:.2f}",
         "active_ai_system": "Together AI (via pdf_processor)",
+        "llm_cache": llm_cache.stats() if llm_cache is not None else "disabled",
+        "llm_singleflight": llm_singleflight.stats(),
+        "llm_rate_limiter": llm_rate_limiter.stats(),
+        "llm_circuit_breaker": llm_circuit_breaker.stats(),
+        "llm_latency": llm_latency.stats(),
+        "llm_tokens": budget_stats(),
+        "extraction_pool": extraction_pool.stats(),
+        "extraction_cache": extraction_cache.stats() if extraction_cache is not None else "disabled",
+        "ocr": {"pool": ocr_pool.stats(), "stages": ocr_timings.stats()},
+        "url_fetch": url_fetch_stats(),
+        "article_cache": article_cache.stats() if article_cache is not None else "disabled",
+        "youtube_transcripts": youtube_stats(),
+        "auth": token_verifier.stats(),
+        "usage_write_behind": usage_reservations.stats() if usage_reservations is not None else "disabled",
         "message": "Backend is running and ready to process requests for summaries, questions, and flashcards."
     }
 
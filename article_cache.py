@@ -0,0 +1,82 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from two_tier_cache import TwoTierCache
+
+# --- Cache Configuration ---
+ARTICLE_CACHE_ENABLED = os.getenv("ARTICLE_CACHE_ENABLED", "1") == "1"
+ARTICLE_CACHE_DB_PATH = os.getenv("ARTICLE_CACHE_DB_PATH", "article_cache.sqlite3")
+ARTICLE_CACHE_MAX_ENTRIES = int(os.getenv("ARTICLE_CACHE_MAX_ENTRIES", "1024"))
+ARTICLE_CACHE_DISK_MAX_ENTRIES = int(os.getenv("ARTICLE_CACHE_DISK_MAX_ENTRIES", "50000"))
+# Served without asking the origin for this long, then revalidated with ETag/Last-Modified
+ARTICLE_CACHE_FRESH_SECONDS = int(os.getenv("ARTICLE_CACHE_FRESH_SECONDS", "900"))
+# Bump whenever HTML extraction or cleaning output changes so old entries stop matching
+ARTICLE_CACHE_VERSION = 3
+PRUNE_EVERY_N_WRITES = 200
+
+
+class ArticleCache(TwoTierCache):
+    """
+    Extracted article text keyed by normalized URL, with the validators
+    (ETag, Last-Modified) the origin sent for it. Entries do not expire:
+    once stale they are revalidated, and the least recently used are pruned
+    past disk_max_entries.
+    """
+
+    name = "Article"
+    schema = (
+        "CREATE TABLE IF NOT EXISTS article_cache ("
+        "url TEXT PRIMARY KEY, value TEXT NOT NULL, accessed_at REAL NOT NULL)",
+    )
+    prune_every = PRUNE_EVERY_N_WRITES
+
+    def __init__(
+        self,
+        db_path: Optional[str] = ARTICLE_CACHE_DB_PATH,
+        max_entries: int = ARTICLE_CACHE_MAX_ENTRIES,
+        disk_max_entries: int = ARTICLE_CACHE_DISK_MAX_ENTRIES
+    ):
+        self.disk_max_entries = disk_max_entries
+        super().__init__(db_path, max_entries)
+
+    def _valid(self, entry: Dict[str, Any]) -> bool:
+        return entry.get("version") == ARTICLE_CACHE_VERSION
+
+    # --- Disk tier ---
+    def _disk_get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value FROM article_cache WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE article_cache SET accessed_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self._db.commit()
+        return json.loads(row[0])
+
+    def _disk_set(self, url: str, entry: Dict[str, Any]) -> None:
+        self._disk_write(
+            "INSERT OR REPLACE INTO article_cache (url, value, accessed_at) VALUES (?, ?, ?)",
+            (url, json.dumps(entry, ensure_ascii=False), time.time())
+        )
+
+    def _prune(self) -> None:
+        self._db.execute(
+            "DELETE FROM article_cache WHERE url IN ("
+            "SELECT url FROM article_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+
+    # --- Public API ---
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        return await self._lookup(url)
+
+    async def set(self, url: str, entry: Dict[str, Any]) -> None:
+        await self._store(url, {**entry, "version": ARTICLE_CACHE_VERSION})
+
+
+article_cache = ArticleCache() if ARTICLE_CACHE_ENABLED else None
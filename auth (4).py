@@ -7,6 +7,8 @@ import os
 from typing import Optional
 import logging
 
+from jwt_verify import token_verifier
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -55,22 +57,16 @@ class UserCreateResponse(BaseModel):
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        user = supabase.auth.get_user(credentials.credentials)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        user = token_verifier.authenticate(credentials.credentials, supabase)
         
-        db_user = supabase.from_("users").select("*").eq("id", user.user.id).maybe_single().execute()
+        db_user = supabase.from_("users").select("*").eq("id", user.id).maybe_single().execute()
         if not db_user.data:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found in database",
             )
             
-        return user.user
+        return user
     except Exception as e:
         logger.error(f"Authentication failed: {str(e)}")
         raise HTTPException(
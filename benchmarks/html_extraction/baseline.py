@@ -0,0 +1,47 @@
+"""
+The BeautifulSoup selector loop that extractors.html_to_text used before
+html_content replaced it, kept verbatim as the benchmark baseline.
+Needs beautifulsoup4, which the service itself no longer depends on.
+"""
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+
+def html_to_text(body: bytes, encoding: Optional[str] = None) -> str:
+    """Main readable text of an HTML page; encoding is the charset from the response headers, if any"""
+    soup = BeautifulSoup(body, 'lxml', from_encoding=encoding)
+
+    # Remove unwanted elements
+    for element in soup(["script", "style", "nav", "footer", "header", "form",
+                       "aside", "meta", "iframe", "img", "svg", "link",
+                       "input", "button", "select", "textarea"]):
+        element.decompose()
+
+    # Try to find main content areas
+    content_selectors = [
+        'article', 'main', 'div.main-content', 'div.entry-content',
+        'div.post-content', 'div.article-body', 'div[role="main"]',
+        'div#content', 'div#main', 'div.content', 'div.post',
+        'div.blog-post', 'div.article'
+    ]
+
+    main_text = ""
+    for selector in content_selectors:
+        elements = soup.select(selector)
+        for element in elements:
+            text = element.get_text(separator=' ', strip=True)
+            if len(text) > len(main_text):
+                main_text = text
+
+    # Fallback to body text if no main content found
+    if not main_text or len(main_text) < 100:
+        body_element = soup.find('body')
+        if body_element:
+            main_text = body_element.get_text(separator=' ', strip=True)
+
+    # Final fallback to entire document
+    if not main_text or len(main_text) < 50:
+        main_text = soup.get_text(separator=' ', strip=True)
+
+    return main_text
@@ -0,0 +1,105 @@
+"""
+Speed and extraction quality of html_content.main_text against the old
+BeautifulSoup selector loop (baseline.py), over the saved pages in corpus/.
+
+Each corpus/<name>.html comes with <name>.truth.txt, the page's main text
+by hand-picked XPath. Quality is bag-of-words precision/recall/F1 of the
+extracted text against it; time is the mean of REPEATS runs after a warm-up.
+
+Pages by prefix:
+    mdbook   Rust documentation (mdBook): sidebar TOC, menu bar, page nav
+    node     Node.js API docs: global and per-page TOC, header
+    news     hashed class names, link lists, cookie banner
+    blog     div#main wrapping the post, widgets and comments
+    forum    layout tables with a link-only menu cell
+    brtext   <br>-separated article in a bare div, hidden overlay
+The last four are generated templates filled with prose from the Rust book.
+
+Run from the repository root:
+    python benchmarks/html_extraction/bench.py [-v]
+-v lists pages where the new extractor scores below 0.9 F1.
+"""
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(HERE)))
+
+from html_content import main_text  # noqa: E402
+from text_normalize import normalize_text  # noqa: E402
+
+REPEATS = 3
+WORD_RE = re.compile(r"\w+")
+
+
+def word_f1(extracted: str, truth: str) -> Tuple[float, float, float]:
+    got = Counter(WORD_RE.findall(extracted.lower()))
+    expected = Counter(WORD_RE.findall(truth.lower()))
+    overlap = sum((got & expected).values())
+    if not overlap:
+        return 0.0, 0.0, 0.0
+    precision = overlap / sum(got.values())
+    recall = overlap / sum(expected.values())
+    return precision, recall, 2 * precision * recall / (precision + recall)
+
+
+def timed(extract: Callable[[bytes, None], str], body: bytes) -> Tuple[str, float]:
+    extract(body, None)
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        text = extract(body, None)
+    return text, (time.perf_counter() - started) / REPEATS
+
+
+def main(verbose: bool = False) -> None:
+    extractors: Dict[str, Callable] = {"new": main_text}
+    try:
+        from baseline import html_to_text
+        extractors = {"old": html_to_text, **extractors}
+    except ImportError:
+        print("beautifulsoup4 not installed; benchmarking html_content alone\n")
+
+    scores: Dict[str, Dict[str, List[Tuple[float, float, float]]]] = defaultdict(lambda: defaultdict(list))
+    times: Dict[str, List[float]] = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(HERE, "corpus", "*.html"))):
+        name = os.path.basename(path)[:-len(".html")]
+        kind = re.match(r"[a-z]+", name).group(0)
+        with open(path, "rb") as f:
+            body = f.read()
+        with open(path[:-len(".html")] + ".truth.txt", encoding="utf-8") as f:
+            truth = f.read()
+
+        for label, extract in extractors.items():
+            text, seconds = timed(extract, body)
+            score = word_f1(normalize_text(text), truth)
+            scores[kind][label].append(score)
+            times[label].append(seconds)
+            if verbose and label == "new" and score[2] < 0.9:
+                print(f"LOW {name}: P/R/F1 " + "/".join(f"{value:.2f}" for value in score))
+
+    header = "".join(f"  {label + ' P/R/F1':>16}" for label in extractors)
+    print(f"{'kind':8} {'pages':>5}{header}")
+    for kind, by_label in sorted(scores.items()):
+        cells = ""
+        for label in extractors:
+            values = by_label[label]
+            cells += "  " + f"{'/'.join(f'{statistics.mean(v[i] for v in values):.2f}' for i in range(3)):>16}"
+        print(f"{kind:8} {len(next(iter(by_label.values()))):>5}{cells}")
+    print()
+    for label in extractors:
+        f1s = [score[2] for by_label in scores.values() for score in by_label[label]]
+        print(
+            f"{label}: mean F1 {statistics.mean(f1s):.3f}, "
+            f"median {statistics.median(times[label]) * 1000:.2f} ms/page, "
+            f"total {sum(times[label]) * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(verbose="-v" in sys.argv)
@@ -0,0 +1,142 @@
+"""
+Time and memory of office_xml's streaming DOCX/PPTX extraction against the
+python-docx/python-pptx object-model path it replaced.
+
+The documents are generated with python-docx and python-pptx (needed only
+here, the service no longer depends on them):
+    docx   5000 paragraphs with a 4x3 table after every tenth
+    pptx   200 slides, each with a title, a two-paragraph body and speaker notes
+
+Each extractor runs in a fresh process. Peak RSS is the growth over that
+process's baseline after imports, during the first extraction; time is the
+mean of REPEATS further runs.
+Character counts differ because the old path skipped tables and notes.
+
+Run from the repository root:
+    python benchmarks/office_xml/bench.py
+"""
+import importlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+REPEATS = 3
+DOCX_PARAGRAPHS = 5000
+PPTX_SLIDES = 200
+SENTENCE = "The mitochondrion is the powerhouse of the cell, producing ATP through respiration. "
+
+
+def make_docx(path: str) -> None:
+    from docx import Document
+    document = Document()
+    for i in range(DOCX_PARAGRAPHS):
+        document.add_paragraph(f"{i}. " + SENTENCE * 2)
+        if i % 10 == 9:
+            table = document.add_table(rows=4, cols=3)
+            for row_index, row in enumerate(table.rows):
+                for col_index, cell in enumerate(row.cells):
+                    cell.text = f"r{row_index}c{col_index} value {i}"
+    document.save(path)
+
+
+def make_pptx(path: str) -> None:
+    from pptx import Presentation
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]
+    for i in range(PPTX_SLIDES):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i}"
+        body = slide.placeholders[1].text_frame
+        body.text = SENTENCE
+        body.add_paragraph().text = SENTENCE
+        slide.notes_slide.notes_text_frame.text = f"Speaker notes for slide {i}. " + SENTENCE
+    presentation.save(path)
+
+
+# --- The object-model extraction used before office_xml ---
+def old_docx(path: str) -> str:
+    from docx import Document
+    document = Document(path)
+    return "\n".join(para.text for para in document.paragraphs if para.text.strip())
+
+
+def old_pptx(path: str) -> str:
+    from pptx import Presentation
+    presentation = Presentation(path)
+    return "\n".join(
+        shape.text
+        for slide in presentation.slides
+        for shape in slide.shapes
+        if hasattr(shape, "text") and shape.text.strip()
+    )
+
+
+def new_docx(path: str) -> str:
+    from office_xml import docx_blocks
+    return "\n".join(docx_blocks(path)["blocks"])
+
+
+def new_pptx(path: str) -> str:
+    from office_xml import pptx_blocks
+    return "\n".join(pptx_blocks(path)["blocks"])
+
+
+EXTRACTORS = {
+    ("docx", "python-docx"): old_docx,
+    ("docx", "office_xml"): new_docx,
+    ("pptx", "python-pptx"): old_pptx,
+    ("pptx", "office_xml"): new_pptx,
+}
+MODULES = {"python-docx": "docx", "python-pptx": "pptx", "office_xml": "office_xml"}
+
+
+def _max_rss_mb() -> float:
+    # VmHWM, unlike ru_maxrss, is not inherited from the parent across exec (Linux only)
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _measure(key, path: str, results) -> None:
+    sys.path.insert(0, ROOT)
+    extract = EXTRACTORS[key]
+    importlib.import_module(MODULES[key[1]])
+    baseline = _max_rss_mb()
+    text = extract(path)
+    peak = _max_rss_mb() - baseline
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        extract(path)
+    elapsed = (time.perf_counter() - started) / REPEATS
+    results[key] = (elapsed * 1000, peak, len(text))
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = {"docx": os.path.join(workdir, "bench.docx"), "pptx": os.path.join(workdir, "bench.pptx")}
+        make_docx(paths["docx"])
+        make_pptx(paths["pptx"])
+
+        context = multiprocessing.get_context("spawn")
+        results: Dict = context.Manager().dict()
+        for key in EXTRACTORS:
+            process = context.Process(target=_measure, args=(key, paths[key[0]], results))
+            process.start()
+            process.join()
+
+        print(f"{'file':5} {'size':>7}  {'extractor':12} {'ms':>8} {'peak RSS +MB':>13} {'chars':>9}")
+        for (kind, name), (ms, rss, chars) in sorted(results.items()):
+            size = os.path.getsize(paths[kind]) / 1024
+            print(f"{kind:5} {size:5.0f}KB  {name:12} {ms:8.1f} {rss:13.1f} {chars:9d}")
+
+
+if __name__ == "__main__":
+    main()
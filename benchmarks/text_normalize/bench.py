@@ -0,0 +1,75 @@
+"""
+Throughput of text_normalize.normalize_text on multi-MB inputs, against the
+two re.sub passes of the clean_extracted_text it replaced.
+
+Inputs are generated, so runs are comparable across machines:
+    ascii      lecture notes with line-end hyphenation (~6.6 MB)
+    unicode    English with smart quotes, ligatures and math, NFKC needed (~7.4 MB)
+    mixed      dense mixed-script text: Devanagari, CJK, accents, (cid:N),
+               zero-width spaces (~1.2 MB)
+
+The old cleaner maps every non-ASCII character to a space, so on the last
+two inputs its output loses most of the text; only the speed compares.
+
+Run from the repository root:
+    python benchmarks/text_normalize/bench.py
+"""
+import os
+import random
+import re
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from text_normalize import normalize_text  # noqa: E402
+
+REPEATS = 5
+
+
+def old_normalize(text: str) -> str:
+    """normalize_extracted_text as it was before text_normalize"""
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = re.sub(r'[^\x20-\x7E‘’“”–—]', ' ', text)
+    return text
+
+
+def make_inputs():
+    ascii_text = (
+        "Lecture notes on thermo-\ndynamics. The first law states that energy is conserved.\n" * 80000
+    )
+    unicode_text = (
+        "“Thermodynamics” is the study of energy—its forms and transfer. "
+        "The ﬁrst law, ΔU = Q − W, states con-\nservation.\n" * 60000
+    )
+    random.seed(1)
+    words = [
+        "lecture", "exam-\nple", "naïve", "ﬁnal", "हिन्दी",
+        "数学。", "Page", "x​", "\t", "\n", "(cid:3)", "well-\nKnown", "end."
+    ] + ["word"] * 20
+    mixed_text = " ".join(random.choice(words) for _ in range(200000))
+    return {"ascii": ascii_text, "unicode": unicode_text, "mixed": mixed_text}
+
+
+def throughput(fn: Callable[[str], str], text: str) -> float:
+    """MB of UTF-8 input per second"""
+    fn(text)
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        fn(text)
+    elapsed = (time.perf_counter() - started) / REPEATS
+    return len(text.encode("utf-8")) / elapsed / 1e6
+
+
+def main() -> None:
+    print(f"{'input':8} {'size':>8}  {'old re.sub':>12}  {'normalize_text':>14}")
+    for name, text in make_inputs().items():
+        size = len(text.encode("utf-8")) / 1e6
+        old = throughput(old_normalize, text)
+        new = throughput(normalize_text, text)
+        print(f"{name:8} {size:6.1f}MB  {old:8.1f} MB/s  {new:10.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
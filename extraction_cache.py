@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import zlib
+import logging
+from typing import Any, Dict, List, Optional
+
+from two_tier_cache import TwoTierCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Cache Configuration ---
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "1") == "1"
+EXTRACTION_CACHE_DB_PATH = os.getenv("EXTRACTION_CACHE_DB_PATH", "extraction_cache.sqlite3")
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512")) * 1024 * 1024
+EXTRACTION_CACHE_MEMORY_BYTES = int(os.getenv("EXTRACTION_CACHE_MEMORY_MB", "32")) * 1024 * 1024
+# Bump whenever extraction or cleaning output changes so old entries stop matching
+EXTRACTION_CACHE_VERSION = 5
+EVICT_EVERY_N_WRITES = 50
+
+
+def make_extraction_key(
+    content_sha256: str,
+    max_tokens: Optional[int],
+    page_numbers: Optional[List[int]] = None
+) -> str:
+    """Key for one extraction of one file: the content hash plus every option that shapes the result"""
+    canonical = json.dumps(
+        {
+            "sha256": content_sha256,
+            "version": EXTRACTION_CACHE_VERSION,
+            "max_tokens": max_tokens,
+            "pages": page_numbers
+        },
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache(TwoTierCache):
+    """
+    Content-addressed cache of cleaned extraction results.
+
+    Entries are zlib-compressed JSON in a SQLite table, evicted least recently
+    used first once the table passes max_bytes; the in-process LRU is also
+    bounded by bytes. Extraction is deterministic, so entries never expire
+    on their own.
+    """
+
+    name = "Extraction"
+    schema = (
+        "CREATE TABLE IF NOT EXISTS extraction_cache ("
+        "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+        "size INTEGER NOT NULL, accessed_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS extraction_cache_accessed "
+        "ON extraction_cache (accessed_at)",
+    )
+    prune_every = EVICT_EVERY_N_WRITES
+
+    def __init__(
+        self,
+        db_path: Optional[str] = EXTRACTION_CACHE_DB_PATH,
+        max_bytes: int = EXTRACTION_CACHE_MAX_BYTES,
+        memory_bytes: int = EXTRACTION_CACHE_MEMORY_BYTES
+    ):
+        self.max_bytes = max_bytes
+        super().__init__(db_path, memory_bytes)
+        self.counters["evictions"] = 0
+
+    def _entry_size(self, entry: bytes) -> int:
+        return len(entry)
+
+    # --- Memory tier ---
+    def _memory_set(self, key: str, entry: bytes) -> None:
+        if len(entry) <= self.memory_limit // 4:
+            super()._memory_set(key, entry)
+
+    # --- Disk tier ---
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE extraction_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+            return row[0]
+
+    def _disk_contains(self, key: str) -> bool:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT 1 FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone() is not None
+
+    def _disk_set(self, key: str, entry: bytes) -> None:
+        self._disk_write(
+            "INSERT OR REPLACE INTO extraction_cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, entry, len(entry), time.time())
+        )
+
+    def _prune(self) -> None:
+        """Drops least recently used rows until the table fits in max_bytes"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM extraction_cache ORDER BY accessed_at ASC"
+        ):
+            if freed >= excess:
+                break
+            doomed.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM extraction_cache WHERE key = ?", doomed)
+        self.counters["evictions"] += len(doomed)
+        logger.info(f"Extraction cache evicted {len(doomed)} entries ({freed} bytes)")
+
+    # --- Public API ---
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self._lookup(key)
+        return json.loads(zlib.decompress(value)) if value is not None else None
+
+    async def contains(self, key: str) -> bool:
+        """Existence check that does not count as a use for LRU purposes"""
+        if key in self._memory:
+            return True
+        if self._db is None:
+            return False
+        return bool(await self._disk_call("read", self._disk_contains, key))
+
+    async def set(self, key: str, result: Dict[str, Any]) -> None:
+        value = await asyncio.to_thread(
+            lambda: zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+        )
+        await self._store(key, value)
+
+    def stats(self) -> Dict[str, float]:
+        return {**super().stats(), "memory_bytes": self._memory_size}
+
+
+extraction_cache = ExtractionCache() if EXTRACTION_CACHE_ENABLED else None
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+import logging
+import multiprocessing
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Set
+
+from fastapi import HTTPException
+
+import extractors
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Extraction Pool Configuration ---
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
+EXTRACTION_MAX_QUEUE = int(os.getenv("EXTRACTION_MAX_QUEUE", str(EXTRACTION_WORKERS * 4)))
+EXTRACTION_TIMEOUT_S = float(os.getenv("EXTRACTION_TIMEOUT_S", "60"))
+# Recycle workers periodically so pdfminer/Pillow heap growth cannot accumulate
+EXTRACTION_MAX_TASKS_PER_CHILD = int(os.getenv("EXTRACTION_MAX_TASKS_PER_CHILD", "200"))
+# fork is unsafe once the server has started threads; spawn workers import only `extractors`
+EXTRACTION_START_METHOD = os.getenv("EXTRACTION_START_METHOD", "spawn")
+
+
+def _discard_result(future: asyncio.Future) -> None:
+    """Marks an abandoned job's outcome as retrieved so asyncio doesn't log it"""
+    if not future.cancelled():
+        future.exception()
+
+
+class _Generation:
+    """One ProcessPoolExecutor and the jobs submitted to it"""
+
+    def __init__(self, workers: int, initializer: Callable[[], None]):
+        options = {}
+        if EXTRACTION_MAX_TASKS_PER_CHILD and sys.version_info >= (3, 11):
+            options["max_tasks_per_child"] = EXTRACTION_MAX_TASKS_PER_CHILD
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(EXTRACTION_START_METHOD),
+            initializer=initializer,
+            **options
+        )
+        self.in_flight: Set[Future] = set()
+        self.abandoned: Set[Future] = set()
+        self.retiring = False
+        self.killed = False
+
+    def kill_if_idle(self) -> bool:
+        """Terminates a retiring generation once only abandoned jobs are left on it"""
+        if self.killed or not self.retiring or self.in_flight - self.abandoned:
+            return False
+        for process in list((getattr(self.executor, "_processes", None) or {}).values()):
+            process.terminate()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.killed = True
+        return True
+
+
+class ExtractionPool:
+    """
+    Bounded process pool for CPU-bound document extraction.
+
+    Jobs beyond the worker count wait in a queue of at most max_queue; more
+    than that is rejected with 503 so a burst of uploads cannot pile up
+    unbounded work. Each job has a timeout: a job that is still queued is
+    cancelled, while a job that is already running cannot be interrupted
+    inside ProcessPoolExecutor, so new work moves to a fresh set of workers
+    and the old ones are terminated as soon as their other jobs finish.
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACTION_WORKERS,
+        max_queue: int = EXTRACTION_MAX_QUEUE,
+        timeout_s: float = EXTRACTION_TIMEOUT_S,
+        initializer: Callable[[], None] = extractors.warm_up,
+        name: str = "Extraction"
+    ):
+        self.workers = max(1, workers)
+        self.initializer = initializer
+        self.name = name
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self._current: Optional[_Generation] = None
+        self._retired: Set[_Generation] = set()
+        self.counters = {
+            "completed": 0, "failed": 0, "timeouts": 0,
+            "cancelled": 0, "rejected": 0, "recycled": 0
+        }
+
+    # --- Lifecycle ---
+    def _generation(self) -> _Generation:
+        if self._current is None:
+            self._current = _Generation(self.workers, self.initializer)
+        return self._current
+
+    async def start(self) -> None:
+        """Spawns every worker up front so the first uploads don't pay for process start and imports"""
+        generation = self._generation()
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(generation.executor, os.getpid) for _ in range(self.workers)
+        ])
+        logger.info(f"{self.name} pool ready: {self.workers} workers in {time.perf_counter() - started:.2f}s")
+
+    def shutdown(self) -> None:
+        for generation in [self._current, *self._retired]:
+            if generation is not None:
+                generation.executor.shutdown(wait=False, cancel_futures=True)
+        self._current = None
+        self._retired.clear()
+
+    def _recycle(self, generation: _Generation, reason: str) -> None:
+        if generation.retiring:
+            return
+        logger.warning(f"Recycling {self.name.lower()} workers ({reason}); new work goes to fresh workers")
+        generation.retiring = True
+        self.counters["recycled"] += 1
+        if self._current is generation:
+            self._current = None
+        self._retired.add(generation)
+        self._reap(generation)
+
+    def _reap(self, generation: _Generation) -> None:
+        if generation.kill_if_idle():
+            self._retired.discard(generation)
+
+    def _job_done(self, generation: _Generation, future: Future) -> None:
+        generation.in_flight.discard(future)
+        generation.abandoned.discard(future)
+        if generation.retiring:
+            self._reap(generation)
+
+    # --- Jobs ---
+    @property
+    def pending(self) -> int:
+        return sum(len(g.in_flight) for g in [self._current, *self._retired] if g is not None)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Runs fn(*args) in a worker process and returns its result"""
+        if self.pending >= self.workers + self.max_queue:
+            self.counters["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Document processing is busy, please retry shortly"
+            )
+
+        generation = self._generation()
+        try:
+            future = generation.executor.submit(extractors.run_job, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault in a native library); start over
+            self._recycle(generation, "worker died")
+            generation = self._generation()
+            future = generation.executor.submit(extractors.run_job, fn, *args)
+
+        generation.in_flight.add(future)
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(
+            lambda f: loop.is_closed() or loop.call_soon_threadsafe(self._job_done, generation, f)
+        )
+
+        waiter = asyncio.wrap_future(future)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(waiter), timeout or self.timeout_s)
+        except asyncio.TimeoutError:
+            waiter.add_done_callback(_discard_result)
+            self.counters["timeouts"] += 1
+            if not future.cancel():
+                generation.abandoned.add(future)
+                self._recycle(generation, "job overran its timeout")
+            raise HTTPException(
+                status_code=504,
+                detail="Document processing timed out"
+            )
+        except asyncio.CancelledError:
+            # Client went away: drop queued work; running work finishes and is discarded
+            self.counters["cancelled"] += 1
+            waiter.add_done_callback(_discard_result)
+            future.cancel()
+            raise
+        except BrokenProcessPool:
+            self.counters["failed"] += 1
+            self._recycle(generation, "worker crashed")
+            raise HTTPException(
+                status_code=503,
+                detail="Document processing worker crashed, please retry"
+            )
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+
+        self.counters["completed"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "workers": self.workers,
+            "pending": self.pending,
+            "retiring_generations": len(self._retired)
+        }
+
+
+extraction_pool = ExtractionPool()
@@ -0,0 +1,130 @@
+import io
+import os
+import mmap
+import pickle
+import logging
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import resolve1
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Synchronous, CPU-bound extractors. These run inside extraction pool worker
+# processes, so they take and return plain picklable values and raise plain
+# exceptions; the async wrappers in pdf_processor turn those into HTTP errors.
+
+# A page with less text than this that carries an image is treated as scanned
+SCANNED_PAGE_MAX_CHARS = 20
+
+# Either the document's bytes or the path of a spooled upload. Paths are
+# preferred: the pool then pickles a short string per job rather than the
+# whole file, and the worker maps the file instead of copying it.
+Source = Union[bytes, str]
+
+
+def source_size(source: Source) -> int:
+    return len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+
+
+@contextmanager
+def open_source(source: Source, mapped: bool = True) -> Iterator[BinaryIO]:
+    """
+    A seekable file object over the source. Paths are memory-mapped read-only
+    unless mapped=False; zipfile (DOCX/PPTX) needs a real file object, and
+    reads only the members it is asked for anyway.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        yield io.BytesIO(source)
+        return
+    with open(source, "rb") as handle:
+        if not mapped:
+            yield handle
+            return
+        if os.fstat(handle.fileno()).st_size == 0:
+            yield io.BytesIO(b"")
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def run_job(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Pool entry point for every job. An exception that cannot be unpickled in
+    the parent (e.g. one with a custom __init__) would mark the whole pool as
+    broken, so such errors are re-raised as a plain RuntimeError.
+    """
+    try:
+        return fn(*args)
+    except Exception as e:
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            raise RuntimeError(f"{type(e).__name__}: {str(e)}") from None
+        raise
+
+
+def warm_up() -> None:
+    """Pool initializer: unpickling it imports this module, paying the pdfminer import cost up front"""
+    import office_xml  # noqa: F401  lxml, for DOCX/PPTX jobs
+    import html_content  # noqa: F401  web page jobs
+
+
+def pdf_page_count(source: Source) -> int:
+    if not source_size(source):
+        raise ValueError("Empty PDF file")
+
+    with open_source(source) as pdf_file:
+        return sum(1 for _ in PDFPage.get_pages(pdf_file))
+
+
+def _has_images(resources, depth: int = 0) -> bool:
+    """True if the page's XObjects include an image, looking one level into form XObjects"""
+    xobjects = resolve1((resolve1(resources) or {}).get("XObject")) or {}
+    for xobject in xobjects.values():
+        xobject = resolve1(xobject)
+        subtype = getattr(xobject, "attrs", {}).get("Subtype")
+        name = getattr(subtype, "name", None)
+        if name == "Image":
+            return True
+        if name == "Form" and depth < 1 and _has_images(xobject.attrs.get("Resources"), depth + 1):
+            return True
+    return False
+
+
+def pdf_pages_to_text(source: Source, page_numbers: List[int]) -> List[Tuple[int, str, bool]]:
+    """
+    Extracts the given 1-based pages, returning (page number, text, scanned)
+    in page order. scanned marks pages with (almost) no text layer but an
+    image, i.e. likely scans that need OCR.
+    """
+    wanted = {n - 1 for n in page_numbers}
+    resources = PDFResourceManager()
+    laparams = LAParams()
+    pages = []
+
+    with open_source(source) as pdf_file:
+        for index, page in enumerate(PDFPage.get_pages(pdf_file, maxpages=max(page_numbers))):
+            if index not in wanted:
+                continue
+            output = io.StringIO()
+            device = TextConverter(resources, output, laparams=laparams)
+            PDFPageInterpreter(resources, device).process_page(page)
+            device.close()
+            text = output.getvalue()
+            scanned = len(''.join(text.split())) < SCANNED_PAGE_MAX_CHARS and _has_images(page.resources)
+            pages.append((index + 1, text, scanned))
+
+    return pages
+
+
+def html_to_text(body: bytes, encoding: Optional[str] = None) -> str:
+    """Main readable text of an HTML page; encoding is the charset from the response headers, if any"""
+    from html_content import main_text
+
+    return main_text(body, encoding)
@@ -0,0 +1,264 @@
+import codecs
+import re
+import logging
+from typing import List, Optional, Tuple
+
+from lxml import etree
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Main-content extraction for web pages, in the style of Readability, done
+# in one walk over the lxml tree. Runs in extraction pool workers. Text is
+# collected into one flat list in document order while every block element
+# records its slice of that list, its text and link-text lengths and a score
+# built up from the paragraphs inside it. Picking the article is then a
+# matter of comparing those records; nothing is walked a second time.
+
+# --- HTML Extraction Configuration ---
+MIN_ARTICLE_CHARS = 100       # a shorter pick falls back to all of the page's text
+MIN_PARAGRAPH_CHARS = 25      # shorter blocks do not vote for their ancestors
+SIBLING_SCORE_SHARE = 0.2     # siblings scoring this share of the winner are kept with it
+VOTE_ANCESTORS = 5            # a paragraph's score reaches this many ancestors, decaying with distance
+SNIFF_BYTES = 2048
+
+# Never content; their subtrees are skipped without being read
+SKIPPED_TAGS = frozenset({
+    "head", "script", "style", "noscript", "template", "nav", "footer", "header",
+    "aside", "iframe", "svg", "img", "link", "meta", "input", "button", "select",
+    "textarea", "canvas", "object", "embed", "dialog", "menu"
+})
+# Elements whose start and end break the text into separate lines
+BLOCK_TAGS = frozenset({
+    "address", "article", "blockquote", "dd", "div", "dl", "dt", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li", "main", "ol", "p", "pre", "section",
+    "table", "tbody", "td", "th", "thead", "tr", "ul", "body"
+})
+# Blocks that hold running text and vote for their parent and grandparent
+PARAGRAPH_TAGS = frozenset({"p", "pre", "td", "blockquote"})
+# Layout blocks that count as a paragraph when they have no block children
+DIV_LIKE_TAGS = frozenset({"div", "section", "article"})
+# Starting score of a candidate container by tag
+TAG_WEIGHTS = {
+    "article": 10, "main": 10, "div": 5, "section": 5, "pre": 3, "td": 3, "blockquote": 3,
+    "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5
+}
+# Containers that may be pruned by their class/id alone. Headings, links and
+# inline markup (syntax-highlighted "comment" spans) never are.
+HINT_PRUNED_TAGS = frozenset({"div", "section", "ul", "ol", "dl", "li", "table", "td", "form", "p"})
+
+# class/id hints, as used by Readability
+UNLIKELY_RE = re.compile(
+    r"banner|breadcrumb|combx|comment|community|cookie|disqus|extra|footer|gdpr|header|"
+    r"legends|menu|related|remark|replies|rss|shoutbox|sidebar|skyscraper|social|sponsor|"
+    r"supplemental|ad-break|agegate|pagination|pager|popup|share|subscribe|newsletter|promo",
+    re.IGNORECASE
+)
+MAYBE_CANDIDATE_RE = re.compile(r"and|article|body|column|content|main|shadow", re.IGNORECASE)
+POSITIVE_RE = re.compile(r"article|body|content|entry|hentry|h-entry|main|page|post|text|blog|story", re.IGNORECASE)
+NEGATIVE_RE = re.compile(
+    r"-ad-|hidden|banner|combx|comment|com-|contact|foot|masthead|media|meta|outbrain|promo|"
+    r"related|scroll|share|shoutbox|sidebar|skyscraper|sponsor|shopping|tags|tool|widget",
+    re.IGNORECASE
+)
+HIDDEN_STYLE_RE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb"<meta[^>]+charset", re.IGNORECASE)
+
+# Open element: [id, parent id, piece start, chars, link chars, commas, score, has block children]
+_ID, _PARENT, _PIECE, _CHARS, _LINKS, _COMMAS, _SCORE, _HAS_BLOCK = range(8)
+# Finished block element: (id, parent id, piece start, piece end, tag, chars, link chars, score, class weight)
+Block = Tuple[int, int, int, int, str, int, int, float, int]
+
+
+def _hints(elem) -> str:
+    return f"{elem.get('class') or ''} {elem.get('id') or ''}".strip()
+
+
+def _class_weight(hints: str) -> int:
+    if not hints:
+        return 0
+    return (25 if POSITIVE_RE.search(hints) else 0) - (25 if NEGATIVE_RE.search(hints) else 0)
+
+
+def _pruned(elem, tag: str) -> bool:
+    """Skipped tags, hidden elements and obvious boilerplate containers"""
+    if tag in SKIPPED_TAGS:
+        return True
+    if elem.get("hidden") is not None or elem.get("aria-hidden") == "true":
+        return True
+    style = elem.get("style")
+    if style and HIDDEN_STYLE_RE.search(style):
+        return True
+    if tag not in HINT_PRUNED_TAGS:
+        return False
+    hints = _hints(elem)
+    return bool(hints and UNLIKELY_RE.search(hints) and not MAYBE_CANDIDATE_RE.search(hints))
+
+
+def _sniff_encoding(body: bytes, declared: Optional[str]) -> Optional[str]:
+    """
+    The header charset if it names a real codec; otherwise None when the page
+    declares its own (libxml2 honours <meta charset>), else UTF-8 if the body
+    decodes as such and Windows-1252 if not
+    """
+    if declared:
+        try:
+            return codecs.lookup(declared).name
+        except LookupError:
+            pass
+    if body.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return None
+    if META_CHARSET_RE.search(body[:SNIFF_BYTES]):
+        return None
+    try:
+        body.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "windows-1252"
+
+
+def _walk(root) -> Tuple[List[str], List[Block]]:
+    """
+    One pass over the tree: the text pieces of every kept element in
+    document order, and a record for every block element. Paragraph-like
+    blocks score 1 + commas + one point per 100 characters (up to 3), scaled
+    down by the share of their text inside links. The score goes in full to
+    their parent, half to their grandparent and a third of that per level to
+    ancestors up to VOTE_ANCESTORS away. A text block with no block children
+    (a <br>-separated div) also keeps its score itself.
+    """
+    pieces: List[str] = []
+    blocks: List[Block] = []
+    stack: List[list] = []
+    chars = link_chars = commas = 0
+    link_depth = 0
+    next_id = 0
+    skipping = False
+
+    def add_text(text: str) -> None:
+        nonlocal chars, link_chars, commas
+        pieces.append(text)
+        size = len(text.strip())
+        chars += size
+        commas += text.count(",")
+        if link_depth:
+            link_chars += size
+
+    walker = etree.iterwalk(root, events=("start", "end"))
+    for event, elem in walker:
+        tag = elem.tag
+        if not isinstance(tag, str):
+            continue
+        tag = tag.lower()
+
+        if event == "start":
+            if _pruned(elem, tag):
+                walker.skip_subtree()
+                skipping = True
+                continue
+            if tag in BLOCK_TAGS:
+                pieces.append("\n")
+                if stack:
+                    stack[-1][_HAS_BLOCK] = True
+            elif tag == "br":
+                pieces.append("\n")
+            if tag == "a":
+                link_depth += 1
+            stack.append([next_id, stack[-1][_ID] if stack else -1, len(pieces), chars, link_chars, commas, 0.0, False])
+            next_id += 1
+            if elem.text:
+                add_text(elem.text)
+            continue
+
+        # end event
+        if skipping:
+            skipping = False
+        else:
+            frame = stack.pop()
+            if tag == "a":
+                link_depth -= 1
+            if tag in BLOCK_TAGS:
+                own_chars = chars - frame[_CHARS]
+                text_block = tag in DIV_LIKE_TAGS and not frame[_HAS_BLOCK]
+                if own_chars >= MIN_PARAGRAPH_CHARS and (tag in PARAGRAPH_TAGS or text_block):
+                    vote = 1 + (commas - frame[_COMMAS]) + min(own_chars // 100, 3)
+                    vote *= 1 - (link_chars - frame[_LINKS]) / own_chars
+                    if text_block:
+                        frame[_SCORE] += vote
+                    for level, ancestor in enumerate(reversed(stack[-VOTE_ANCESTORS:])):
+                        ancestor[_SCORE] += vote / (1 if level == 0 else 2 if level == 1 else level * 3)
+                score = frame[_SCORE]
+                blocks.append((
+                    frame[_ID], frame[_PARENT], frame[_PIECE], len(pieces), tag, own_chars,
+                    link_chars - frame[_LINKS], score,
+                    _class_weight(_hints(elem)) if score else 0
+                ))
+                pieces.append("\n")
+        if elem.tail:
+            add_text(elem.tail)
+
+    return pieces, blocks
+
+
+def _final_score(block: Block) -> float:
+    _, _, _, _, tag, chars, links, score, weight = block
+    link_density = links / chars if chars else 0.0
+    return (score + TAG_WEIGHTS.get(tag, 0) + weight) * (1 - link_density)
+
+
+def main_text(body: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Main readable text of an HTML page. The best-scoring container is kept
+    together with siblings that score close to it and link-light paragraphs
+    next to it; navigation, comments, sidebars and other boilerplate are
+    pruned on the way. Falls back to all of the page's text when nothing
+    article-like is found. encoding is the charset from the response headers.
+    """
+    parser = etree.HTMLParser(
+        encoding=_sniff_encoding(body, encoding),
+        remove_comments=True,
+        remove_pis=True,
+        no_network=True
+    )
+    root = etree.fromstring(body, parser) if body.strip() else None
+    if root is None:
+        return ""
+
+    pieces, blocks = _walk(root)
+    scores = {block[0]: _final_score(block) for block in blocks if block[7] > 0}
+    if scores:
+        by_id = {block[0]: block for block in blocks}
+        top = by_id[max(scores, key=scores.__getitem__)]
+
+        # Content split across sibling sections: the parent that gathers
+        # their votes is the better pick once it outscores the winner
+        last_score = scores[top[0]]
+        floor = last_score / 3
+        parent = by_id.get(top[1])
+        while parent is not None and parent[4] != "body":
+            parent_score = scores.get(parent[0], 0.0)
+            if parent_score < floor:
+                break
+            if parent_score > last_score:
+                top = parent
+                break
+            last_score = parent_score
+            parent = by_id.get(parent[1])
+
+        threshold = max(10.0, scores[top[0]] * SIBLING_SCORE_SHARE)
+        parts = []
+        for block in blocks:
+            if block[1] != top[1]:
+                continue
+            block_id, _, start, end, tag, chars, links, _, _ = block
+            keep = block is top or scores.get(block_id, 0.0) >= threshold
+            if not keep and tag == "p" and chars > 80:
+                keep = links / chars < 0.25
+            if keep:
+                parts.append("".join(pieces[start:end]).strip())
+        text = "\n".join(part for part in parts if part)
+        if len(text) >= MIN_ARTICLE_CHARS:
+            return text
+
+    return "".join(pieces).strip()
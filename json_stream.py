@@ -0,0 +1,81 @@
+import json
+import logging
+from typing import Any, Dict, Iterator, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JSONObjectStreamParser:
+    """
+    Incremental, tolerant parser for a JSON array of objects arriving in
+    arbitrary text fragments (LLM token deltas).
+
+    It tracks string/escape state and brace depth one character at a time and
+    emits each top-level object as soon as its closing brace arrives. Anything
+    outside objects (```json fences, prose, the surrounding [ ] and commas) is
+    ignored, an object that fails to parse is skipped without affecting the
+    others, and a trailing object cut off by max_tokens is simply never
+    emitted.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.skipped = 0
+
+    def feed(self, fragment: str) -> Iterator[Dict[str, Any]]:
+        for char in fragment:
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._buffer = [char]
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._decode("".join(self._buffer))
+                    self._buffer = []
+                    if item is not None:
+                        yield item
+
+    def _decode(self, raw: str):
+        try:
+            item = json.loads(raw, strict=False)
+        except json.JSONDecodeError as e:
+            self.skipped += 1
+            logger.warning(f"Skipping malformed JSON item: {str(e)}")
+            return None
+        if not isinstance(item, dict):
+            self.skipped += 1
+            return None
+        return item
+
+    @property
+    def truncated(self) -> bool:
+        """True if the input ended in the middle of an object"""
+        return self._depth > 0
+
+
+def parse_json_items(text: str) -> List[Dict[str, Any]]:
+    """Recovers every complete, well-formed object from a (possibly truncated) JSON array"""
+    parser = JSONObjectStreamParser()
+    items = list(parser.feed(text))
+    if parser.truncated:
+        logger.warning("LLM output was truncated; dropped the incomplete trailing item")
+    return items
@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import jwt
+from fastapi import HTTPException
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- JWT Verification Configuration ---
+SUPABASE_URL = os.getenv("SUPABASE_URL") or ""
+# Legacy projects sign access tokens with this shared HS256 secret (Project Settings > API)
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+# Projects on asymmetric signing keys publish their public keys here
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else ""
+)
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_REFRESH_SECONDS = int(os.getenv("JWKS_REFRESH_SECONDS", "600"))
+JWKS_MIN_REFETCH_SECONDS = 30   # an unknown key ID triggers a refetch at most this often
+JWKS_FETCH_TIMEOUT = 5.0
+JWT_LEEWAY_SECONDS = int(os.getenv("JWT_LEEWAY_SECONDS", "10"))  # clock skew against Supabase Auth
+VERIFIED_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("VERIFIED_TOKEN_CACHE_MAX_ENTRIES", "4096"))
+
+SYMMETRIC_ALGORITHMS = frozenset({"HS256"})
+ASYMMETRIC_ALGORITHMS = frozenset({"RS256", "ES256", "EdDSA"})
+
+
+class VerifiedUser:
+    """
+    The user an access token was issued to, read from its claims. Carries
+    the same attributes callers use on a Supabase User.
+    """
+
+    __slots__ = ("id", "email", "phone", "role", "aud", "app_metadata", "user_metadata")
+
+    def __init__(self, claims: Dict[str, Any]):
+        self.id = claims["sub"]
+        self.email = claims.get("email")
+        self.phone = claims.get("phone")
+        self.role = claims.get("role")
+        self.aud = claims.get("aud")
+        self.app_metadata = claims.get("app_metadata") or {}
+        self.user_metadata = claims.get("user_metadata") or {}
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens in-process: signature against the
+    project's JWT secret or its published signing keys, plus exp and aud.
+    Tokens that verify are remembered until they expire, so repeat requests
+    with the same token cost one dictionary lookup. Tokens signed with a key
+    this process does not hold (no secret configured, a key rotated in since
+    the last refresh) are checked remotely by Supabase Auth instead, and a
+    key refresh is started in the background.
+
+    A locally verified token stays valid until its exp even if the user signs
+    out or is deleted in the meantime, as with any stateless JWT check.
+    """
+
+    def __init__(
+        self,
+        secret: Optional[str] = SUPABASE_JWT_SECRET,
+        jwks_url: Optional[str] = SUPABASE_JWKS_URL,
+        audience: str = SUPABASE_JWT_AUDIENCE,
+        max_entries: int = VERIFIED_TOKEN_CACHE_MAX_ENTRIES
+    ):
+        self.secret = secret
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.max_entries = max_entries
+        self._keys: Dict[str, Any] = {}
+        self._keys_fetched_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_loop: Optional[asyncio.Task] = None
+        # sha256(token) -> (expiry, user)
+        self._verified: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+        self.counters = {
+            "cache_hits": 0, "verified": 0, "rejected": 0, "remote": 0,
+            "key_refreshes": 0, "key_refresh_errors": 0
+        }
+
+    # --- Signing keys ---
+    async def refresh_keys(self) -> None:
+        """Fetches the project's JWKS and replaces the cached signing keys"""
+        if not self.jwks_url:
+            return
+        self._keys_fetched_at = time.monotonic()
+        try:
+            async with httpx.AsyncClient(timeout=JWKS_FETCH_TIMEOUT) as client:
+                response = await client.get(self.jwks_url)
+                response.raise_for_status()
+                jwks = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Could not refresh JWT signing keys: {str(e)}")
+            self.counters["key_refresh_errors"] += 1
+            return
+
+        keys = {}
+        for entry in jwks.get("keys", []):
+            try:
+                key = jwt.PyJWK(entry)
+            except jwt.PyJWTError as e:
+                logger.warning(f"Skipping unusable signing key {entry.get('kid')}: {str(e)}")
+                continue
+            keys[entry.get("kid")] = key.key
+        self._keys = keys
+        self.counters["key_refreshes"] += 1
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.monotonic() - self._keys_fetched_at < JWKS_MIN_REFETCH_SECONDS:
+            return
+        try:
+            self._refresh_task = asyncio.get_running_loop().create_task(self.refresh_keys())
+        except RuntimeError:
+            pass  # called outside the event loop; the periodic refresh will catch up
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(JWKS_REFRESH_SECONDS)
+            await self.refresh_keys()
+
+    async def start(self) -> None:
+        """Loads the signing keys and keeps them refreshed in the background"""
+        if not self.jwks_url or self._refresh_loop is not None:
+            return
+        await self.refresh_keys()
+        self._refresh_loop = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        for task in (self._refresh_loop, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+        self._refresh_loop = self._refresh_task = None
+
+    # --- Verified tokens ---
+    def _remember(self, digest: bytes, expires_at: float, user: Any) -> None:
+        self._verified[digest] = (expires_at, user)
+        self._verified.move_to_end(digest)
+        while len(self._verified) > self.max_entries:
+            self._verified.popitem(last=False)
+
+    def _signing_key(self, header: Dict[str, Any]) -> Optional[Any]:
+        """The key to check this token with, or None when it is not held locally"""
+        algorithm = header.get("alg")
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            return self.secret
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            key = self._keys.get(header.get("kid"))
+            if key is None:
+                self._schedule_refresh()
+            return key
+        raise jwt.InvalidAlgorithmError(f"Unsupported signing algorithm: {algorithm}")
+
+    def verify(self, token: str) -> Optional[VerifiedUser]:
+        """
+        The token's user if it verifies locally, or None if it cannot be
+        checked here. Raises jwt.InvalidTokenError for a token that is
+        malformed, wrongly signed, expired or meant for another audience.
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = self._verified.get(digest)
+        if cached is not None:
+            if cached[0] > time.time():
+                self._verified.move_to_end(digest)
+                self.counters["cache_hits"] += 1
+                return cached[1]
+            del self._verified[digest]
+
+        try:
+            header = jwt.get_unverified_header(token)
+            key = self._signing_key(header)
+            if key is None:
+                return None
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[header["alg"]],
+                audience=self.audience,
+                leeway=JWT_LEEWAY_SECONDS,
+                options={"require": ["exp", "sub"]}
+            )
+        except jwt.InvalidTokenError:
+            self.counters["rejected"] += 1
+            raise
+
+        user = VerifiedUser(claims)
+        self._remember(digest, float(claims["exp"]), user)
+        self.counters["verified"] += 1
+        return user
+
+    def authenticate(self, token: str, supabase) -> Any:
+        """
+        The user the token belongs to: verified locally when possible,
+        otherwise by supabase.auth.get_user, whose answer is remembered until
+        the token expires. Raises HTTPException 401 for a rejected token.
+        """
+        try:
+            user = self.verify(token)
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token has expired")
+        except jwt.InvalidTokenError as e:
+            logger.info(f"Rejected access token: {str(e)}")
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if user is not None:
+            return user
+
+        self.counters["remote"] += 1
+        response = supabase.auth.get_user(token)
+        if not response or not response.user:
+            raise HTTPException(status_code=401, detail="Invalid user")
+        # Supabase Auth vouched for the token, so its exp claim can be trusted
+        try:
+            expires_at = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.InvalidTokenError:
+            expires_at = None
+        if expires_at:
+            self._remember(hashlib.sha256(token.encode()).digest(), float(expires_at), response.user)
+        return response.user
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["cache_hits"] + self.counters["verified"] + self.counters["remote"]
+        local = self.counters["cache_hits"] + self.counters["verified"]
+        return {
+            **self.counters,
+            "signing_keys": len(self._keys),
+            "hs256_secret": bool(self.secret),
+            "cached_tokens": len(self._verified),
+            "local_rate": round(local / lookups, 4) if lookups else 0.0
+        }
+
+
+token_verifier = TokenVerifier()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from two_tier_cache import TwoTierCache
+
+# --- Cache Configuration ---
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", "llm_cache.sqlite3")
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "100000"))
+PRUNE_EVERY_N_WRITES = 500
+
+
+def make_cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int
+) -> str:
+    """Content-addressed key: SHA-256 over a canonical JSON encoding of the request"""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache(TwoTierCache):
+    """
+    Two-tier cache for LLM responses, keyed by make_cache_key. Entries are
+    (value, expires_at); the disk tier prunes expired rows and then the
+    least recently read past disk_max_entries.
+    """
+
+    name = "LLM"
+    schema = (
+        "CREATE TABLE IF NOT EXISTS llm_cache ("
+        "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+        "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)",
+    )
+    prune_every = PRUNE_EVERY_N_WRITES
+
+    def __init__(
+        self,
+        db_path: Optional[str] = LLM_CACHE_DB_PATH,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        disk_max_entries: int = LLM_CACHE_DISK_MAX_ENTRIES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        super().__init__(db_path, max_entries)
+
+    def _valid(self, entry: Tuple[str, float]) -> bool:
+        return entry[1] >= time.time()
+
+    # --- Disk tier ---
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+            return row
+
+    def _disk_set(self, key: str, entry: Tuple[str, float]) -> None:
+        self._disk_write(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, *entry, time.time())
+        )
+
+    def _prune(self) -> None:
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+
+    # --- Public API ---
+    async def get(self, key: str) -> Optional[str]:
+        entry = await self._lookup(key)
+        return entry[0] if entry is not None else None
+
+    async def set(self, key: str, value: str) -> None:
+        await self._store(key, (value, time.time() + self.ttl_seconds))
+
+
+llm_cache = LLMResponseCache() if LLM_CACHE_ENABLED else None
@@ -0,0 +1,56 @@
+import httpx
+import os
+import logging
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Connection Pool Configuration ---
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "64"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "32"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 without it"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared, long-lived async client used for all LLM calls.
+    The client is created lazily so it binds to the running event loop.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        http2 = LLM_HTTP2 and _http2_available()
+        _client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_SIZE,
+                max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        )
+        logger.info(f"Created LLM HTTP client (pool={LLM_POOL_SIZE}, http2={http2})")
+    return _client
+
+
+async def close_http_client() -> None:
+    """Closes the shared client; called on application shutdown"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed LLM HTTP client")
+    _client = None
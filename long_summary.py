@@ -0,0 +1,199 @@
+import asyncio
+import os
+import re
+import zlib
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+from token_budget import count_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Long Document Configuration ---
+CHUNK_MAX_TOKENS = int(os.getenv("LONG_DOC_CHUNK_TOKENS", "3000"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("LONG_DOC_OVERLAP_TOKENS", "150"))
+CHUNK_SUMMARY_MAX_TOKENS = 512
+REDUCE_INPUT_TOKENS = int(os.getenv("LONG_DOC_REDUCE_TOKENS", "6000"))
+FINAL_SUMMARY_MAX_TOKENS = 1024
+LONG_DOC_CONCURRENCY = int(os.getenv("LONG_DOC_CONCURRENCY", "4"))
+MAX_LONG_DOCUMENT_CHARS = int(os.getenv("MAX_LONG_DOCUMENT_CHARS", "2000000"))
+# A sentence whose hash is divisible by this closes a chunk once it is at least
+# half full, so chunk boundaries depend on local content rather than on
+# everything before them and an edit only changes the chunks around it.
+ANCHOR_MODULUS = 16
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+LLMCall = Callable[..., Awaitable[str]]
+
+
+def _stable_tokens(text: str) -> int:
+    # Uncalibrated so chunk boundaries, reduce groups and their cache keys never drift
+    return count_tokens(text, calibrated=False)
+
+
+def _split_sentences(text: str, max_tokens: int) -> List[str]:
+    max_chars = max_tokens * 4
+    sentences = []
+    for sentence in _SENTENCE_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        # Hard-split run-on "sentences" (tables, OCR noise) that exceed a chunk
+        while _stable_tokens(sentence) > max_tokens:
+            cut = sentence.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _is_anchor(sentence: str) -> bool:
+    return zlib.crc32(sentence.encode("utf-8")) % ANCHOR_MODULUS == 0
+
+
+def split_into_chunks(
+    text: str,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> List[str]:
+    """
+    Splits text into sentence-aligned chunks of at most max_tokens, each
+    starting with up to overlap_tokens of trailing context from the previous
+    chunk.
+    """
+    sentences = _split_sentences(text, max_tokens - overlap_tokens)
+    min_tokens = max_tokens // 2
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    fresh = 0  # sentences in `current` that are not overlap
+
+    def flush():
+        nonlocal current, current_tokens, fresh
+        chunks.append(' '.join(current))
+        overlap: List[str] = []
+        overlap_size = 0
+        for sentence in reversed(current):
+            size = _stable_tokens(sentence)
+            if overlap_size + size > overlap_tokens:
+                break
+            overlap.insert(0, sentence)
+            overlap_size += size
+        current, current_tokens, fresh = overlap, overlap_size, 0
+
+    for sentence in sentences:
+        size = _stable_tokens(sentence)
+        if fresh and current_tokens + size > max_tokens:
+            flush()
+        current.append(sentence)
+        current_tokens += size
+        fresh += 1
+        if current_tokens >= min_tokens and _is_anchor(sentence):
+            flush()
+
+    if fresh:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def build_chunk_messages(chunk: str, index: int, total: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": """You summarize one section of a longer document.
+            Use concise markdown bullet points. Keep every key concept, definition,
+            formula and named entity. Do not add an introduction or conclusion."""
+        },
+        {
+            "role": "user",
+            "content": f"""Summarize section {index + 1} of {total}:
+
+            {chunk}"""
+        }
+    ]
+
+
+def build_reduce_messages(section_summaries: List[str], final: bool = True) -> List[Dict[str, str]]:
+    joined = "\n\n".join(section_summaries)
+    if final:
+        instructions = """You are an expert at creating detailed, structured summaries.
+            Merge the section summaries below into one coherent summary of the whole document.
+            Use markdown formatting with headings (##) and bullet points.
+            Remove repetition and keep all key concepts in document order."""
+    else:
+        instructions = """Merge the consecutive section summaries below into one combined
+            section summary using concise markdown bullet points.
+            Remove repetition and keep all key concepts in order."""
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": f"""Section summaries:
+
+            {joined}"""}
+    ]
+
+
+def _group_by_budget(summaries: List[str], budget: int) -> List[List[str]]:
+    groups: List[List[str]] = [[]]
+    size = 0
+    for summary in summaries:
+        tokens = _stable_tokens(summary)
+        if groups[-1] and size + tokens > budget:
+            groups.append([])
+            size = 0
+        groups[-1].append(summary)
+        size += tokens
+    return groups
+
+
+async def condense_document(text: str, llm: LLMCall) -> List[str]:
+    """
+    Map phase plus any intermediate reduce rounds: summarizes every chunk
+    concurrently, then merges neighbouring summaries until they all fit in a
+    single final reduce call. Chunk summaries go through the LLM cache, so a
+    re-run only pays for chunks whose text changed.
+    """
+    if len(text) > MAX_LONG_DOCUMENT_CHARS:
+        logger.warning(f"Long document truncated to {MAX_LONG_DOCUMENT_CHARS} characters")
+        text = text[:MAX_LONG_DOCUMENT_CHARS]
+
+    chunks = split_into_chunks(text)
+    logger.info(f"Summarizing long document in {len(chunks)} chunks")
+    semaphore = asyncio.Semaphore(LONG_DOC_CONCURRENCY)
+
+    async def bounded(messages: List[Dict[str, str]]) -> str:
+        async with semaphore:
+            return await llm(messages, max_tokens=CHUNK_SUMMARY_MAX_TOKENS, temperature=0.3, cache=True)
+
+    summaries = await asyncio.gather(*[
+        bounded(build_chunk_messages(chunk, i, len(chunks)))
+        for i, chunk in enumerate(chunks)
+    ])
+
+    level = 1
+    while len(summaries) > 1 and sum(_stable_tokens(s) for s in summaries) > REDUCE_INPUT_TOKENS:
+        groups = _group_by_budget(summaries, REDUCE_INPUT_TOKENS)
+        if len(groups) == len(summaries):
+            # Every summary already fills a group on its own; merging pairs is the only way down
+            groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+        logger.info(f"Reduce level {level}: {len(summaries)} summaries -> {len(groups)}")
+        summaries = await asyncio.gather(*[
+            bounded(build_reduce_messages(group, final=False)) for group in groups
+        ])
+        level += 1
+
+    return list(summaries)
+
+
+async def summarize_long_document(text: str, llm: LLMCall) -> str:
+    """Map-reduce summary of a document of any length"""
+    sections = await condense_document(text, llm)
+    return await llm(
+        build_reduce_messages(sections),
+        max_tokens=FINAL_SUMMARY_MAX_TOKENS,
+        cache=True
+    )
@@ -0,0 +1,219 @@
+import os
+import time
+import zipfile
+import logging
+from typing import Dict, Optional, Tuple
+
+# Several OCR workers run side by side; one OpenMP thread each avoids oversubscribing cores
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from extractors import Source, open_source
+
+try:
+    from tesserocr import OEM, PSM, PyTessBaseAPI
+except ImportError:  # tesserocr is optional; fall back to the tesseract CLI
+    PyTessBaseAPI = None
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pypdfium2 is optional; without it scanned PDF pages stay empty
+    pdfium = None
+import pytesseract
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- OCR Configuration ---
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2400"))  # for images without trustworthy DPI (phone photos)
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "1") == "1"
+BINARIZE_WINDOW_FRACTION = 1 / 16  # local threshold window, relative to the shorter side
+BINARIZE_SENSITIVITY = 0.15        # pixel is ink if darker than local mean by this fraction
+TESSERACT_CONFIG = r'--oem 3 --psm 6'
+# Scanned notes at 250 DPI put 10-12pt text at the 25-30px x-height Tesseract
+# reads best, with ~30% fewer pixels to rasterize and binarize than 300 DPI
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "250"))
+
+# One Tesseract engine per worker process, created once and reused for every image
+_api = None
+
+
+def warm_up() -> None:
+    """Pool initializer: loads the Tesseract engine and language data once per worker"""
+    global _api
+    if PyTessBaseAPI is not None:
+        try:
+            _api = PyTessBaseAPI(lang=OCR_LANG, psm=PSM.SINGLE_BLOCK, oem=OEM.DEFAULT)
+            return
+        except Exception as e:
+            logger.warning(f"tesserocr unavailable, using tesseract CLI: {str(e)}")
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        # An initializer failure would break the whole pool; OCR jobs report it instead
+        logger.warning(f"Tesseract unavailable in OCR worker: {str(e)}")
+
+
+# Camera and screenshot defaults rather than a measured scan resolution
+PLACEHOLDER_DPIS = (72, 96)
+
+
+def _source_dpi(image: Image.Image) -> Optional[float]:
+    """The image's scan resolution, or None when it is missing or just a placeholder"""
+    dpi = image.info.get("dpi")
+    if not dpi or not dpi[0]:
+        return None
+    value = float(dpi[0])
+    if any(abs(value - placeholder) < 1 for placeholder in PLACEHOLDER_DPIS):
+        return None
+    return value if 72 <= value <= 2400 else None
+
+
+def _scale_factor(size: Tuple[int, int], dpi: Optional[float]) -> float:
+    if dpi:
+        # Scanner output with a real resolution: bring it down to the target DPI
+        factor = OCR_TARGET_DPI / dpi
+    else:
+        factor = OCR_MAX_SIDE / float(max(size))
+    return min(1.0, factor)
+
+
+def _window_sums(values: np.ndarray, half: int, axis: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sums over a sliding window of 2*half+1 along one axis, clipped at the edges"""
+    length = values.shape[axis]
+    cumulative = np.cumsum(values, axis=axis, dtype=np.int32)
+    pad = [(0, 0)] * values.ndim
+    pad[axis] = (1, 0)
+    cumulative = np.pad(cumulative, pad)
+    index = np.arange(length)
+    high = np.minimum(index + half + 1, length)
+    low = np.maximum(index - half, 0)
+    return np.take(cumulative, high, axis=axis) - np.take(cumulative, low, axis=axis), high - low
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """
+    Bradley-Roth adaptive threshold: each pixel is compared with the mean of
+    its neighbourhood (separable box sums, so the cost does not depend on the
+    window size). Unlike a global threshold this copes with shadows and
+    uneven lighting across a photographed page.
+    """
+    half = max(4, int(min(gray.shape) * BINARIZE_WINDOW_FRACTION) // 2)
+    column_sums, row_counts = _window_sums(gray, half, axis=0)
+    window_sums, col_counts = _window_sums(column_sums, half, axis=1)
+    area = row_counts[:, None] * col_counts[None, :]
+    ink = gray * area < window_sums * (1.0 - BINARIZE_SENSITIVITY)
+    return np.where(ink, 0, 255).astype(np.uint8)
+
+
+def preprocess(
+    image: Image.Image,
+    timings: Dict[str, float],
+    factor: Optional[float] = None,
+    dpi: Optional[float] = None
+) -> Tuple[Image.Image, Optional[int]]:
+    """
+    EXIF orientation, grayscale, DPI-normalizing downscale and adaptive
+    binarization. factor and dpi describe the image as decoded; when factor
+    is None both are read from the image itself.
+    """
+    if factor is None:
+        dpi = _source_dpi(image)
+        factor = _scale_factor(image.size, dpi)
+
+    started = time.perf_counter()
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+    timings["orient_grayscale_ms"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    if factor < 1.0:
+        size = (max(1, int(image.width * factor)), max(1, int(image.height * factor)))
+        image = image.resize(size, Image.LANCZOS)
+    resolution = int(dpi * min(1.0, factor)) if dpi else None
+    timings["resize_ms"] = (time.perf_counter() - started) * 1000
+
+    if OCR_BINARIZE:
+        started = time.perf_counter()
+        image = Image.fromarray(binarize(np.asarray(image)))
+        timings["binarize_ms"] = (time.perf_counter() - started) * 1000
+
+    return image, resolution
+
+
+def recognize(image: Image.Image, resolution: Optional[int] = None) -> str:
+    if _api is not None:
+        _api.SetImage(image)
+        if resolution:
+            _api.SetSourceResolution(resolution)
+        return _api.GetUTF8Text()
+    return pytesseract.image_to_string(image, lang=OCR_LANG, config=TESSERACT_CONFIG)
+
+
+def ocr_pil_image(
+    image: Image.Image,
+    timings: Optional[Dict[str, float]] = None,
+    factor: Optional[float] = None,
+    dpi: Optional[float] = None
+) -> Dict:
+    """OCRs an already-decoded image, e.g. a rasterized PDF page"""
+    timings = {} if timings is None else timings
+    image, resolution = preprocess(image, timings, factor, dpi)
+
+    started = time.perf_counter()
+    text = recognize(image, resolution)
+    timings["recognize_ms"] = (time.perf_counter() - started) * 1000
+    return {"text": text, "timings": timings}
+
+
+def ocr_image(source: Source) -> Dict:
+    """Decodes and OCRs one image file, returning its text and per-stage timings in ms"""
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    with open_source(source) as image_file:
+        image = Image.open(image_file)
+        dpi = _source_dpi(image)
+        factor = _scale_factor(image.size, dpi)
+        if image.format == "JPEG" and factor < 1.0:
+            # libjpeg can decode straight to grayscale at 1/2, 1/4 or 1/8 scale;
+            # preprocess only applies what that reduction left over
+            width = image.width
+            image.draft("L", (int(image.width * factor), int(image.height * factor)))
+            decoded = image.width / float(width)
+            factor /= decoded
+            dpi = dpi * decoded if dpi else None
+        image.load()
+    timings["decode_ms"] = (time.perf_counter() - started) * 1000
+    return ocr_pil_image(image, timings, factor, dpi)
+
+
+def ocr_pdf_page(source: Source, page_number: int, dpi: int = OCR_PDF_DPI) -> Dict:
+    """Rasterizes one 1-based PDF page with PDFium and OCRs it"""
+    if pdfium is None:
+        raise RuntimeError("pypdfium2 is not installed; scanned PDF pages cannot be OCRed")
+
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    pdf = pdfium.PdfDocument(source)
+    try:
+        page = pdf[page_number - 1]
+        image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+        page.close()
+    finally:
+        pdf.close()
+    timings["rasterize_ms"] = (time.perf_counter() - started) * 1000
+    return ocr_pil_image(image, timings, _scale_factor(image.size, dpi), dpi)
+
+
+def ocr_zip_member(source: Source, member: str) -> Dict:
+    """OCRs an image embedded in a DOCX/PPTX package, read straight from the zip"""
+    started = time.perf_counter()
+    with open_source(source, mapped=False) as package_file, zipfile.ZipFile(package_file) as archive:
+        data = archive.read(member)
+    unzip_ms = (time.perf_counter() - started) * 1000
+    result = ocr_image(data)
+    result["timings"]["unzip_ms"] = unzip_ms
+    return result
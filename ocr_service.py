@@ -0,0 +1,76 @@
+import os
+import time
+import logging
+from typing import Any, Dict
+
+import ocr
+from extraction_pool import ExtractionPool, EXTRACTION_MAX_QUEUE
+from extractors import Source
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- OCR Pool Configuration ---
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+OCR_TIMEOUT_S = float(os.getenv("OCR_TIMEOUT_S", "90"))
+
+
+class OCRStageTimings:
+    """Running per-stage timing totals reported by OCR workers, for /health"""
+
+    def __init__(self):
+        self.images = 0
+        self._counts: Dict[str, int] = {}
+        self._totals: Dict[str, float] = {}
+        self._maxima: Dict[str, float] = {}
+
+    def record(self, timings: Dict[str, float]) -> None:
+        self.images += 1
+        for stage, ms in timings.items():
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+            self._totals[stage] = self._totals.get(stage, 0.0) + ms
+            self._maxima[stage] = max(self._maxima.get(stage, 0.0), ms)
+
+    def stats(self) -> Dict[str, Any]:
+        # Not every stage runs for every image (e.g. rasterize only for PDF pages)
+        return {
+            "images": self.images,
+            "avg_ms": {stage: round(total / self._counts[stage], 1) for stage, total in self._totals.items()},
+            "max_ms": {stage: round(ms, 1) for stage, ms in self._maxima.items()}
+        }
+
+
+# Separate from the document extraction pool so slow OCR cannot starve PDF/DOCX
+# parsing, and so every worker keeps one Tesseract engine loaded
+ocr_pool = ExtractionPool(
+    workers=OCR_WORKERS,
+    max_queue=EXTRACTION_MAX_QUEUE,
+    timeout_s=OCR_TIMEOUT_S,
+    initializer=ocr.warm_up,
+    name="OCR"
+)
+ocr_timings = OCRStageTimings()
+
+
+async def run_ocr(fn, *args: Any) -> str:
+    """Runs an OCR job in the OCR pool, recording its stage timings and queue wait"""
+    started = time.perf_counter()
+    result = await ocr_pool.run(fn, *args)
+    timings = result["timings"]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    timings["queue_transfer_ms"] = max(0.0, elapsed_ms - sum(timings.values()))
+    ocr_timings.record(timings)
+    return result["text"]
+
+
+async def ocr_image(source: Source) -> str:
+    return await run_ocr(ocr.ocr_image, source)
+
+
+async def ocr_pdf_page(source: Source, page_number: int) -> str:
+    return await run_ocr(ocr.ocr_pdf_page, source, page_number)
+
+
+async def ocr_zip_member(source: Source, member: str) -> str:
+    return await run_ocr(ocr.ocr_zip_member, source, member)
+
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import logging
+from typing import Dict, List, Tuple
+
+from extraction_pool import extraction_pool
+from extractors import Source
+from ocr_service import ocr_pool, ocr_zip_member
+from office_xml import docx_blocks, pptx_blocks
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Office Extraction Configuration ---
+OFFICE_OCR_IMAGES = os.getenv("OFFICE_OCR_IMAGES", "1") == "1"
+
+OFFICE_EXTRACTORS = {
+    "docx": (docx_blocks, "DOCX"),
+    "pptx": (pptx_blocks, "PPT"),
+}
+
+
+async def extract_office_text(source: Source, kind: str) -> Tuple[str, int]:
+    """
+    Streams a DOCX ("docx") or PPTX ("pptx") in the extraction pool, then OCRs
+    its embedded images in parallel on the OCR pool and splices their text in
+    where each image sits. Returns the text and how many images were OCRed.
+    """
+    extractor, label = OFFICE_EXTRACTORS[kind]
+    result = await extraction_pool.run(extractor, source, OFFICE_OCR_IMAGES)
+    blocks: List[str] = result["blocks"]
+    images: List[Tuple[int, str]] = result["images"]
+
+    image_text: Dict[int, List[str]] = {}
+    if images:
+        slots = asyncio.Semaphore(ocr_pool.workers)
+
+        async def ocr_one(member: str) -> str:
+            async with slots:
+                return await ocr_zip_member(source, member)
+
+        texts = await asyncio.gather(*[ocr_one(member) for _, member in images], return_exceptions=True)
+        for (index, member), text in zip(images, texts):
+            if isinstance(text, BaseException):
+                logger.warning(f"OCR failed for embedded image {member}: {str(text)}")
+            elif text.strip():
+                image_text.setdefault(index, []).append(text.strip())
+
+    if image_text:
+        merged = []
+        for index in range(len(blocks) + 1):
+            merged.extend(image_text.get(index, []))
+            if index < len(blocks):
+                merged.append(blocks[index])
+        blocks = merged
+
+    extracted_text = '\n'.join(blocks)
+    if not extracted_text.strip():
+        raise ValueError(f"No readable text found in {label}")
+    return extracted_text, sum(len(texts) for texts in image_text.values())
@@ -0,0 +1,282 @@
+import os
+import posixpath
+import zipfile
+import logging
+from typing import Dict, FrozenSet, IO, List, Optional, Tuple
+
+from lxml import etree
+
+from extractors import Source, open_source
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Streaming DOCX/PPTX text extraction straight from the OOXML parts. Runs in
+# extraction pool workers. Each part is read with lxml.iterparse and every
+# paragraph or table row is released as soon as its text is taken, so memory
+# stays flat however long the document is. No python-docx/python-pptx object
+# model is built.
+
+# --- Office Extraction Configuration ---
+OFFICE_OCR_MIN_IMAGE_BYTES = int(os.getenv("OFFICE_OCR_MIN_IMAGE_BYTES", str(8 * 1024)))  # skips icons and bullets
+OFFICE_OCR_MAX_IMAGES = int(os.getenv("OFFICE_OCR_MAX_IMAGES", "20"))
+OCR_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.gif')
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+V = "{urn:schemas-microsoft-com:vml}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+PACKAGE_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+
+# Slide furniture that python-pptx would also report but that is noise for study material
+SKIPPED_PLACEHOLDERS = frozenset({"sldNum", "dt", "ftr", "hdr", "sldImg"})
+
+# Extracted document: text blocks in document order, plus embedded images to
+# OCR as (index in blocks to insert the image's text at, zip member name)
+OfficeBlocks = Dict[str, list]
+
+
+class _Dialect:
+    """Element names for one OOXML vocabulary (WordprocessingML or DrawingML text)"""
+
+    def __init__(
+        self,
+        paragraph: str,
+        run: str,
+        text: str,
+        breaks: FrozenSet[str],
+        tab: Optional[str],
+        row: str,
+        cell: str,
+        shape: Optional[str] = None
+    ):
+        self.paragraph = paragraph
+        self.run = run
+        self.text = text
+        self.breaks = breaks
+        self.tab = tab
+        self.row = row
+        self.cell = cell
+        self.shape = shape
+
+
+WORD = _Dialect(W + "p", W + "r", W + "t", frozenset({W + "br", W + "cr"}), W + "tab", W + "tr", W + "tc")
+DRAWING = _Dialect(A + "p", A + "r", A + "t", frozenset({A + "br"}), None, A + "tr", A + "tc", shape=P + "sp")
+IMAGE_REFS = {A + "blip": R + "embed", V + "imagedata": R + "id"}
+
+
+def _read_rels(archive: zipfile.ZipFile, part: str) -> List[Tuple[str, str, str]]:
+    """(id, type, zip member) of one part's internal relationships, in file order"""
+    folder, name = posixpath.split(part)
+    rels_name = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_name not in archive.NameToInfo:
+        return []
+    with archive.open(rels_name) as rels_file:
+        root = etree.parse(rels_file).getroot()
+    rels = []
+    for rel in root.iter(PACKAGE_RELS):
+        target = rel.get("Target", "")
+        if rel.get("TargetMode") == "External" or not target:
+            continue
+        if target.startswith("/"):
+            member = target.lstrip("/")
+        else:
+            member = posixpath.normpath(posixpath.join(folder, target))
+        rels.append((rel.get("Id"), rel.get("Type", ""), member))
+    return rels
+
+
+def _part_rels(archive: zipfile.ZipFile, part: str) -> Dict[str, str]:
+    return {rel_id: member for rel_id, _, member in _read_rels(archive, part)}
+
+
+def _rels_of_type(archive: zipfile.ZipFile, part: str, rel_type: str) -> List[str]:
+    return [member for _, type_, member in _read_rels(archive, part) if type_.endswith(rel_type)]
+
+
+def _main_part(archive: zipfile.ZipFile) -> str:
+    for member in _rels_of_type(archive, "", "/officeDocument"):
+        return member
+    raise ValueError("Not an Office Open XML document")
+
+
+def _stream_blocks(
+    xml_file: IO[bytes],
+    dialect: _Dialect,
+    rels: Dict[str, str],
+    images: Optional[List[Tuple[int, str]]] = None
+) -> List[str]:
+    """
+    Text blocks of one XML part in document order: one per paragraph, and one
+    per table row with its cells joined by " | " (nested tables fold into the
+    enclosing cell). Text boxes come out as paragraphs of their own, and
+    mc:Fallback copies of them are skipped. Image references are appended
+    to images as (index, member), placed after the block that contains them.
+    """
+    blocks: List[str] = []
+    runs: List[List[str]] = []        # open paragraphs (text boxes nest), innermost last
+    cells: List[List[str]] = []       # open table cells
+    rows: List[List[str]] = []        # open table rows
+    shapes: List[bool] = []           # open shapes, True if a skipped placeholder
+    pending_images: List[str] = []
+    fallback_depth = 0
+
+    for event, elem in etree.iterparse(
+        xml_file, events=("start", "end"), resolve_entities=False, huge_tree=True
+    ):
+        tag = elem.tag
+        if tag == MC_FALLBACK:
+            fallback_depth += 1 if event == "start" else -1
+            if event == "end":
+                elem.clear(keep_tail=True)
+            continue
+        if fallback_depth:
+            continue
+
+        if event == "start":
+            if tag == dialect.paragraph:
+                runs.append([])
+            elif tag == dialect.cell:
+                cells.append([])
+            elif tag == dialect.row:
+                rows.append([])
+            elif tag == dialect.shape:
+                shapes.append(False)
+            elif tag == P + "ph" and shapes and elem.get("type") in SKIPPED_PLACEHOLDERS:
+                shapes[-1] = True
+            continue
+
+        finished = None
+        if tag == dialect.text:
+            if runs and elem.text:
+                runs[-1].append(elem.text)
+        elif tag in dialect.breaks:
+            if runs:
+                runs[-1].append("\n")
+        elif tag == dialect.tab:
+            # w:tab is also a tab stop definition inside paragraph properties
+            if runs and elem.getparent().tag == dialect.run:
+                runs[-1].append("\t")
+        elif tag == dialect.paragraph:
+            finished = "".join(runs.pop()).strip()
+            if shapes and shapes[-1]:
+                finished = ""
+        elif tag == dialect.cell:
+            cell = " ".join(cells.pop())
+            if rows:
+                rows[-1].append(cell)
+        elif tag == dialect.row:
+            cell_texts = rows.pop()
+            finished = " | ".join(cell_texts).strip() if any(cell_texts) else ""
+        elif tag == dialect.shape:
+            shapes.pop()
+        elif tag in IMAGE_REFS:
+            member = rels.get(elem.get(IMAGE_REFS[tag]))
+            if images is not None and member:
+                pending_images.append(member)
+
+        if finished is None:
+            continue
+        if finished:
+            (cells[-1] if cells else blocks).append(finished)
+        if not cells and pending_images:
+            images.extend((len(blocks), member) for member in pending_images)
+            pending_images.clear()
+        # Everything before this paragraph/row has been read: drop it
+        elem.clear(keep_tail=True)
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+    if pending_images:
+        images.extend((len(blocks), member) for member in pending_images)
+    return blocks
+
+
+def _ocr_candidates(archive: zipfile.ZipFile, images: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+    """Keeps the first reference to each raster image big enough to hold text, up to the cap"""
+    seen = set()
+    kept = []
+    for index, member in images:
+        if member in seen or not member.lower().endswith(OCR_IMAGE_EXTENSIONS):
+            continue
+        seen.add(member)
+        info = archive.NameToInfo.get(member)
+        if info is None or info.file_size < OFFICE_OCR_MIN_IMAGE_BYTES:
+            continue
+        kept.append((index, member))
+        if len(kept) >= OFFICE_OCR_MAX_IMAGES:
+            break
+    return kept
+
+
+def docx_blocks(source: Source, collect_images: bool = False) -> OfficeBlocks:
+    """Paragraphs and table rows of a Word document's body, in order"""
+    with open_source(source, mapped=False) as docx_file:
+        try:
+            archive = zipfile.ZipFile(docx_file)
+        except zipfile.BadZipFile:
+            raise ValueError("File is not a valid DOCX document")
+        with archive:
+            part = _main_part(archive)
+            images: Optional[List[Tuple[int, str]]] = [] if collect_images else None
+            with archive.open(part) as xml_file:
+                blocks = _stream_blocks(xml_file, WORD, _part_rels(archive, part), images)
+            return {
+                "blocks": blocks,
+                "images": _ocr_candidates(archive, images) if images else []
+            }
+
+
+def pptx_blocks(source: Source, collect_images: bool = False) -> OfficeBlocks:
+    """
+    Slide text in slide order (shapes, grouped shapes and tables), each slide
+    headed by its number and followed by its speaker notes
+    """
+    with open_source(source, mapped=False) as ppt_file:
+        try:
+            archive = zipfile.ZipFile(ppt_file)
+        except zipfile.BadZipFile:
+            raise ValueError("File is not a valid PPTX document (legacy .ppt is not supported)")
+        with archive:
+            presentation = _main_part(archive)
+            slide_rels = _part_rels(archive, presentation)
+            with archive.open(presentation) as xml_file:
+                slide_ids = [
+                    elem.get(R + "id")
+                    for _, elem in etree.iterparse(xml_file, tag=P + "sldId", resolve_entities=False)
+                ]
+
+            blocks: List[str] = []
+            images: Optional[List[Tuple[int, str]]] = [] if collect_images else None
+            for number, slide_id in enumerate(slide_ids, start=1):
+                slide = slide_rels.get(slide_id)
+                if slide is None or slide not in archive.NameToInfo:
+                    continue
+                slide_images: Optional[List[Tuple[int, str]]] = [] if collect_images else None
+                with archive.open(slide) as xml_file:
+                    slide_blocks = _stream_blocks(xml_file, DRAWING, _part_rels(archive, slide), slide_images)
+
+                notes_blocks: List[str] = []
+                for notes in _rels_of_type(archive, slide, "/notesSlide"):
+                    if notes in archive.NameToInfo:
+                        with archive.open(notes) as xml_file:
+                            notes_blocks.extend(_stream_blocks(xml_file, DRAWING, {}))
+
+                if not slide_blocks and not notes_blocks and not slide_images:
+                    continue
+                offset = len(blocks) + 1
+                blocks.append(f"Slide {number}")
+                blocks.extend(slide_blocks)
+                if notes_blocks:
+                    blocks.append("Notes: " + "\n".join(notes_blocks))
+                if slide_images:
+                    images.extend((offset + index, member) for index, member in slide_images)
+
+            return {
+                "blocks": blocks,
+                "images": _ocr_candidates(archive, images) if images else []
+            }
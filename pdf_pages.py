@@ -0,0 +1,151 @@
+import asyncio
+import os
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from extraction_pool import extraction_pool
+from extractors import Source, pdf_page_count, pdf_pages_to_text
+from ocr_service import ocr_pdf_page, ocr_pool
+from token_budget import count_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Page Extraction Configuration ---
+PDF_PAGES_PER_JOB = int(os.getenv("PDF_PAGES_PER_JOB", "8"))
+MAX_PAGE_SPEC_PAGES = 5000
+
+Page = Tuple[int, str]
+
+
+def parse_page_ranges(spec: str, max_pages: int = MAX_PAGE_SPEC_PAGES) -> List[int]:
+    """Parses a 1-based page selection like "1-5,8,10-12" into sorted page numbers"""
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        first = int(start)
+        last = int(end) if end else first
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {part}")
+        pages.update(range(first, min(last, first + max_pages) + 1))
+        if len(pages) > max_pages:
+            raise ValueError(f"At most {max_pages} pages can be selected")
+    if not pages:
+        raise ValueError("No pages selected")
+    return sorted(pages)
+
+
+async def _extract_range(
+    source: Source,
+    page_numbers: List[int],
+    ocr_slots: asyncio.Semaphore
+) -> Tuple[List[Page], List[int]]:
+    """
+    Text-layer extraction for one page range, then OCR for just the pages in
+    it that turned out to be scans. Returns the pages in order and the page
+    numbers whose text came from OCR.
+    """
+    pages = await extraction_pool.run(pdf_pages_to_text, source, page_numbers)
+    scanned = [number for number, _, is_scan in pages if is_scan]
+    if not scanned:
+        return [(number, text) for number, text, _ in pages], []
+
+    async def ocr_one(number: int) -> str:
+        async with ocr_slots:
+            return await ocr_pdf_page(source, number)
+
+    ocr_text: Dict[int, str] = {}
+    results = await asyncio.gather(*[ocr_one(number) for number in scanned], return_exceptions=True)
+    for number, result in zip(scanned, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"OCR failed for PDF page {number}: {str(result)}")
+        else:
+            ocr_text[number] = result
+    return [(number, ocr_text.get(number, text)) for number, text, _ in pages], sorted(ocr_text)
+
+
+async def extract_pdf_pages(
+    source: Source,
+    page_numbers: Optional[List[int]] = None,
+    max_tokens: Optional[int] = None,
+    max_chars: Optional[int] = None
+) -> Tuple[List[Page], int, List[int]]:
+    """
+    Extracts PDF pages in parallel ranges across the extraction pool.
+
+    Ranges are scheduled in page order, at most one per worker at a time.
+    Pages without a text layer are rasterized and OCRed in parallel on the
+    OCR pool as part of their range, so scanned and text pages merge in page
+    order. Completed ranges are consumed in order, and once the pages so far
+    reach max_tokens or max_chars no further ranges are scheduled and queued
+    ones are cancelled, since downstream would throw that text away anyway.
+    Returns the (page number, text) pairs kept, the document's page count
+    and the page numbers that were OCRed.
+    """
+    page_count = await extraction_pool.run(pdf_page_count, source)
+    if page_numbers is None:
+        page_numbers = list(range(1, page_count + 1))
+    else:
+        page_numbers = [n for n in page_numbers if n <= page_count]
+        if not page_numbers:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Requested pages are out of range; the document has {page_count} pages"
+            )
+
+    ranges = [
+        page_numbers[i:i + PDF_PAGES_PER_JOB]
+        for i in range(0, len(page_numbers), PDF_PAGES_PER_JOB)
+    ]
+    results: Dict[int, Tuple[List[Page], List[int]]] = {}
+    ocr_slots = asyncio.Semaphore(ocr_pool.workers)
+    running: Dict[asyncio.Future, int] = {}
+    next_range = 0
+    consumed = 0
+    tokens = chars = 0
+    budget_met = False
+
+    try:
+        while running or (next_range < len(ranges) and not budget_met):
+            while not budget_met and next_range < len(ranges) and len(running) < extraction_pool.workers:
+                task = asyncio.ensure_future(_extract_range(source, ranges[next_range], ocr_slots))
+                running[task] = next_range
+                next_range += 1
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                results[running.pop(task)] = task.result()
+
+            while consumed in results and not budget_met:
+                for _, text in results[consumed][0]:
+                    chars += len(text)
+                    if max_tokens is not None:
+                        tokens += count_tokens(text, calibrated=False)
+                consumed += 1
+                budget_met = (
+                    (max_tokens is not None and tokens >= max_tokens)
+                    or (max_chars is not None and chars >= max_chars)
+                )
+
+            if budget_met:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                running.clear()
+    finally:
+        for task in running:
+            task.cancel()
+
+    if budget_met and consumed < len(ranges):
+        logger.info(f"PDF extraction stopped early after {consumed} of {len(ranges)} page ranges")
+
+    pages = [page for index in range(consumed) for page in results[index][0]]
+    ocr_pages = [number for index in range(consumed) for number in results[index][1]]
+    if ocr_pages:
+        logger.info(f"OCRed {len(ocr_pages)} scanned PDF pages")
+    return pages, page_count, ocr_pages
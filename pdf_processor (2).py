@@ -1,23 +1,55 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import requests
+import httpx
+import asyncio
 import os
 import json
 import random
-import io
 import time
 import math
-from typing import Union, List, Dict
-from bs4 import BeautifulSoup
+from typing import Any, Union, List, Dict, AsyncIterator, Awaitable, Callable, Optional, Tuple
 import re
-from docx import Document
-from PIL import Image
-import pytesseract
-from pdfminer.high_level import extract_text as pdf_extract_text
-from pptx import Presentation
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs
-from usage_limiter import enforce_usage_limit
+from usage_limiter import enforce_usage_limit, get_authenticated_user_id, charge_usage_batch
+from llm_client import get_http_client, LLM_READ_TIMEOUT
+from llm_cache import llm_cache, make_cache_key
+from singleflight import llm_singleflight
+from rate_limiter import llm_rate_limiter, parse_retry_after
+from resilience import (
+    Deadline, hedged_call, llm_circuit_breaker, llm_latency,
+    LLM_CALL_BUDGET_S, LLM_MIN_ATTEMPT_S, LLM_HEDGING
+)
+from token_budget import (
+    count_tokens, truncate_to_tokens, fit_to_context, output_budget, record_usage,
+    LLM_INPUT_TOKEN_BUDGET
+)
+from extraction_pool import extraction_pool
+from upload_ingest import (
+    SpooledUpload, spooled_upload, spooled_bytes,
+    MAX_FILE_SIZE_MB, UPLOAD_BATCH_MAX_FILES, UPLOAD_BATCH_CONCURRENCY
+)
+from extraction_cache import extraction_cache, make_extraction_key
+from extractors import html_to_text
+from office_docs import extract_office_text
+from ocr_service import ocr_image
+from pdf_pages import extract_pdf_pages, parse_page_ranges
+from json_stream import JSONObjectStreamParser, parse_json_items
+from text_normalize import normalize_text, strip_page_furniture, truncate_text
+from url_fetch import (
+    FetchResult, fetch_article, fetch_error, normalize_url, document_kind,
+    DOCUMENT_CONTENT_TYPES, LINKED_CONTENT_TYPES, URL_FETCH_MAX_BYTES,
+    URL_BATCH_MAX_URLS, URL_BATCH_CONCURRENCY
+)
+from youtube_transcripts import (
+    TranscriptFetcher, TranscriptUnavailable, extract_video_id, get_transcript,
+    get_transcript_fetcher, transcript_text, chunk_segments, TRANSCRIPT_CHUNK_TOKENS
+)
+from long_summary import (
+    summarize_long_document, condense_document, build_reduce_messages,
+    FINAL_SUMMARY_MAX_TOKENS, MAX_LONG_DOCUMENT_CHARS
+)
 import logging
 
 # Configure logging
@@ -30,16 +62,25 @@ router = APIRouter()
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
 TOGETHER_API_URL = "https://api.together.xyz/v1/chat/completions"
 TOGETHER_MODEL = "mistralai/Mixtral-8x7B-Instruct-v0.1"
-MAX_LLM_INPUT_CHARS = 28000
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-MAX_FILE_SIZE_MB = 10
 MAX_RETRIES = 3
 RETRY_DELAY = 1
 
+# Study pack artifact -> usage feature charged for it
+STUDY_PACK_ARTIFACTS = {
+    "summary": "summaries",
+    "questions": "questions",
+    "flashcards": "flashcards",
+    "vocabulary": "vocabulary",
+    "mindmap": "diagrams"
+}
+
 # Validate required environment variables
 if not TOGETHER_API_KEY:
     raise ValueError("TOGETHER_API_KEY environment variable not set")
 
+SHA256_RE = re.compile(r'[0-9a-f]{64}')
+
 HEADERS = {
     "Authorization": f"Bearer {TOGETHER_API_KEY}",
     "Content-Type": "application/json",
@@ -50,6 +91,10 @@ HEADERS = {
 class ContentRequest(BaseModel):
     text: str
 
+class SummarizeRequest(BaseModel):
+    text: str
+    long_document: bool = False  # map-reduce over the full text instead of a single call
+
 class GenerateQuestionsRequest(BaseModel):
     text: str
     difficulty: str = "medium"
@@ -64,6 +109,29 @@ class URLRequest(BaseModel):
 
 class YouTubeURLRequest(BaseModel):
     youtube_url: str
+    language: Optional[str] = None       # caption language code, e.g. "en" or "hi"; default track if omitted
+    include_segments: bool = False       # also return every timestamped caption line
+    chunk_tokens: Optional[int] = None   # chunk size for summarization; TRANSCRIPT_CHUNK_TOKENS if omitted
+    full_text: bool = False              # extracted_text not cut at the single-call LLM limit
+
+class TranscriptSegment(BaseModel):
+    start: float     # seconds from the start of the video
+    duration: float
+    text: str
+
+class TranscriptChunk(BaseModel):
+    start: float
+    end: float
+    text: str
+
+class YouTubeContentResponse(BaseModel):
+    extracted_text: str
+    video_id: str
+    language: str
+    title: Optional[str] = None
+    duration: Optional[float] = None   # seconds
+    chunks: List[TranscriptChunk]
+    segments: Optional[List[TranscriptSegment]] = None
 
 class FlashcardsRequest(BaseModel):
     text: str
@@ -85,10 +153,61 @@ class HandwrittenRequest(BaseModel):
     text: str
     style: str = "neat"  # neat, casual, messy
 
+class StudyPackRequest(BaseModel):
+    text: str
+    artifacts: List[str] = ["summary", "questions", "flashcards", "vocabulary", "mindmap"]
+    difficulty: str = "medium"
+    count: int = 5
+    long_document: bool = False
+
+class PageOffset(BaseModel):
+    page: int   # 1-based page number
+    start: int  # character offsets into extracted_text
+    end: int
+
 class FileUploadResponse(BaseModel):
     extracted_text: str
     file_type: str
     file_size: int
+    page_count: Optional[int] = None
+    pages: Optional[List[PageOffset]] = None
+    ocr_pages: Optional[List[int]] = None  # PDF pages with no text layer, read by OCR
+    ocr_images: Optional[int] = None  # DOCX/PPTX embedded images whose text was OCRed
+
+class BatchFileResult(BaseModel):
+    filename: str
+    result: Optional[FileUploadResponse] = None
+    status_code: Optional[int] = None  # set with error when this file failed
+    error: Optional[str] = None
+
+class FileSection(BaseModel):
+    filename: str
+    start: int  # character offsets into combined_text
+    end: int
+    truncated: bool
+
+class BatchUploadResponse(BaseModel):
+    files: List[BatchFileResult]
+    combined_text: str
+    sections: List[FileSection]
+
+class BatchURLRequest(BaseModel):
+    urls: List[str]
+    full_text: bool = False
+    stream: bool = False
+
+class BatchURLResult(BaseModel):
+    url: str                       # normalized URL, or the submitted text if it is not a valid URL
+    submitted: List[str]           # the submitted URLs that normalize to it
+    source: Optional[str] = None   # html, pdf, docx or pptx
+    extracted_text: Optional[str] = None
+    status_code: Optional[int] = None  # set with error when this URL failed
+    error: Optional[str] = None
+
+class BatchURLResponse(BaseModel):
+    results: List[BatchURLResult]
+    combined_text: str
+    sections: List[FileSection]  # filename holds the URL
 
 class QuestionItem(BaseModel):
     text: str
@@ -104,24 +223,46 @@ class VocabularyItem(BaseModel):
     definition: str
 
 # --- Helper Functions ---
-def validate_file_size(file: UploadFile) -> None:
-    max_size = MAX_FILE_SIZE_MB * 1024 * 1024
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset pointer
-    if file_size > max_size:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File size exceeds maximum allowed {MAX_FILE_SIZE_MB}MB"
-        )
-
 async def call_together_ai(
     prompt_messages: List[Dict[str, str]],
     temperature: float = 0.7,
     max_tokens: int = 1024,
-    retries: int = MAX_RETRIES
+    retries: int = MAX_RETRIES,
+    cache: bool = False
 ) -> str:
-    payload = {
+    """
+    Sends a chat completion request to Together AI.
+    With cache=True, identical requests (same model, messages, temperature and
+    max_tokens) are served from the LLM response cache, and identical requests
+    in flight at the same time share one upstream call. Uncached sampling
+    requests (rewrites meant to differ per user) always get a call of their own.
+    """
+    prompt_messages, max_tokens = fit_to_context(prompt_messages, max_tokens)
+    cache_key = make_cache_key(TOGETHER_MODEL, prompt_messages, temperature, max_tokens)
+    use_cache = cache and llm_cache is not None
+    if use_cache:
+        cached = await llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving Together AI response from cache")
+            return cached
+
+    async def fetch() -> str:
+        payload = _build_payload(prompt_messages, temperature, max_tokens)
+        content = await _post_together_ai(payload, retries)
+        if use_cache:
+            await llm_cache.set(cache_key, content)
+        return content
+
+    if not cache and temperature > 0:
+        return await fetch()
+    return await llm_singleflight.do(cache_key, fetch)
+
+def _build_payload(
+    prompt_messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int
+) -> Dict:
+    return {
         "model": TOGETHER_MODEL,
         "messages": prompt_messages,
         "temperature": temperature,
@@ -132,36 +273,102 @@ async def call_together_ai(
         "stop": ["</s>"]
     }
 
-    for attempt in range(retries):
-        try:
-            logger.info(f"Calling Together AI API (attempt {attempt + 1})")
+async def _attempt_together_ai(payload: Dict, deadline: Deadline) -> str:
+    """One upstream call, bounded by the remaining request budget"""
+    llm_circuit_breaker.before_call()
+    client = get_http_client()
+    healthy: Optional[bool] = None
+
+    try:
+        async with llm_rate_limiter.slot() as slot:
+            logger.info(f"Calling Together AI API ({deadline.remaining():.0f}s budget left)")
             start_time = time.time()
             
-            response = requests.post(
+            response = await client.post(
                 TOGETHER_API_URL,
                 headers=HEADERS,
                 json=payload,
-                timeout=30
+                timeout=max(0.1, min(LLM_READ_TIMEOUT, deadline.remaining()))
             )
+            if response.status_code == 429:
+                slot.rate_limited(parse_retry_after(response.headers.get("Retry-After")))
             response.raise_for_status()
+            slot.succeeded()
+        
+        result = response.json()
+        if not result or "choices" not in result or not result["choices"]:
+            raise ValueError("Invalid response structure from Together AI")
             
-            result = response.json()
-            if not result or "choices" not in result or not result["choices"]:
-                raise ValueError("Invalid response structure from Together AI")
-                
-            elapsed_time = time.time() - start_time
-            logger.info(f"API call completed in {elapsed_time:.2f}s")
-            
-            return result["choices"][0]["message"]["content"]
+        elapsed_time = time.time() - start_time
+        llm_latency.record(elapsed_time)
+        record_usage(payload["messages"], payload["max_tokens"], result.get("usage"))
+        logger.info(f"API call completed in {elapsed_time:.2f}s")
+        
+        healthy = True
+        return result["choices"][0]["message"]["content"]
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code >= 500:
+            healthy = False
+        raise
+    except (httpx.RequestError, ValueError):
+        healthy = False
+        raise
+    except asyncio.CancelledError:
+        # Cut off by the request budget: the upstream is too slow. A hedge
+        # loser is cancelled with budget left and is not held against it.
+        if deadline.expired():
+            healthy = False
+        raise
+    finally:
+        llm_circuit_breaker.record(healthy)
+
+async def _post_together_ai(
+    payload: Dict,
+    retries: int = MAX_RETRIES,
+    budget: float = LLM_CALL_BUDGET_S
+) -> str:
+    """
+    Calls Together AI with retries that only run while the request budget has
+    room for another attempt. With LLM_HEDGING on, a duplicate request is sent
+    once an attempt is slower than the recent p95 and the first answer wins.
+    """
+    deadline = Deadline(budget)
+
+    for attempt in range(retries):
+        if attempt and deadline.remaining() < LLM_MIN_ATTEMPT_S:
+            logger.warning("Not retrying: AI request time budget exhausted")
+            raise HTTPException(
+                status_code=504,
+                detail="AI request timed out"
+            )
+
+        try:
+            hedge_delay = llm_latency.hedge_delay()
+            if LLM_HEDGING and deadline.remaining() > hedge_delay:
+                call = hedged_call(lambda: _attempt_together_ai(payload, deadline), hedge_delay)
+            else:
+                call = _attempt_together_ai(payload, deadline)
+            # httpx timeouts are per read; this bounds the whole attempt
+            return await asyncio.wait_for(call, timeout=deadline.remaining())
+
+        except asyncio.TimeoutError:
+            logger.error("AI request exceeded its time budget")
+            raise HTTPException(
+                status_code=504,
+                detail="AI request timed out"
+            )
         
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             error_msg = f"HTTP Error: {e.response.status_code} - {e.response.text}"
             logger.error(error_msg)
             
             if e.response.status_code == 429:
-                wait_time = min((2 ** attempt) * RETRY_DELAY, 60)
-                logger.warning(f"Rate limited. Waiting {wait_time}s before retry...")
-                time.sleep(wait_time)
+                # The limiter already holds every caller back for Retry-After;
+                # full jitter spreads the retries so they don't land together
+                wait_time = random.uniform(0, min((2 ** attempt) * RETRY_DELAY, 60, deadline.remaining()))
+                logger.warning(f"Rate limited. Waiting {wait_time:.2f}s before retry...")
+                await asyncio.sleep(wait_time)
                 continue
                 
             raise HTTPException(
@@ -169,14 +376,18 @@ async def call_together_ai(
                 detail=f"Together AI API error: {error_msg}"
             )
             
-        except requests.exceptions.RequestException as e:
+        except httpx.RequestError as e:
             logger.error(f"Request failed: {str(e)}")
             if attempt == retries - 1:
                 raise HTTPException(
-                    status_code=503,
+                    status_code=504 if deadline.expired() else 503,
                     detail="Service temporarily unavailable"
                 )
-            time.sleep(RETRY_DELAY)
+            await asyncio.sleep(min(RETRY_DELAY, deadline.remaining()))
+
+        except HTTPException:
+            # Circuit breaker or limiter rejections: retrying would not help
+            raise
             
         except Exception as e:
             logger.error(f"Unexpected error: {str(e)}")
@@ -185,100 +396,270 @@ async def call_together_ai(
                     status_code=500,
                     detail=f"Failed to process AI request: {str(e)}"
                 )
-            time.sleep(RETRY_DELAY)
+            await asyncio.sleep(min(RETRY_DELAY, deadline.remaining()))
 
     raise HTTPException(
         status_code=500,
         detail="Failed to call Together AI after multiple attempts"
     )
 
-async def extract_text_from_pdf(pdf_file: UploadFile) -> str:
-    try:
-        logger.info(f"Extracting text from PDF: {pdf_file.filename}")
-        pdf_bytes = await pdf_file.read()
-        
-        if not pdf_bytes:
-            raise ValueError("Empty PDF file")
-            
-        text = pdf_extract_text(io.BytesIO(pdf_bytes))
-        if not text.strip():
-            raise ValueError("No readable text found in PDF")
-            
-        return text
-        
-    except Exception as e:
-        logger.error(f"PDF extraction error: {str(e)}")
+async def stream_together_ai(
+    prompt_messages: List[Dict[str, str]],
+    temperature: float = 0.7,
+    max_tokens: int = 1024,
+    retries: int = MAX_RETRIES,
+    cache: bool = False,
+    budget: float = LLM_CALL_BUDGET_S
+) -> AsyncIterator[str]:
+    """
+    Streams content deltas from Together AI as they are generated.
+    Retries only happen before the first token is received and only while
+    the request budget has room for another attempt. Once the stream
+    completes, the assembled text is written to the LLM response cache.
+    """
+    prompt_messages, max_tokens = fit_to_context(prompt_messages, max_tokens)
+    cache_key = None
+    if cache and llm_cache is not None:
+        cache_key = make_cache_key(TOGETHER_MODEL, prompt_messages, temperature, max_tokens)
+        cached = await llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving Together AI stream from cache")
+            yield cached
+            return
+
+    payload = _build_payload(prompt_messages, temperature, max_tokens)
+    payload["stream"] = True
+    client = get_http_client()
+    parts: List[str] = []
+    deadline = Deadline(budget)
+
+    for attempt in range(retries):
+        if attempt and deadline.remaining() < LLM_MIN_ATTEMPT_S:
+            logger.warning("Not retrying stream: AI request time budget exhausted")
+            raise HTTPException(
+                status_code=504,
+                detail="AI request timed out"
+            )
+
+        llm_circuit_breaker.before_call()
+        healthy: Optional[bool] = None
+        try:
+            logger.info(
+                f"Streaming from Together AI API (attempt {attempt + 1}, {deadline.remaining():.0f}s budget left)"
+            )
+            start_time = time.time()
+            # Bounds the wait for the response and for every chunk after it
+            timeout = max(0.1, min(LLM_READ_TIMEOUT, deadline.remaining()))
+
+            async with llm_rate_limiter.slot(timeout=deadline.remaining()) as slot, \
+                    client.stream("POST", TOGETHER_API_URL, headers=HEADERS, json=payload, timeout=timeout) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    if response.status_code == 429:
+                        slot.rate_limited(parse_retry_after(response.headers.get("Retry-After")))
+                    response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+
+                    chunk = json.loads(data)
+                    if chunk.get("usage"):
+                        record_usage(payload["messages"], payload["max_tokens"], chunk["usage"])
+                    choices = chunk.get("choices") or []
+                    if not choices:
+                        continue
+                    delta = (choices[0].get("delta") or {}).get("content") or choices[0].get("text")
+                    if delta:
+                        if not parts:
+                            logger.info(f"First token after {time.time() - start_time:.2f}s")
+                        parts.append(delta)
+                        yield delta
+                slot.succeeded()
+
+            logger.info(f"Stream completed in {time.time() - start_time:.2f}s")
+            healthy = True
+            break
+
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP Error: {e.response.status_code} - {e.response.text}"
+            logger.error(error_msg)
+            if e.response.status_code >= 500:
+                healthy = False
+
+            if e.response.status_code == 429 and attempt < retries - 1:
+                wait_time = random.uniform(0, min((2 ** attempt) * RETRY_DELAY, 60, deadline.remaining()))
+                logger.warning(f"Rate limited. Waiting {wait_time:.2f}s before retry...")
+                await asyncio.sleep(wait_time)
+                continue
+
+            raise HTTPException(
+                status_code=e.response.status_code,
+                detail=f"Together AI API error: {error_msg}"
+            )
+
+        except asyncio.TimeoutError:
+            logger.error("AI stream could not start within its time budget")
+            raise HTTPException(
+                status_code=504,
+                detail="AI request timed out"
+            )
+
+        except httpx.RequestError as e:
+            logger.error(f"Stream request failed: {str(e)}")
+            healthy = False
+            if parts or attempt == retries - 1:
+                raise HTTPException(
+                    status_code=504 if deadline.expired() else 503,
+                    detail="Service temporarily unavailable"
+                )
+            await asyncio.sleep(min(RETRY_DELAY, deadline.remaining()))
+
+        finally:
+            llm_circuit_breaker.record(healthy)
+
+    if not parts:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to extract text from PDF: {str(e)}"
+            detail="Together AI returned an empty stream"
         )
 
-async def extract_text_from_docx(docx_file: UploadFile) -> str:
+    if cache_key is not None:
+        await llm_cache.set(cache_key, "".join(parts))
+
+async def _stream_json_items(
+    deltas: AsyncIterator[str],
+    validate: Callable[[Dict], Optional[Dict]],
+    label: str
+) -> AsyncIterator[str]:
+    """
+    Parses LLM token deltas into JSON objects as they close and emits each
+    valid one as an NDJSON `item` line, followed by a `done` line (or an
+    `error` line if nothing valid was produced or the upstream call failed).
+    """
+    parser = JSONObjectStreamParser()
+    count = 0
     try:
-        logger.info(f"Extracting text from DOCX: {docx_file.filename}")
-        docx_bytes = await docx_file.read()
-        document = Document(io.BytesIO(docx_bytes))
-        
-        full_text = []
-        for para in document.paragraphs:
-            if para.text.strip():
-                full_text.append(para.text)
-                
-        extracted_text = '\n'.join(full_text)
-        
-        if not extracted_text.strip():
-            raise ValueError("No readable text found in DOCX")
+        async for delta in deltas:
+            for item in parser.feed(delta):
+                item = validate(item)
+                if item is not None:
+                    count += 1
+                    yield json.dumps({"type": "item", "data": item}) + "\n"
+
+        if count:
+            yield json.dumps({"type": "done", "count": count, "truncated": parser.truncated}) + "\n"
+        else:
+            yield json.dumps({"type": "error", "status_code": 500,
+                              "detail": f"No valid {label} could be generated"}) + "\n"
+    except HTTPException as e:
+        yield json.dumps({"type": "error", "status_code": e.status_code, "detail": e.detail}) + "\n"
+    except Exception as e:
+        logger.error(f"{label} stream failed: {str(e)}")
+        yield json.dumps({"type": "error", "status_code": 500,
+                          "detail": f"Failed to generate {label}: {str(e)}"}) + "\n"
+
+def ndjson_response(lines: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        lines,
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(deltas: AsyncIterator[str], error_label: str) -> StreamingResponse:
+    """
+    Wraps a stream of text deltas as Server-Sent Events.
+    Emits `delta` events while generating, then a `done` event carrying the
+    assembled text, or an `error` event if the upstream call fails mid-stream.
+    """
+    async def event_stream():
+        parts: List[str] = []
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                yield _sse_event("delta", {"text": delta})
+            yield _sse_event("done", {"text": "".join(parts)})
+        except HTTPException as e:
+            yield _sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"{error_label} stream failed: {str(e)}")
+            yield _sse_event("error", {"status_code": 500, "detail": f"{error_label} failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def extract_pages_from_pdf(
+    pdf_file: SpooledUpload,
+    page_numbers: Optional[List[int]] = None,
+    max_tokens: Optional[int] = None
+) -> Tuple[List[Tuple[int, str]], int, List[int]]:
+    """
+    Page-parallel PDF extraction that stops once max_tokens of text is reached.
+    Scanned pages are OCRed and merged in page order.
+    """
+    try:
+        logger.info(f"Extracting PDF pages: {pdf_file.filename}")
+        pages, page_count, ocr_pages = await extract_pdf_pages(
+            pdf_file.path,
+            page_numbers=page_numbers,
+            max_tokens=max_tokens,
+            max_chars=MAX_LONG_DOCUMENT_CHARS
+        )
+        if not any(text.strip() for _, text in pages):
+            raise ValueError("No readable text found in PDF")
             
-        return extracted_text
+        return pages, page_count, ocr_pages
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"DOCX extraction error: {str(e)}")
+        logger.error(f"PDF extraction error: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to extract text from Word document: {str(e)}"
+            detail=f"Failed to extract text from PDF: {str(e)}"
         )
 
-async def extract_text_from_ppt(ppt_file: UploadFile) -> str:
+async def _extract_office(upload: SpooledUpload, kind: str, label: str) -> Tuple[str, int]:
+    """Streams DOCX/PPTX text (tables, notes, grouped shapes) and OCRs embedded images"""
     try:
-        logger.info(f"Extracting text from PPT: {ppt_file.filename}")
-        ppt_bytes = await ppt_file.read()
-        prs = Presentation(io.BytesIO(ppt_bytes))
-        
-        full_text = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    full_text.append(shape.text)
-                    
-        extracted_text = '\n'.join(full_text)
-        
-        if not extracted_text.strip():
-            raise ValueError("No readable text found in PPT")
-            
-        return extracted_text
+        logger.info(f"Extracting text from {kind.upper()}: {upload.filename}")
+        return await extract_office_text(upload.path, kind)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"PPT extraction error: {str(e)}")
+        logger.error(f"{kind.upper()} extraction error: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to extract text from PowerPoint: {str(e)}"
+            detail=f"Failed to extract text from {label}: {str(e)}"
         )
 
-async def extract_text_from_image(image_file: UploadFile) -> str:
+async def extract_text_from_docx(docx_file: SpooledUpload) -> Tuple[str, int]:
+    return await _extract_office(docx_file, "docx", "Word document")
+
+async def extract_text_from_ppt(ppt_file: SpooledUpload) -> Tuple[str, int]:
+    return await _extract_office(ppt_file, "pptx", "PowerPoint")
+
+async def extract_text_from_image(image_file: SpooledUpload) -> str:
     try:
         logger.info(f"Extracting text from image: {image_file.filename}")
-        image_bytes = await image_file.read()
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Configure Tesseract (if needed)
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(image, config=custom_config)
-        
+        text = await ocr_image(image_file.path)
         if not text.strip():
             raise ValueError("No text found in image via OCR")
             
         return text
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Image OCR error: {str(e)}")
         raise HTTPException(
@@ -287,69 +668,453 @@ async def extract_text_from_image(image_file: UploadFile) -> str:
         )
 
 
-def clean_extracted_text(text: str) -> str:
-    """Clean and normalize extracted text"""
+def _cap_extracted_text(text: str, max_tokens: Optional[int]) -> str:
+    # Truncate if too long
+    if len(text) > MAX_LONG_DOCUMENT_CHARS:
+        text = truncate_text(text, MAX_LONG_DOCUMENT_CHARS)
+        logger.warning(f"Text truncated to {len(text)} characters")
+    if max_tokens is not None:
+        text = truncate_to_tokens(text, max_tokens)
+    return text
+
+def clean_extracted_text(text: str, max_tokens: Optional[int] = LLM_INPUT_TOKEN_BUDGET) -> str:
+    """
+    Clean and normalize extracted text, truncated to the single-call input
+    token budget. With max_tokens=None only the long-document cap applies.
+    """
     if not text:
         return ""
         
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # Remove non-printable characters except basic punctuation
-    text = re.sub(r'[^\x20-\x7E\u2018\u2019\u201C\u201D\u2013\u2014]', ' ', text)
+    return _cap_extracted_text(normalize_text(text), max_tokens)
+
+def assemble_pages(
+    pages: List[Tuple[int, str]],
+    max_tokens: Optional[int] = LLM_INPUT_TOKEN_BUDGET
+) -> Tuple[str, List[Dict[str, int]]]:
+    """
+    Cleans and joins extracted pages like clean_extracted_text, also returning
+    each page's character range in the result. Running headers and footers
+    are removed first. Pages with no text are left out; pages cut off by
+    truncation are clipped or dropped.
+    """
+    parts = []
+    offsets = []
+    position = 0
+    texts = strip_page_furniture([text for _, text in pages])
+    for (number, _), text in zip(pages, texts):
+        text = normalize_text(text)
+        if not text:
+            continue
+        if parts:
+            position += 1  # joining space
+        offsets.append({"page": number, "start": position, "end": position + len(text)})
+        parts.append(text)
+        position += len(text)
+        
+    cleaned = _cap_extracted_text(' '.join(parts), max_tokens)
+    kept = [
+        {**offset, "end": min(offset["end"], len(cleaned))}
+        for offset in offsets if offset["start"] < len(cleaned)
+    ]
+    return cleaned, kept
+
+def fair_shares(sizes: List[int], budget: int) -> List[int]:
+    """
+    Splits budget across items so that items smaller than an equal share keep
+    all of theirs and the larger ones split what is left equally
+    """
+    shares = [0] * len(sizes)
+    remaining = budget
+    by_size = sorted(range(len(sizes)), key=lambda index: sizes[index])
+    for position, index in enumerate(by_size):
+        shares[index] = min(sizes[index], remaining // (len(sizes) - position))
+        remaining -= shares[index]
+    return shares
+
+def combine_extracted_texts(
+    texts: List[Tuple[str, str]],
+    max_tokens: Optional[int] = LLM_INPUT_TOKEN_BUDGET
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Joins the (filename, text) extractions of a batch under a header per file,
+    fitting the whole into max_tokens (or the long-document character cap when
+    max_tokens is None) by fair shares, so one long file cannot crowd out the
+    others. Returns the combined text and each file's character range in it.
+    """
+    headers = [f"=== {filename} ===\n" for filename, _ in texts]
+    if max_tokens is None:
+        sizes = [len(text) for _, text in texts]
+        budget = MAX_LONG_DOCUMENT_CHARS - sum(len(header) + 2 for header in headers)
+    else:
+        sizes = [count_tokens(text) for _, text in texts]
+        budget = max_tokens - sum(count_tokens(header) + 1 for header in headers)
+    shares = fair_shares(sizes, max(0, budget))
     
-    # Truncate if too long
-    if len(text) > MAX_LLM_INPUT_CHARS:
-        text = text[:MAX_LLM_INPUT_CHARS]
-        logger.warning(f"Text truncated to {MAX_LLM_INPUT_CHARS} characters")
+    parts = []
+    sections = []
+    position = 0
+    for (filename, text), header, size, share in zip(texts, headers, sizes, shares):
+        if share < size:
+            text = text[:share] if max_tokens is None else truncate_to_tokens(text, share)
+        if parts:
+            position += 2  # blank line between files
+        start = position + len(header)
+        sections.append({"filename": filename, "start": start, "end": start + len(text), "truncated": share < size})
+        parts.append(header + text)
+        position = start + len(text)
         
-    return text
+    return '\n\n'.join(parts), sections
+
+# --- Prompt Builders ---
+HANDWRITING_STYLES = {
+    "neat": "neat and organized handwriting like careful notes",
+    "casual": "casual everyday handwriting with natural variation",
+    "messy": "quick, messy handwriting like lecture notes"
+}
+
+def build_summary_messages(text: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": """You are an expert at creating detailed, structured summaries. 
+            Use markdown formatting with headings (##) and bullet points.
+            Include all key concepts and maintain the original meaning."""
+        },
+        {
+            "role": "user",
+            "content": f"""Create a comprehensive summary of this content:
+            
+            {text}"""
+        }
+    ]
+
+def build_humanize_messages(text: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": """Rewrite text to sound natural and human-like.
+            Use conversational tone, vary sentence structure, and add natural flow.
+            Maintain all key information from the original."""
+        },
+        {
+            "role": "user",
+            "content": f"""Humanize this text:
+            
+            {text}"""
+        }
+    ]
+
+def build_handwritten_messages(text: str, style: str) -> List[Dict[str, str]]:
+    if style not in HANDWRITING_STYLES:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid style. Supported: neat, casual, messy"
+        )
+
+    return [
+        {
+            "role": "system",
+            "content": f"""Convert text to {HANDWRITING_STYLES[style]}.
+            Use markdown to represent handwritten features:
+            - ~crossed out~ text
+            - **underlined** terms
+            - [margin notes in brackets]
+            - [doodle: description] for illustrations"""
+        },
+        {
+            "role": "user",
+            "content": f"""Convert this to {style} handwriting:
+            
+            {text}"""
+        }
+    ]
+
+def build_questions_messages(text: str, difficulty: str, count: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": """Generate multiple-choice questions in JSON format.
+            Each question must have:
+            - 'text': The question text
+            - 'options': List of 4 options
+            - 'answer': The correct answer"""
+        },
+        {
+            "role": "user",
+            "content": f"""Create {count} {difficulty} difficulty questions from this text.
+            Format as a JSON list of question objects.
+            
+            Text:
+            {text}"""
+        }
+    ]
+
+def build_flashcards_messages(text: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": """Generate flashcards in JSON format with:
+            - 'front': Concept or question
+            - 'back': Definition or answer
+            Return ONLY the JSON array of flashcards."""
+        },
+        {
+            "role": "user",
+            "content": f"""Create flashcards from this content:
+            
+            {text}"""
+        }
+    ]
+
+def build_vocabulary_messages(text: str) -> List[Dict[str, str]]:
+    return [
+        {
+            "role": "system",
+            "content": """Extract vocabulary words with definitions in JSON format.
+            Each item should have:
+            - 'word': The vocabulary word
+            - 'definition': Contextual definition
+            Return ONLY the JSON array of vocabulary items."""
+        },
+        {
+            "role": "user",
+            "content": f"""Identify key vocabulary from this text:
+            
+            {text}"""
+        }
+    ]
+
+# --- Item Validators ---
+def validate_question(q: Dict) -> Optional[Dict]:
+    """Returns the question with its options shuffled, or None if it is unusable"""
+    if not all(k in q for k in ["text", "options", "answer"]):
+        logger.warning(f"Skipping invalid question: {q}")
+        return None
+
+    if not isinstance(q["options"], list) or len(q["options"]) != 4:
+        logger.warning(f"Question has incorrect options count: {q['text']}")
+        return None
+
+    if q["answer"] not in q["options"]:
+        logger.warning(f"Correct answer not in options for: {q['text']}")
+        return None
+
+    random.shuffle(q["options"])
+    return q
+
+def validate_flashcard(card: Dict) -> Optional[Dict]:
+    if not all(k in card for k in ["front", "back"]):
+        logger.warning(f"Skipping invalid flashcard: {card}")
+        return None
+
+    if not str(card["front"]).strip() or not str(card["back"]).strip():
+        logger.warning(f"Skipping empty flashcard: {card}")
+        return None
+
+    return card
+
+def validate_vocabulary_item(item: Dict) -> Optional[Dict]:
+    if not all(k in item for k in ["word", "definition"]):
+        logger.warning(f"Skipping invalid vocabulary item: {item}")
+        return None
+
+    if not str(item["word"]).strip() or not str(item["definition"]).strip():
+        logger.warning(f"Skipping empty vocabulary item: {item}")
+        return None
+
+    return item
+
+def _validate_items(items: List[Dict], validate: Callable[[Dict], Optional[Dict]]) -> List[Dict]:
+    return [item for item in map(validate, items) if item is not None]
+
+# --- Generators ---
+async def create_summary(text: str, long_document: bool = False) -> str:
+    """Generates a structured summary, map-reduce style for long documents"""
+    if long_document or count_tokens(text) > LLM_INPUT_TOKEN_BUDGET:
+        return await summarize_long_document(text, call_together_ai)
+
+    prompt_messages = build_summary_messages(text)
+    return await call_together_ai(prompt_messages, max_tokens=output_budget("summary", text), cache=True)
+
+async def create_questions(text: str, difficulty: str = "medium", count: int = 5) -> List[Dict]:
+    """Generates, validates and shuffles multiple-choice questions"""
+    prompt_messages = build_questions_messages(text, difficulty, count)
+    response = await call_together_ai(
+        prompt_messages, max_tokens=output_budget("questions", text, items=count), cache=True
+    )
+    
+    validated_questions = _validate_items(parse_json_items(response), validate_question)
+    if not validated_questions:
+        raise HTTPException(
+            status_code=500,
+            detail="No valid questions could be generated"
+        )
+    
+    return validated_questions
+
+async def create_flashcards(text: str) -> List[Dict]:
+    """Generates and validates front/back flashcards"""
+    prompt_messages = build_flashcards_messages(text)
+    response = await call_together_ai(prompt_messages, max_tokens=output_budget("flashcards", text), cache=True)
+    
+    validated_flashcards = _validate_items(parse_json_items(response), validate_flashcard)
+    if not validated_flashcards:
+        raise HTTPException(
+            status_code=500,
+            detail="No valid flashcards could be generated"
+        )
+    
+    return validated_flashcards
+
+async def create_vocabulary(text: str) -> List[Dict]:
+    """Generates and validates vocabulary words with contextual definitions"""
+    prompt_messages = build_vocabulary_messages(text)
+    response = await call_together_ai(prompt_messages, max_tokens=output_budget("vocabulary", text), cache=True)
+    
+    validated_vocab = _validate_items(parse_json_items(response), validate_vocabulary_item)
+    if not validated_vocab:
+        raise HTTPException(
+            status_code=500,
+            detail="No vocabulary could be extracted"
+        )
+    
+    return validated_vocab
+
+async def create_mindmap(text: str) -> str:
+    """Generates Mermaid.js mindmap code"""
+    prompt_messages = [
+        {
+            "role": "system",
+            "content": """Generate mindmaps in Mermaid.js format.
+            Start with 'mindmap' and use proper indentation.
+            Include a root node and hierarchical structure.
+            Return ONLY the Mermaid code, DO NOT INCLUDE ANY SPECIAL CHARACTERS."""
+        },
+        {
+            "role": "user",
+            "content": f"""Create a mindmap from this content:
+            
+            {text}"""
+        }
+    ]
+    
+    code = await call_together_ai(
+        prompt_messages, temperature=0.3, max_tokens=output_budget("mindmap", text), cache=True
+    )
+    
+    # Ensure valid Mermaid syntax
+    if not code.strip().startswith("mindmap"):
+        code = "mindmap\n  root((Main Topic))\n" + code
+    
+    return code
 
 # --- API Endpoints ---
+def parse_pages_param(pages: Optional[str], filename: Optional[str] = None) -> Optional[List[int]]:
+    """Validates the pages= query parameter of the extraction endpoints"""
+    if not pages:
+        return None
+    if filename is not None and not filename.endswith('.pdf'):
+        raise HTTPException(
+            status_code=400,
+            detail="Page selection is only supported for PDF files"
+        )
+    try:
+        return parse_page_ranges(pages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pages parameter: {str(e)}")
+
+def check_upload_type(filename: str) -> None:
+    if not filename.lower().endswith(('.pdf', '.docx', '.ppt', '.pptx', '.jpg', '.jpeg', '.png')):
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported file type. Supported: PDF, DOCX, PPT/PPTX, JPG/PNG"
+        )
+
+async def extract_spooled(
+    upload: SpooledUpload,
+    max_tokens: Optional[int],
+    page_numbers: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Returns the cached extraction of a spooled file or extracts, cleans and
+    caches it, picking the extractor by its filename. The result has the
+    FileUploadResponse fields.
+    """
+    filename = upload.filename.lower()
+    page_count = None
+    page_offsets = None
+    ocr_pages = None
+    ocr_images = None
+    
+    cache_key = make_extraction_key(upload.sha256, max_tokens, page_numbers)
+    if extraction_cache is not None:
+        cached = await extraction_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {filename} ({upload.sha256[:12]})")
+            return cached
+    
+    if filename.endswith('.pdf'):
+        page_texts, page_count, ocr_pages = await extract_pages_from_pdf(upload, page_numbers, max_tokens)
+        cleaned_text, page_offsets = assemble_pages(page_texts, max_tokens=max_tokens)
+    else:
+        if filename.endswith('.docx'):
+            text, ocr_images = await extract_text_from_docx(upload)
+        elif filename.endswith(('.ppt', '.pptx')):
+            text, ocr_images = await extract_text_from_ppt(upload)
+        else:
+            text = await extract_text_from_image(upload)
+        cleaned_text = clean_extracted_text(text, max_tokens=max_tokens)
+    
+    result = {
+        "extracted_text": cleaned_text,
+        "file_type": filename.split('.')[-1],
+        "file_size": upload.size,
+        "page_count": page_count,
+        "pages": page_offsets,
+        "ocr_pages": ocr_pages or None,
+        "ocr_images": ocr_images or None
+    }
+    if extraction_cache is not None:
+        await extraction_cache.set(cache_key, result)
+    return result
+
+async def extract_upload(
+    file: UploadFile,
+    max_tokens: Optional[int],
+    page_numbers: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """Spools one upload and extracts it with extract_spooled"""
+    async with spooled_upload(file) as upload:
+        return await extract_spooled(upload, max_tokens, page_numbers)
+
 @router.post("/api/upload-and-extract",
              response_model=FileUploadResponse,
              response_description="Extracted text from uploaded file")
 async def upload_and_extract(
     file: UploadFile = File(...),
+    full_text: bool = False,
+    pages: Optional[str] = None,
     user_id: str = enforce_usage_limit("uploads")
 ) -> FileUploadResponse:
     """
     Handles file uploads (PDF, DOCX, PPTX, Image) and extracts text content.
     Automatically detects file type and calls the appropriate extractor.
+    With full_text=true the text is not cut at the single-call LLM limit, for
+    use with the long-document summary mode. For PDFs, pages (e.g. "1-5,9")
+    selects which pages to extract, and the response includes each page's
+    character range in extracted_text.
+    Results are cached by the SHA-256 of the file content; see
+    /api/extract-cache/{sha256} to skip uploading a file seen before.
     """
     try:
-        validate_file_size(file)
         filename = file.filename.lower()
-        file_type = filename.split('.')[-1]
+        max_tokens = None if full_text else LLM_INPUT_TOKEN_BUDGET
         
         logger.info(f"Processing file upload: {filename} for user {user_id}")
         
-        if filename.endswith('.pdf'):
-            text = await extract_text_from_pdf(file)
-        elif filename.endswith('.docx'):
-            text = await extract_text_from_docx(file)
-        elif filename.endswith(('.ppt', '.pptx')):
-            text = await extract_text_from_ppt(file)
-        elif filename.endswith(('.jpg', '.jpeg', '.png')):
-            text = await extract_text_from_image(file)
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Unsupported file type. Supported: PDF, DOCX, PPT/PPTX, JPG/PNG"
-            )
-            
-        cleaned_text = clean_extracted_text(text)
-        
-        # Get file size in bytes
-        await file.seek(0, 2)
-        file_size = file.tell()
-        await file.seek(0)
-        
-        return {
-            "extracted_text": cleaned_text,
-            "file_type": file_type,
-            "file_size": file_size
-        }
+        page_numbers = parse_pages_param(pages, filename)
+        check_upload_type(filename)
+        return await extract_upload(file, max_tokens, page_numbers)
         
     except HTTPException:
         raise
@@ -360,6 +1125,150 @@ async def upload_and_extract(
             detail=f"Failed to process uploaded file: {str(e)}"
         )
 
+@router.post("/api/upload-batch",
+             response_model=BatchUploadResponse,
+             response_description="Per-file extractions and their combined text")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    full_text: bool = False,
+    stream: bool = False,
+    user_id: str = enforce_usage_limit("uploads")
+):
+    """
+    Extracts several files (e.g. a week's slides) in one request, authenticated
+    and charged as a single upload. Files are extracted concurrently and each
+    gets its own result or error, so one bad file does not fail the batch.
+    combined_text joins them under per-file headers within the same token
+    budget as a single upload (or the long-document cap with full_text=true),
+    split fairly between files.
+    With stream=true the response is NDJSON: a `file` line per file as it
+    finishes (in completion order, with its index), then a `done` line with
+    the combined text.
+    """
+    if len(files) > UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {UPLOAD_BATCH_MAX_FILES} files can be uploaded in one batch"
+        )
+    max_tokens = None if full_text else LLM_INPUT_TOKEN_BUDGET
+    slots = asyncio.Semaphore(UPLOAD_BATCH_CONCURRENCY)
+    logger.info(f"Processing batch of {len(files)} files for user {user_id}")
+    
+    async def extract_one(index: int, file: UploadFile) -> Tuple[int, Dict[str, Any]]:
+        entry: Dict[str, Any] = {"filename": file.filename}
+        try:
+            check_upload_type(file.filename)
+            async with slots:
+                entry["result"] = await extract_upload(file, max_tokens)
+        except HTTPException as e:
+            entry.update(status_code=e.status_code, error=e.detail)
+        except Exception as e:
+            logger.error(f"Batch file processing error ({file.filename}): {str(e)}")
+            entry.update(status_code=500, error=f"Failed to process uploaded file: {str(e)}")
+        return index, entry
+    
+    def combine(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        texts = [(entry["filename"], entry["result"]["extracted_text"]) for entry in entries if "result" in entry]
+        combined_text, sections = combine_extracted_texts(texts, max_tokens=max_tokens)
+        return {"combined_text": combined_text, "sections": sections}
+    
+    if not stream:
+        entries = [entry for _, entry in await asyncio.gather(
+            *[extract_one(index, file) for index, file in enumerate(files)]
+        )]
+        return {"files": entries, **combine(entries)}
+    
+    async def lines() -> AsyncIterator[str]:
+        tasks = [asyncio.ensure_future(extract_one(index, file)) for index, file in enumerate(files)]
+        entries: List[Optional[Dict[str, Any]]] = [None] * len(files)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, entry = await next_done
+                entries[index] = entry
+                yield json.dumps({"type": "file", "index": index, **entry}) + "\n"
+            yield json.dumps({"type": "done", **combine(entries)}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return ndjson_response(lines())
+
+def _extraction_cache_key(sha256: str, full_text: bool, pages: Optional[str]) -> str:
+    sha256 = sha256.lower()
+    if not SHA256_RE.fullmatch(sha256):
+        raise HTTPException(status_code=400, detail="Expected a hex-encoded SHA-256 digest")
+    max_tokens = None if full_text else LLM_INPUT_TOKEN_BUDGET
+    return make_extraction_key(sha256, max_tokens, parse_pages_param(pages))
+
+@router.head("/api/extract-cache/{sha256}")
+async def check_extract_cache(
+    sha256: str,
+    full_text: bool = False,
+    pages: Optional[str] = None,
+    user_id: str = Depends(get_authenticated_user_id)
+) -> Response:
+    """
+    Lets the client hash a file locally and skip the upload when the server
+    already has the extraction for it: 200 if cached, 404 if not. Takes the
+    same full_text/pages options as /api/upload-and-extract and is not
+    charged against upload usage.
+    """
+    cache_key = _extraction_cache_key(sha256, full_text, pages)
+    if extraction_cache is None or not await extraction_cache.contains(cache_key):
+        return Response(status_code=404)
+    return Response(status_code=200)
+
+@router.get("/api/extract-cache/{sha256}",
+            response_model=FileUploadResponse,
+            response_description="Cached extraction for a previously uploaded file")
+async def get_extract_cache(
+    sha256: str,
+    full_text: bool = False,
+    pages: Optional[str] = None,
+    user_id: str = enforce_usage_limit("uploads")
+) -> FileUploadResponse:
+    """
+    Returns the cached /api/upload-and-extract result for the file with this
+    SHA-256, counting as one upload, or 404 if it has to be uploaded.
+    """
+    cache_key = _extraction_cache_key(sha256, full_text, pages)
+    cached = await extraction_cache.get(cache_key) if extraction_cache is not None else None
+    if cached is None:
+        raise HTTPException(status_code=404, detail="No cached extraction for this file")
+    logger.info(f"Serving cached extraction {sha256[:12]} for user {user_id}")
+    return cached
+
+async def extract_article_text(page: FetchResult) -> str:
+    """
+    Parses a fetched page in the extraction pool and cleans its main text.
+    Only the long-document cap applies, so the article cache holds the full
+    text; callers cut it to their own budget.
+    """
+    main_text = await extraction_pool.run(html_to_text, page.body, page.charset)
+    return clean_extracted_text(main_text, max_tokens=None)
+
+async def extract_linked_document(page: FetchResult) -> str:
+    """
+    Extracts a fetched link with the extractor its content type calls for:
+    web pages with the article extractor, linked PDF/DOCX/PPTX files through
+    the same path (and extraction cache) as uploads.
+    """
+    kind = document_kind(page)
+    if kind == "html":
+        if len(page.body) > URL_FETCH_MAX_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Page exceeds maximum allowed size of {URL_FETCH_MAX_BYTES // (1024 * 1024)}MB"
+            )
+        return await extract_article_text(page)
+
+    filename = urlparse(page.url).path.rsplit('/', 1)[-1].lower()
+    if not filename.endswith('.' + kind):
+        filename = f"linked.{kind}"
+    async with spooled_bytes(page.body, filename, page.content_type) as upload:
+        result = await extract_spooled(upload, max_tokens=None)
+    return result["extracted_text"]
+
 @router.post("/api/fetch-and-extract-url",
              response_model=ContentRequest,
              response_description="Extracted text from web page")
@@ -369,59 +1278,21 @@ async def fetch_and_extract_url(
 ) -> ContentRequest:
     """
     Fetches content from a given web page URL and extracts its main readable text.
-    Uses BeautifulSoup to parse HTML and remove irrelevant elements.
+    The main content is picked by a single-pass lxml readability scorer
+    that prunes navigation, comments and other boilerplate.
+    Pages are fetched through a pooled client with a size cap, and extracted
+    articles are cached by normalized URL and revalidated with ETag /
+    Last-Modified, so popular pages are not re-downloaded and re-parsed.
     """
     url = request.url.strip()
     if not url:
         raise HTTPException(status_code=400, detail="No URL provided")
-        
-    # Prepend 'https://' if no scheme is provided
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
 
     try:
         logger.info(f"Fetching URL content: {url} for user {user_id}")
         
-        response = requests.get(url, timeout=10, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'lxml')
-        
-        # Remove unwanted elements
-        for element in soup(["script", "style", "nav", "footer", "header", "form", 
-                           "aside", "meta", "iframe", "img", "svg", "link", 
-                           "input", "button", "select", "textarea"]):
-            element.decompose()
-
-        # Try to find main content areas
-        content_selectors = [
-            'article', 'main', 'div.main-content', 'div.entry-content', 
-            'div.post-content', 'div.article-body', 'div[role="main"]',
-            'div#content', 'div#main', 'div.content', 'div.post',
-            'div.blog-post', 'div.article'
-        ]
-        
-        main_text = ""
-        for selector in content_selectors:
-            elements = soup.select(selector)
-            for element in elements:
-                text = element.get_text(separator=' ', strip=True)
-                if len(text) > len(main_text):
-                    main_text = text
-
-        # Fallback to body text if no main content found
-        if not main_text or len(main_text) < 100:
-            body = soup.find('body')
-            if body:
-                main_text = body.get_text(separator=' ', strip=True)
-
-        # Final fallback to entire document
-        if not main_text or len(main_text) < 50:
-            main_text = soup.get_text(separator=' ', strip=True)
-
-        cleaned_text = clean_extracted_text(main_text)
+        article = await fetch_article(url, extract_article_text)
+        cleaned_text = _cap_extracted_text(article["text"], LLM_INPUT_TOKEN_BUDGET)
         
         if not cleaned_text:
             raise HTTPException(
@@ -431,18 +1302,13 @@ async def fetch_and_extract_url(
             
         return {"text": cleaned_text}
         
-    except requests.exceptions.RequestException as e:
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid URL: {str(e)}")
+    except httpx.HTTPError as e:
         logger.error(f"URL fetch error: {str(e)}")
-        if isinstance(e, requests.exceptions.Timeout):
-            raise HTTPException(status_code=408, detail="Request to URL timed out")
-        elif isinstance(e, requests.exceptions.ConnectionError):
-            raise HTTPException(status_code=503, detail="Could not connect to URL")
-        elif hasattr(e, 'response') and e.response:
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail=f"Error fetching URL: {e.response.status_code} {e.response.reason}"
-            )
-        raise HTTPException(status_code=500, detail=f"Failed to fetch URL: {str(e)}")
+        raise fetch_error(e)
         
     except Exception as e:
         logger.error(f"URL processing error: {str(e)}")
@@ -451,37 +1317,181 @@ async def fetch_and_extract_url(
             detail=f"Failed to process URL content: {str(e)}"
         )
 
+@router.post("/api/fetch-and-extract-urls",
+             response_model=BatchURLResponse,
+             response_description="Per-URL extractions and their combined text")
+async def fetch_and_extract_urls(
+    request: BatchURLRequest,
+    user_id: str = enforce_usage_limit("summaries")
+):
+    """
+    Extracts a list of reference links in one request, charged as a single
+    URL extraction. URLs are normalized and de-duplicated, then fetched
+    concurrently (URL_BATCH_CONCURRENCY per request, URL_FETCH_PER_HOST per
+    site, the fetch client's pool overall) and extracted in the worker pool.
+    Links that serve a PDF, DOCX or PPTX are routed by Content-Type to the
+    file extractors. Each URL gets its own result or error, and the article
+    cache is shared with /api/fetch-and-extract-url.
+    combined_text joins them under per-URL headers within the same budget
+    as /api/upload-batch. With stream=true the response is NDJSON: a `url`
+    line per URL as it finishes (in completion order, with its index), then
+    a `done` line with the combined text.
+    """
+    entries: List[Dict[str, Any]] = []
+    by_url: Dict[str, Dict[str, Any]] = {}
+    for submitted in request.urls:
+        submitted = submitted.strip()
+        if not submitted:
+            continue
+        try:
+            url = normalize_url(submitted)
+        except ValueError as e:
+            entries.append({"url": submitted, "submitted": [submitted], "status_code": 400, "error": f"Invalid URL: {str(e)}"})
+            continue
+        if url in by_url:
+            by_url[url]["submitted"].append(submitted)
+            continue
+        by_url[url] = {"url": url, "submitted": [submitted]}
+        entries.append(by_url[url])
+
+    if not entries:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    if len(entries) > URL_BATCH_MAX_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {URL_BATCH_MAX_URLS} distinct URLs can be fetched in one batch"
+        )
+    max_tokens = None if request.full_text else LLM_INPUT_TOKEN_BUDGET
+    max_document_bytes = max(URL_FETCH_MAX_BYTES, MAX_FILE_SIZE_MB * 1024 * 1024)
+    slots = asyncio.Semaphore(URL_BATCH_CONCURRENCY)
+    logger.info(f"Fetching batch of {len(by_url)} URLs ({len(request.urls)} submitted) for user {user_id}")
+
+    async def fetch_one(index: int, entry: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        if "error" in entry:
+            return index, entry
+        try:
+            async with slots:
+                document = await fetch_article(
+                    entry["url"], extract_linked_document,
+                    allowed_types=LINKED_CONTENT_TYPES, max_bytes=max_document_bytes
+                )
+            text = _cap_extracted_text(document["text"], max_tokens)
+            if not text:
+                raise HTTPException(status_code=400, detail="Could not extract meaningful text from the URL")
+            entry.update(
+                source=DOCUMENT_CONTENT_TYPES.get(document.get("content_type"), "html"),
+                extracted_text=text
+            )
+        except HTTPException as e:
+            entry.update(status_code=e.status_code, error=e.detail)
+        except httpx.HTTPError as e:
+            error = fetch_error(e)
+            entry.update(status_code=error.status_code, error=error.detail)
+        except Exception as e:
+            logger.error(f"Batch URL processing error ({entry['url']}): {str(e)}")
+            entry.update(status_code=500, error=f"Failed to process URL content: {str(e)}")
+        return index, entry
+
+    def combine(done: List[Dict[str, Any]]) -> Dict[str, Any]:
+        texts = [(entry["url"], entry["extracted_text"]) for entry in done if "extracted_text" in entry]
+        combined_text, sections = combine_extracted_texts(texts, max_tokens=max_tokens)
+        return {"combined_text": combined_text, "sections": sections}
+
+    if not request.stream:
+        done = [entry for _, entry in await asyncio.gather(
+            *[fetch_one(index, entry) for index, entry in enumerate(entries)]
+        )]
+        return {"results": done, **combine(done)}
+
+    async def lines() -> AsyncIterator[str]:
+        tasks = [asyncio.ensure_future(fetch_one(index, entry)) for index, entry in enumerate(entries)]
+        done: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, entry = await next_done
+                done[index] = entry
+                yield json.dumps({"type": "url", "index": index, **entry}) + "\n"
+            yield json.dumps({"type": "done", **combine(done)}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return ndjson_response(lines())
+
+@router.post("/api/fetch-youtube-content",
+             response_model=YouTubeContentResponse,
+             response_description="Transcript text of a YouTube video")
+async def fetch_youtube_content(
+    request: YouTubeURLRequest,
+    user_id: str = enforce_usage_limit("summaries"),
+    fetcher: TranscriptFetcher = Depends(get_transcript_fetcher)
+) -> YouTubeContentResponse:
+    """
+    Fetches the captions of a YouTube video and returns them as text.
+    Transcripts are cached by video ID and language with their timestamped
+    segments, so a long lecture can be re-chunked for summarization (chunks
+    carry the time span they cover) without fetching it again. Chunks always
+    cover the whole video; extracted_text is cut at the single-call budget
+    unless full_text is set.
+    """
+    try:
+        video_id = extract_video_id(request.youtube_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid YouTube URL: {str(e)}")
+    chunk_tokens = request.chunk_tokens or TRANSCRIPT_CHUNK_TOKENS
+    if chunk_tokens < 100:
+        raise HTTPException(status_code=400, detail="chunk_tokens must be at least 100")
+
+    try:
+        logger.info(f"Fetching YouTube transcript {video_id} for user {user_id}")
+        transcript = await get_transcript(video_id, request.language, fetcher)
+
+        max_tokens = None if request.full_text else LLM_INPUT_TOKEN_BUDGET
+        text = clean_extracted_text(transcript_text(transcript), max_tokens)
+        if not text:
+            raise HTTPException(status_code=404, detail="The video's captions contain no text")
+
+        return YouTubeContentResponse(
+            extracted_text=text,
+            video_id=video_id,
+            language=transcript.get("language") or request.language or "",
+            title=transcript.get("title"),
+            duration=transcript.get("duration"),
+            chunks=chunk_segments(transcript["segments"], chunk_tokens),
+            segments=transcript["segments"] if request.include_segments else None
+        )
+
+    except HTTPException:
+        raise
+    except TranscriptUnavailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except httpx.HTTPError as e:
+        logger.error(f"YouTube fetch error: {str(e)}")
+        raise fetch_error(e)
+    except Exception as e:
+        logger.error(f"YouTube processing error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process YouTube video: {str(e)}"
+        )
+
 
 @router.post("/api/summarize",
              response_model=ContentRequest,
              response_description="Generated summary of the input text")
 async def summarize_text(
-    request: ContentRequest,
+    request: SummarizeRequest,
     user_id: str = enforce_usage_limit("summaries")
 ) -> ContentRequest:
     """
     Generates a detailed, structured summary from the provided text using an LLM.
     The summary includes key points and maintains the original meaning.
+    Texts longer than a single LLM call can take are summarized map-reduce style.
     """
     try:
         logger.info(f"Generating summary for user {user_id}")
         
-        prompt_messages = [
-            {
-                "role": "system",
-                "content": """You are an expert at creating detailed, structured summaries. 
-                Use markdown formatting with headings (##) and bullet points.
-                Include all key concepts and maintain the original meaning."""
-            },
-            {
-                "role": "user",
-                "content": f"""Create a comprehensive summary of this content:
-                
-                {request.text}"""
-            }
-        ]
-
-        summary = await call_together_ai(prompt_messages, max_tokens=1024)
+        summary = await create_summary(request.text, request.long_document)
         return {"text": summary}
         
     except HTTPException:
@@ -493,6 +1503,34 @@ async def summarize_text(
             detail=f"Failed to generate summary: {str(e)}"
         )
 
+@router.post("/api/summarize/stream",
+             response_description="Summary streamed as Server-Sent Events")
+async def summarize_text_stream(
+    request: SummarizeRequest,
+    user_id: str = enforce_usage_limit("summaries")
+) -> StreamingResponse:
+    """
+    Streaming variant of /api/summarize. Emits `delta` events as tokens arrive
+    and a final `done` event with the complete summary. For long documents the
+    chunk summaries are produced first and only the final merge is streamed.
+    """
+    logger.info(f"Streaming summary for user {user_id}")
+    if request.long_document or count_tokens(request.text) > LLM_INPUT_TOKEN_BUDGET:
+        deltas = _stream_long_summary(request.text)
+    else:
+        prompt_messages = build_summary_messages(request.text)
+        deltas = stream_together_ai(prompt_messages, max_tokens=output_budget("summary", request.text), cache=True)
+    return sse_response(deltas, "Summary generation")
+
+async def _stream_long_summary(text: str) -> AsyncIterator[str]:
+    sections = await condense_document(text, call_together_ai)
+    async for delta in stream_together_ai(
+        build_reduce_messages(sections),
+        max_tokens=FINAL_SUMMARY_MAX_TOKENS,
+        cache=True
+    ):
+        yield delta
+
 @router.post("/api/generate-questions",
              response_model=List[QuestionItem],
              response_description="List of generated questions with options")
@@ -507,67 +1545,9 @@ async def generate_questions(
     try:
         logger.info(f"Generating {request.count} {request.difficulty} questions for user {user_id}")
         
-        prompt_messages = [
-            {
-                "role": "system",
-                "content": """Generate multiple-choice questions in JSON format.
-                Each question must have:
-                - 'text': The question text
-                - 'options': List of 4 options
-                - 'answer': The correct answer"""
-            },
-            {
-                "role": "user",
-                "content": f"""Create {request.count} {request.difficulty} difficulty questions from this text.
-                Format as a JSON list of question objects.
-                
-                Text:
-                {request.text}"""
-            }
-        ]
-
-        response = await call_together_ai(prompt_messages, max_tokens=1500)
-        
-        # Clean and validate response
-        if response.startswith("```json"):
-            response = response[7:-3].strip()
-        
-        questions = json.loads(response)
-        if not isinstance(questions, list):
-            raise ValueError("Invalid question format")
-        
-        # Validate and randomize each question
-        validated_questions = []
-        for q in questions:
-            if not all(k in q for k in ["text", "options", "answer"]):
-                logger.warning(f"Skipping invalid question: {q}")
-                continue
-                
-            if len(q["options"]) != 4:
-                logger.warning(f"Question has incorrect options count: {q['text']}")
-                continue
-                
-            if q["answer"] not in q["options"]:
-                logger.warning(f"Correct answer not in options for: {q['text']}")
-                continue
-                
-            random.shuffle(q["options"])
-            validated_questions.append(q)
-        
-        if not validated_questions:
-            raise HTTPException(
-                status_code=500,
-                detail="No valid questions could be generated"
-            )
-            
-        return validated_questions
+        questions = await create_questions(request.text, request.difficulty, request.count)
+        return questions
         
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to parse generated questions: {str(e)}"
-        )
     except HTTPException:
         raise
     except Exception as e:
@@ -577,6 +1557,25 @@ async def generate_questions(
             detail=f"Failed to generate questions: {str(e)}"
         )
 
+@router.post("/api/generate-questions/stream",
+             response_description="Questions streamed as NDJSON, one line per question")
+async def generate_questions_stream(
+    request: GenerateQuestionsRequest,
+    user_id: str = enforce_usage_limit("questions")
+) -> StreamingResponse:
+    """
+    Streaming variant of /api/generate-questions. Each question is validated
+    and sent as soon as the model finishes writing it.
+    """
+    logger.info(f"Streaming {request.count} {request.difficulty} questions for user {user_id}")
+    prompt_messages = build_questions_messages(request.text, request.difficulty, request.count)
+    deltas = stream_together_ai(
+        prompt_messages,
+        max_tokens=output_budget("questions", request.text, items=request.count),
+        cache=True
+    )
+    return ndjson_response(_stream_json_items(deltas, validate_question, "questions"))
+
 @router.post("/api/follow-up",
              response_model=ContentRequest,
              response_description="Answer to the follow-up question")
@@ -606,7 +1605,7 @@ async def follow_up(
             }
         ]
 
-        answer = await call_together_ai(prompt_messages, max_tokens=300)
+        answer = await call_together_ai(prompt_messages, max_tokens=output_budget("follow_up"))
         return {"text": answer}
         
     except HTTPException:
@@ -632,59 +1631,9 @@ async def generate_flashcards(
     try:
         logger.info(f"Generating flashcards for user {user_id}")
         
-        prompt_messages = [
-            {
-                "role": "system",
-                "content": """Generate flashcards in JSON format with:
-                - 'front': Concept or question
-                - 'back': Definition or answer
-                Return ONLY the JSON array of flashcards."""
-            },
-            {
-                "role": "user",
-                "content": f"""Create flashcards from this content:
-                
-                {request.text}"""
-            }
-        ]
-
-        response = await call_together_ai(prompt_messages, max_tokens=1500)
-        
-        # Clean and validate response
-        if response.startswith("```json"):
-            response = response[7:-3].strip()
-        
-        flashcards = json.loads(response)
-        if not isinstance(flashcards, list):
-            raise ValueError("Invalid flashcard format")
-        
-        # Validate each flashcard
-        validated_flashcards = []
-        for card in flashcards:
-            if not all(k in card for k in ["front", "back"]):
-                logger.warning(f"Skipping invalid flashcard: {card}")
-                continue
-                
-            if not card["front"].strip() or not card["back"].strip():
-                logger.warning(f"Skipping empty flashcard: {card}")
-                continue
-                
-            validated_flashcards.append(card)
+        flashcards = await create_flashcards(request.text)
+        return flashcards
         
-        if not validated_flashcards:
-            raise HTTPException(
-                status_code=500,
-                detail="No valid flashcards could be generated"
-            )
-            
-        return validated_flashcards
-        
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to parse generated flashcards: {str(e)}"
-        )
     except HTTPException:
         raise
     except Exception as e:
@@ -694,6 +1643,21 @@ async def generate_flashcards(
             detail=f"Failed to generate flashcards: {str(e)}"
         )
 
+@router.post("/api/generate-flashcards/stream",
+             response_description="Flashcards streamed as NDJSON, one line per card")
+async def generate_flashcards_stream(
+    request: FlashcardsRequest,
+    user_id: str = enforce_usage_limit("flashcards")
+) -> StreamingResponse:
+    """
+    Streaming variant of /api/generate-flashcards. Each card is validated and
+    sent as soon as the model finishes writing it.
+    """
+    logger.info(f"Streaming flashcards for user {user_id}")
+    prompt_messages = build_flashcards_messages(request.text)
+    deltas = stream_together_ai(prompt_messages, max_tokens=output_budget("flashcards", request.text), cache=True)
+    return ndjson_response(_stream_json_items(deltas, validate_flashcard, "flashcards"))
+
 @router.post("/api/generate-vocabulary",
              response_model=List[VocabularyItem],
              response_description="List of vocabulary words with definitions")
@@ -708,60 +1672,9 @@ async def generate_vocabulary(
     try:
         logger.info(f"Generating vocabulary list for user {user_id}")
         
-        prompt_messages = [
-            {
-                "role": "system",
-                "content": """Extract vocabulary words with definitions in JSON format.
-                Each item should have:
-                - 'word': The vocabulary word
-                - 'definition': Contextual definition
-                Return ONLY the JSON array of vocabulary items."""
-            },
-            {
-                "role": "user",
-                "content": f"""Identify key vocabulary from this text:
-                
-                {request.text}"""
-            }
-        ]
-
-        response = await call_together_ai(prompt_messages, max_tokens=1024)
-        
-        # Clean and validate response
-        if response.startswith("```json"):
-            response = response[7:-3].strip()
+        vocabulary = await create_vocabulary(request.text)
+        return vocabulary
         
-        vocabulary = json.loads(response)
-        if not isinstance(vocabulary, list):
-            raise ValueError("Invalid vocabulary format")
-        
-        # Validate each vocabulary item
-        validated_vocab = []
-        for item in vocabulary:
-            if not all(k in item for k in ["word", "definition"]):
-                logger.warning(f"Skipping invalid vocabulary item: {item}")
-                continue
-                
-            if not item["word"].strip() or not item["definition"].strip():
-                logger.warning(f"Skipping empty vocabulary item: {item}")
-                continue
-                
-            validated_vocab.append(item)
-        
-        if not validated_vocab:
-            raise HTTPException(
-                status_code=500,
-                detail="No vocabulary could be extracted"
-            )
-            
-        return validated_vocab
-        
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to parse vocabulary: {str(e)}"
-        )
     except HTTPException:
         raise
     except Exception as e:
@@ -771,6 +1684,21 @@ async def generate_vocabulary(
             detail=f"Failed to extract vocabulary: {str(e)}"
         )
 
+@router.post("/api/generate-vocabulary/stream",
+             response_description="Vocabulary streamed as NDJSON, one line per word")
+async def generate_vocabulary_stream(
+    request: VocabularyRequest,
+    user_id: str = enforce_usage_limit("vocabulary")
+) -> StreamingResponse:
+    """
+    Streaming variant of /api/generate-vocabulary. Each word is validated and
+    sent as soon as the model finishes writing it.
+    """
+    logger.info(f"Streaming vocabulary list for user {user_id}")
+    prompt_messages = build_vocabulary_messages(request.text)
+    deltas = stream_together_ai(prompt_messages, max_tokens=output_budget("vocabulary", request.text), cache=True)
+    return ndjson_response(_stream_json_items(deltas, validate_vocabulary_item, "vocabulary"))
+
 @router.post("/api/humanize-text",
              response_model=ContentRequest,
              response_description="Humanized version of the input text")
@@ -785,22 +1713,10 @@ async def humanize_text(
     try:
         logger.info(f"Humanizing text for user {user_id}")
         
-        prompt_messages = [
-            {
-                "role": "system",
-                "content": """Rewrite text to sound natural and human-like.
-                Use conversational tone, vary sentence structure, and add natural flow.
-                Maintain all key information from the original."""
-            },
-            {
-                "role": "user",
-                "content": f"""Humanize this text:
-                
-                {request.text}"""
-            }
-        ]
-
-        humanized = await call_together_ai(prompt_messages, temperature=0.8, max_tokens=1500)
+        prompt_messages = build_humanize_messages(request.text)
+        humanized = await call_together_ai(
+            prompt_messages, temperature=0.8, max_tokens=output_budget("humanize", request.text)
+        )
         return {"text": humanized}
         
     except HTTPException:
@@ -812,6 +1728,23 @@ async def humanize_text(
             detail=f"Failed to humanize text: {str(e)}"
         )
 
+@router.post("/api/humanize-text/stream",
+             response_description="Humanized text streamed as Server-Sent Events")
+async def humanize_text_stream(
+    request: HumanizeRequest,
+    user_id: str = enforce_usage_limit("humanize")
+) -> StreamingResponse:
+    """
+    Streaming variant of /api/humanize-text. Emits `delta` events as tokens
+    arrive and a final `done` event with the complete rewrite.
+    """
+    logger.info(f"Streaming humanized text for user {user_id}")
+    prompt_messages = build_humanize_messages(request.text)
+    return sse_response(
+        stream_together_ai(prompt_messages, temperature=0.8, max_tokens=output_budget("humanize", request.text)),
+        "Text humanization"
+    )
+
 @router.post("/api/generate-mindmap",
              response_model=ContentRequest,
              response_description="Mermaid.js code for the generated mindmap")
@@ -826,28 +1759,7 @@ async def generate_mindmap(
     try:
         logger.info(f"Generating mindmap for user {user_id}")
         
-        prompt_messages = [
-            {
-                "role": "system",
-                "content": """Generate mindmaps in Mermaid.js format.
-                Start with 'mindmap' and use proper indentation.
-                Include a root node and hierarchical structure.
-                Return ONLY the Mermaid code, DO NOT INCLUDE ANY SPECIAL CHARACTERS."""
-            },
-            {
-                "role": "user",
-                "content": f"""Create a mindmap from this content:
-                
-                {request.text}"""
-            }
-        ]
-
-        code = await call_together_ai(prompt_messages, temperature=0.3, max_tokens=1024)
-        
-        # Ensure valid Mermaid syntax
-        if not code.strip().startswith("mindmap"):
-            code = "mindmap\n  root((Main Topic))\n" + code
-            
+        code = await create_mindmap(request.text)
         return {"text": code}
         
     except HTTPException:
@@ -903,7 +1815,9 @@ async def generate_diagram(
             }
         ]
 
-        code = await call_together_ai(prompt_messages, temperature=0.3, max_tokens=1024)
+        code = await call_together_ai(
+            prompt_messages, temperature=0.3, max_tokens=output_budget("diagram", request.text), cache=True
+        )
         
         # Ensure valid Mermaid syntax
         if not code.strip().startswith(diagram_types[request.diagram_type]):
@@ -934,37 +1848,10 @@ async def generate_handwritten(
     try:
         logger.info(f"Generating {request.style} handwritten notes for user {user_id}")
         
-        style_descriptions = {
-            "neat": "neat and organized handwriting like careful notes",
-            "casual": "casual everyday handwriting with natural variation",
-            "messy": "quick, messy handwriting like lecture notes"
-        }
-        
-        if request.style not in style_descriptions:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid style. Supported: neat, casual, messy"
-            )
-            
-        prompt_messages = [
-            {
-                "role": "system",
-                "content": f"""Convert text to {style_descriptions[request.style]}.
-                Use markdown to represent handwritten features:
-                - ~crossed out~ text
-                - **underlined** terms
-                - [margin notes in brackets]
-                - [doodle: description] for illustrations"""
-            },
-            {
-                "role": "user",
-                "content": f"""Convert this to {request.style} handwriting:
-                
-                {request.text}"""
-            }
-        ]
-
-        notes = await call_together_ai(prompt_messages, temperature=0.7, max_tokens=1500)
+        prompt_messages = build_handwritten_messages(request.text, request.style)
+        notes = await call_together_ai(
+            prompt_messages, temperature=0.7, max_tokens=output_budget("handwritten", request.text)
+        )
         return {"text": notes}
         
     except HTTPException:
@@ -974,4 +1861,107 @@ async def generate_handwritten(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate handwritten notes: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/api/generate-handwritten/stream",
+             response_description="Handwritten-style notes streamed as Server-Sent Events")
+async def generate_handwritten_stream(
+    request: HandwrittenRequest,
+    user_id: str = enforce_usage_limit("handwritten")
+) -> StreamingResponse:
+    """
+    Streaming variant of /api/generate-handwritten. Emits `delta` events as
+    tokens arrive and a final `done` event with the complete notes.
+    """
+    logger.info(f"Streaming {request.style} handwritten notes for user {user_id}")
+    prompt_messages = build_handwritten_messages(request.text, request.style)
+    return sse_response(
+        stream_together_ai(prompt_messages, temperature=0.7, max_tokens=output_budget("handwritten", request.text)),
+        "Handwritten conversion"
+    )
+
+def _study_pack_line(artifact: str, task: asyncio.Task) -> str:
+    error = task.exception()
+    if error is None:
+        line = {"artifact": artifact, "status": "ok", "data": task.result()}
+    elif isinstance(error, HTTPException):
+        line = {"artifact": artifact, "status": "error", "status_code": error.status_code, "detail": error.detail}
+    elif isinstance(error, json.JSONDecodeError):
+        logger.error(f"Study pack {artifact} JSON decode error: {str(error)}")
+        line = {"artifact": artifact, "status": "error", "status_code": 500,
+                "detail": f"Failed to parse generated {artifact}: {str(error)}"}
+    else:
+        logger.error(f"Study pack {artifact} generation failed: {str(error)}")
+        line = {"artifact": artifact, "status": "error", "status_code": 500,
+                "detail": f"Failed to generate {artifact}: {str(error)}"}
+    return json.dumps(line) + "\n"
+
+async def _study_pack_stream(
+    jobs: Dict[str, Callable[[], Awaitable]],
+    refused: Dict[str, HTTPException]
+) -> AsyncIterator[str]:
+    for artifact, error in refused.items():
+        yield json.dumps({"artifact": artifact, "status": "error",
+                          "status_code": error.status_code, "detail": error.detail}) + "\n"
+
+    tasks = {asyncio.ensure_future(job()): artifact for artifact, job in jobs.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield _study_pack_line(tasks[task], task)
+    finally:
+        # Client went away: stop generating artifacts nobody will receive
+        for task in pending:
+            task.cancel()
+
+@router.post("/api/study-pack",
+             response_description="Study pack artifacts streamed as NDJSON, one line per artifact")
+async def generate_study_pack(
+    request: StudyPackRequest,
+    user_id: str = Depends(get_authenticated_user_id)
+) -> StreamingResponse:
+    """
+    Generates several study artifacts (summary, questions, flashcards, vocabulary,
+    mindmap) from one text in a single request. The user is authenticated once,
+    usage for every artifact is charged in one batched write, and the generators
+    run concurrently. Each artifact is streamed back as an NDJSON line as soon as
+    it completes.
+    """
+    artifacts = list(dict.fromkeys(request.artifacts))
+    unknown = [a for a in artifacts if a not in STUDY_PACK_ARTIFACTS]
+    if unknown or not artifacts:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid artifacts. Supported: {', '.join(STUDY_PACK_ARTIFACTS.keys())}"
+        )
+
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="No text provided")
+
+    try:
+        features = {artifact: STUDY_PACK_ARTIFACTS[artifact] for artifact in artifacts}
+        outcome = await asyncio.to_thread(charge_usage_batch, user_id, list(features.values()))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Study pack usage charge failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    refused = {a: outcome[f] for a, f in features.items() if outcome[f] is not None}
+    if len(refused) == len(artifacts):
+        first = next(iter(refused.values()))
+        raise HTTPException(status_code=first.status_code, detail=first.detail)
+
+    generators = {
+        "summary": lambda: create_summary(request.text, request.long_document),
+        "questions": lambda: create_questions(request.text, request.difficulty, request.count),
+        "flashcards": lambda: create_flashcards(request.text),
+        "vocabulary": lambda: create_vocabulary(request.text),
+        "mindmap": lambda: create_mindmap(request.text)
+    }
+    jobs = {a: generators[a] for a in artifacts if a not in refused}
+    logger.info(f"Generating study pack {list(jobs)} for user {user_id}")
+
+    return ndjson_response(_study_pack_stream(jobs, refused))
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import random
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Limiter Configuration ---
+LLM_INITIAL_CONCURRENCY = float(os.getenv("LLM_INITIAL_CONCURRENCY", "16"))
+LLM_MIN_CONCURRENCY = float(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = float(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_DECREASE_FACTOR = float(os.getenv("LLM_DECREASE_FACTOR", "0.5"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "500"))
+LLM_MAX_RPS = float(os.getenv("LLM_MAX_RPS", "0"))  # 0 disables the token bucket
+LLM_QUEUE_JITTER = float(os.getenv("LLM_QUEUE_JITTER", "0.25"))
+MAX_RETRY_AFTER = 60.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given either as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 0.0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return None
+
+
+class SlotOutcome:
+    """What happened to the request made while holding a limiter slot"""
+    __slots__ = ("success", "throttled", "retry_after")
+
+    def __init__(self):
+        self.success = False
+        self.throttled = False
+        self.retry_after: Optional[float] = None
+
+    def succeeded(self) -> None:
+        self.success = True
+
+    def rate_limited(self, retry_after: Optional[float] = None) -> None:
+        self.throttled = True
+        self.retry_after = retry_after
+
+
+class AdaptiveRateLimiter:
+    """
+    Process-wide AIMD concurrency limiter for upstream LLM calls.
+
+    The concurrency limit grows by roughly one slot per window of successful
+    calls and is cut multiplicatively on a 429 (at most once per cooldown, so
+    a burst of 429s from the same overload only counts once). A Retry-After
+    from upstream closes the gate for every caller until it expires, and
+    queued callers are released with random jitter so retries do not all
+    land at the same instant. An optional token bucket caps requests/second.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = LLM_INITIAL_CONCURRENCY,
+        min_limit: float = LLM_MIN_CONCURRENCY,
+        max_limit: float = LLM_MAX_CONCURRENCY,
+        decrease_factor: float = LLM_DECREASE_FACTOR,
+        max_queue: int = LLM_MAX_QUEUE,
+        max_rps: float = LLM_MAX_RPS,
+        jitter: float = LLM_QUEUE_JITTER
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.max_queue = max_queue
+        self.max_rps = max_rps
+        self.jitter = jitter
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._tokens = max_rps
+        self._tokens_updated = time.monotonic()
+        self.counters = {"acquired": 0, "throttled": 0, "rejected": 0}
+
+    # --- Gates ---
+    async def _wait_for_gate(self) -> None:
+        """Sleeps while a Retry-After is active or the token bucket is empty"""
+        while True:
+            now = time.monotonic()
+            delay = self._blocked_until - now
+
+            if delay <= 0 and self.max_rps > 0:
+                self._tokens = min(self.max_rps, self._tokens + (now - self._tokens_updated) * self.max_rps)
+                self._tokens_updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.max_rps
+            elif delay <= 0:
+                return
+
+            await asyncio.sleep(delay + random.uniform(0, self.jitter))
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    # --- Slot lifecycle ---
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="AI service is busy, please retry shortly"
+                )
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # A slot was handed to us just before cancellation; pass it on
+                    self.in_flight -= 1
+                    self._wake_waiters()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+
+        try:
+            await self._wait_for_gate()
+        except asyncio.CancelledError:
+            self.in_flight -= 1
+            self._wake_waiters()
+            raise
+        self.counters["acquired"] += 1
+
+    def release(self, outcome: SlotOutcome) -> None:
+        self.in_flight -= 1
+        now = time.monotonic()
+
+        if outcome.throttled:
+            self.counters["throttled"] += 1
+            if outcome.retry_after:
+                self._blocked_until = max(self._blocked_until, now + outcome.retry_after)
+            # One multiplicative decrease per cooldown window
+            if now - self._last_decrease > 1.0:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease = now
+                logger.warning(f"Together AI throttled; concurrency limit cut to {self.limit:.1f}")
+        elif outcome.success:
+            self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        """
+        Holds one concurrency slot for the duration of an upstream call.
+        Raises asyncio.TimeoutError if no slot is free within timeout seconds.
+        """
+        if timeout is None:
+            await self.acquire()
+        else:
+            await asyncio.wait_for(self.acquire(), timeout=timeout)
+        outcome = SlotOutcome()
+        try:
+            yield outcome
+        finally:
+            self.release(outcome)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            **self.counters,
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "blocked_for_s": round(max(0.0, self._blocked_until - time.monotonic()), 2)
+        }
+
+
+llm_rate_limiter = AdaptiveRateLimiter()
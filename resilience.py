@@ -0,0 +1,189 @@
+import asyncio
+import os
+import time
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Resilience Configuration ---
+LLM_CALL_BUDGET_S = float(os.getenv("LLM_CALL_BUDGET_S", "45"))
+LLM_MIN_ATTEMPT_S = float(os.getenv("LLM_MIN_ATTEMPT_S", "5"))
+LLM_HEDGING = os.getenv("LLM_HEDGING", "0") == "1"
+LLM_HEDGE_DELAY_S = float(os.getenv("LLM_HEDGE_DELAY_S", "12"))
+LLM_HEDGE_MIN_SAMPLES = 20
+BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "50"))
+BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+
+class Deadline:
+    """A time budget shared by every attempt of one logical request"""
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to pick the hedge delay"""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.counters = {"hedges": 0, "hedge_wins": 0}
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self._samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+    def hedge_delay(self) -> float:
+        p95 = self.percentile(0.95)
+        return p95 if p95 is not None else LLM_HEDGE_DELAY_S
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            **self.counters,
+            "p50_s": round(p50, 2) if p50 is not None else None,
+            "p95_s": round(p95, 2) if p95 is not None else None
+        }
+
+
+class CircuitBreaker:
+    """
+    Fails fast when the upstream error rate spikes.
+
+    CLOSED: calls pass; outcomes go into a rolling window. Once the window has
+    enough calls and the error rate crosses the threshold the breaker OPENS.
+    OPEN: calls are rejected with 503 until the cooldown elapses.
+    HALF_OPEN: a single probe call is let through; success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        error_rate: float = BREAKER_ERROR_RATE,
+        cooldown_s: float = BREAKER_COOLDOWN_S
+    ):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown_s = cooldown_s
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.counters = {"rejected": 0, "opened": 0}
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.cooldown_s:
+                self.counters["rejected"] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="AI service is temporarily unavailable, please retry shortly"
+                )
+            self.state = "half_open"
+            self._probe_in_flight = False
+
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                self.counters["rejected"] += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="AI service is recovering, please retry shortly"
+                )
+            self._probe_in_flight = True
+
+    def record(self, success: Optional[bool]) -> None:
+        """Records a call outcome; None means it says nothing about upstream health"""
+        if self.state == "half_open":
+            self._probe_in_flight = False
+            if success is None:
+                return
+            if success:
+                logger.info("Circuit breaker closed after successful probe")
+                self.state = "closed"
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+
+        if success is None:
+            return
+        self._outcomes.append(success)
+        if len(self._outcomes) >= self.min_calls:
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.error_rate:
+                self._open()
+
+    def _open(self) -> None:
+        logger.error("Circuit breaker opened: upstream error rate too high")
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.counters["opened"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        failures = self._outcomes.count(False)
+        return {
+            **self.counters,
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_error_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0
+        }
+
+
+async def hedged_call(fn: Callable[[], Awaitable[Any]], delay: float) -> Any:
+    """
+    Runs fn(); if it has not finished after `delay` seconds, starts a second
+    identical call and returns whichever succeeds first. The loser is
+    cancelled. If both fail, the last error is raised.
+    """
+    first = asyncio.ensure_future(fn())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return first.result()
+
+        logger.info(f"Hedging slow AI request after {delay:.1f}s")
+        llm_latency.counters["hedges"] += 1
+        tasks.append(asyncio.ensure_future(fn()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        llm_latency.counters["hedge_wins"] += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+llm_latency = LatencyTracker()
+llm_circuit_breaker = CircuitBreaker()
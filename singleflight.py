@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream call.
+
+    The first caller for a key starts the work as an independent task; callers
+    that arrive while it is in flight await the same task and receive the same
+    result or exception. A caller that is cancelled (e.g. the client went
+    away) stops waiting without affecting the others, and the upstream call
+    is only cancelled once no callers are left waiting on it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.counters = {"leaders": 0, "shared": 0, "abandoned": 0}
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.counters["leaders"] += 1
+        else:
+            self.counters["shared"] += 1
+            logger.info(f"Joining in-flight request ({call.waiters} already waiting)")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is left to receive the result; stop the upstream call
+                self._forget(key, call)
+                call.task.cancel()
+                self.counters["abandoned"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "in_flight": len(self._calls)}
+
+
+llm_singleflight = SingleFlight()
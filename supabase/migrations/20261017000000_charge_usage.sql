@@ -0,0 +1,110 @@
+-- Checks, resets and increments feature usage in one atomic statement per
+-- feature, called by usage_limiter.charge_usage_batch as the charge_usage RPC.
+--
+-- p_limits is the PLAN_LIMITS table from usage_limiter, as
+-- {"plan": {"feature": {"limit": n | null, "period": "day" | "month"}}};
+-- a null limit means unlimited. p_today is the caller's date, so periods
+-- roll over on the same calendar as before.
+--
+-- One row is returned per requested feature:
+--   period is null when the feature is not part of the user's plan,
+--   usage_limit is null when the plan allows unlimited use,
+--   charged is false when the limit is reached, with used_count the current count.
+-- No rows are returned when the user does not exist.
+--
+-- Relies on the unique (user_id, feature) key of usage_limits that the
+-- previous select-then-upsert code already used.
+
+create or replace function public.charge_usage(
+    p_user_id uuid,
+    p_features text[],
+    p_limits jsonb,
+    p_today date default current_date,
+    p_amount integer default 1
+)
+returns table (
+    feature text,
+    plan text,
+    used_count integer,
+    usage_limit integer,
+    period text,
+    charged boolean
+)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+    v_plan text;
+    v_feature text;
+    v_rule jsonb;
+    v_limit integer;
+    v_period text;
+    v_reset date;
+    v_used integer;
+begin
+    select coalesce(u.plan, 'free') into v_plan from users u where u.id = p_user_id;
+    if not found then
+        return;
+    end if;
+
+    foreach v_feature in array p_features loop
+        v_rule := p_limits -> v_plan -> v_feature;
+        feature := v_feature;
+        plan := v_plan;
+        used_count := null;
+        usage_limit := null;
+        period := null;
+        charged := false;
+
+        if v_rule is null then
+            return next;
+            continue;
+        end if;
+
+        v_limit := (v_rule ->> 'limit')::integer;
+        v_period := v_rule ->> 'period';
+        v_reset := case when v_period = 'month' then date_trunc('month', p_today)::date else p_today end;
+        usage_limit := v_limit;
+        period := v_period;
+        v_used := null;
+
+        -- A row from an earlier period restarts at p_amount; a current one is
+        -- only incremented while it stays within the limit. The row lock taken
+        -- by the upsert serializes concurrent charges for the same feature.
+        if v_limit is null or p_amount <= v_limit then
+            insert into usage_limits as ul (user_id, feature, used_count, reset_at)
+            values (p_user_id, v_feature, p_amount, v_reset)
+            on conflict (user_id, feature) do update
+                set used_count = case
+                        when ul.reset_at is null or ul.reset_at < v_reset then p_amount
+                        else ul.used_count + p_amount
+                    end,
+                    reset_at = greatest(coalesce(ul.reset_at, v_reset), v_reset)
+                where ul.reset_at is null
+                    or ul.reset_at < v_reset
+                    or v_limit is null
+                    or ul.used_count + p_amount <= v_limit
+            returning ul.used_count into v_used;
+        end if;
+
+        if v_used is not null then
+            used_count := v_used;
+            charged := true;
+        else
+            select case when ul.reset_at < v_reset then 0 else ul.used_count end
+                into v_used
+                from usage_limits ul
+                where ul.user_id = p_user_id and ul.feature = v_feature;
+            used_count := coalesce(v_used, 0);
+        end if;
+        return next;
+    end loop;
+end;
+$$;
+
+-- Only the backend's service role may charge usage; clients must not be able
+-- to call this with limits of their own
+revoke all on function public.charge_usage(uuid, text[], jsonb, date, integer) from public, anon, authenticated;
+grant execute on function public.charge_usage(uuid, text[], jsonb, date, integer) to service_role;
@@ -0,0 +1,141 @@
+import math
+import re
+import unicodedata
+import logging
+from collections import Counter
+from typing import List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Normalization Configuration ---
+HEADER_FOOTER_EDGE_LINES = 2    # lines at the top and bottom of a page checked for repeats
+HEADER_FOOTER_MIN_PAGES = 3
+HEADER_FOOTER_MIN_SHARE = 0.5   # a line is furniture if it repeats on this share of pages
+SENTENCE_BACKOFF = 0.9          # a cut may move back to a sentence end in its last 10%
+
+# A line-end hyphen before a letter ("exam-\nple"); _join_hyphenated checks the letter before
+_HYPHENATION_RE = re.compile(r"([-\u00ad\u2010\u2011])[ \t]*\r?\n[ \t]*(?=[^\W\d_])")
+# Glyphs pdfminer could not map to Unicode
+_PDF_CID_RE = re.compile(r"\(cid:\d+\)")
+_DIGITS_RE = re.compile(r"\d+")
+# Sentence ends: Latin/Devanagari/Arabic punctuation before a space; CJK needs none
+_SENTENCE_END_RE = re.compile(
+    r"[.!?\u2026\u0964\u0965\u061f][\"'\u201d\u2019\u00bb)\]]*(?=\s)"
+    r"|[\u3002\uff01\uff1f][\u201d\u300d\u300f\uff09]*"
+)
+
+
+# Control characters become spaces. Invisible formatting characters and
+# private-use glyphs (PDF symbol fonts) are dropped. Letters in every script
+# are left alone, and so are ZWJ/ZWNJ, which Indic and Arabic text needs.
+# ASCII text goes through a translate table, which has a C fast path for it;
+# for anything else one compiled character class beats per-character lookups.
+_CONTROL_CHARS = "\x00-\x08\x0b\x0c\x0e-\x1f\x7f"
+_ASCII_TABLE = str.maketrans({chr(code): " " for code in [*range(0x00, 0x20), 0x7f] if chr(code) not in "\t\n\r"})
+_STRAY_CHARS_RE = re.compile(
+    f"[{_CONTROL_CHARS}\x80-\x9f\u00ad\u200b\u200e\u200f\u202a-\u202e\u2060-\u2064"
+    "\u2066-\u2069\ufeff\ufff9-\ufffb\ufffd\ue000-\uf8ff]"
+)
+
+
+def _replace_stray(match: "re.Match") -> str:
+    return " " if match.group(0) < "\xa0" else ""
+
+
+def _join_hyphenated(match: "re.Match") -> str:
+    # "exam-\nple" -> "example", but "Jean-\nPaul" keeps its hyphen
+    start = match.start()
+    before = match.string[start - 1] if start else ""
+    if not (before.isalpha() or unicodedata.category(before or " ").startswith("M")):
+        return match.group(0)
+    hyphen = match.group(1)
+    if match.string[match.end()].islower() or hyphen == "\u00ad":
+        return ""
+    return hyphen
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes extracted text into a single line: repairs words hyphenated
+    across line breaks, drops control and invisible characters, applies NFKC
+    (ligatures like "ﬁ", full-width forms, compatibility spaces) and collapses
+    whitespace. Non-Latin scripts are kept as they are.
+    """
+    if not text:
+        return ""
+    if "(cid:" in text:
+        text = _PDF_CID_RE.sub("", text)
+    if "\n" in text:
+        text = _HYPHENATION_RE.sub(_join_hyphenated, text)
+    if text.isascii():
+        text = text.translate(_ASCII_TABLE)
+    else:
+        text = _STRAY_CHARS_RE.sub(_replace_stray, text)
+        if not unicodedata.is_normalized("NFKC", text):
+            text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def _edge_key(line: str) -> str:
+    # Page numbers and dates change from page to page; compare the rest
+    return _DIGITS_RE.sub("#", " ".join(line.split()).lower())
+
+
+def strip_page_furniture(pages: List[str]) -> List[str]:
+    """
+    Removes running headers and footers: lines near the top or bottom of a
+    page that, ignoring digits, repeat on at least HEADER_FOOTER_MIN_SHARE of
+    the pages ("Chapter 3 | Page 12", course codes, copyright lines). Takes
+    and returns raw page texts, before normalize_text joins their lines.
+    """
+    if len(pages) < HEADER_FOOTER_MIN_PAGES:
+        return pages
+
+    page_lines = []
+    counts: Counter = Counter()
+    for page in pages:
+        lines = page.splitlines()
+        filled = [index for index, line in enumerate(lines) if line.strip()]
+        edges = set(filled[:HEADER_FOOTER_EDGE_LINES] + filled[-HEADER_FOOTER_EDGE_LINES:])
+        keys = {index: _edge_key(lines[index]) for index in edges}
+        counts.update(set(keys.values()))
+        page_lines.append((lines, keys))
+
+    threshold = max(HEADER_FOOTER_MIN_PAGES, math.ceil(len(pages) * HEADER_FOOTER_MIN_SHARE))
+    repeated = {key for key, count in counts.items() if count >= threshold}
+    if not repeated:
+        return pages
+
+    logger.info(f"Removing {len(repeated)} repeated header/footer lines across {len(pages)} pages")
+    return [
+        "\n".join(line for index, line in enumerate(lines) if keys.get(index) not in repeated)
+        for lines, keys in page_lines
+    ]
+
+
+def sentence_boundary(text: str, cut: int) -> int:
+    """
+    Moves a cut position back to the end of the last sentence in the final
+    (1 - SENTENCE_BACKOFF) of text[:cut], or else to the last word break
+    there. Knows Latin, CJK, Devanagari and Arabic sentence punctuation.
+    """
+    if cut >= len(text):
+        return len(text)
+    window_start = int(cut * SENTENCE_BACKOFF)
+    sentence_end = None
+    # One character past the cut so a sentence ending right at it still sees its space
+    for match in _SENTENCE_END_RE.finditer(text, window_start, cut + 1):
+        if match.end() <= cut:
+            sentence_end = match.end()
+    if sentence_end is not None:
+        return sentence_end
+    space = text.rfind(" ", window_start, cut)
+    return space if space > 0 else cut
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Cuts text to at most max_chars, ending on a sentence boundary where possible"""
+    if len(text) <= max_chars:
+        return text
+    return text[:sentence_boundary(text, max_chars)].rstrip()
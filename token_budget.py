@@ -0,0 +1,212 @@
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from text_normalize import sentence_boundary
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Token Budget Configuration ---
+MIXTRAL_CONTEXT_TOKENS = int(os.getenv("MIXTRAL_CONTEXT_TOKENS", "32768"))
+MIXTRAL_TOKENIZER_PATH = os.getenv("MIXTRAL_TOKENIZER_PATH")  # tokenizer.json for mistralai/Mixtral-8x7B
+CONTEXT_SAFETY_MARGIN = 256
+MESSAGE_OVERHEAD_TOKENS = 4  # [INST] / role markers around each chat message
+MIN_OUTPUT_TOKENS = 256
+# Largest slice of extracted text sent to a single call: the context window
+# minus the biggest output budget and room for the system prompt
+LLM_INPUT_TOKEN_BUDGET = int(os.getenv(
+    "LLM_INPUT_TOKEN_BUDGET",
+    str(MIXTRAL_CONTEXT_TOKENS - 4096 - 1024)
+))
+
+# (floor, share of input tokens, ceiling) for max_tokens per endpoint
+OUTPUT_PROFILES = {
+    "summary": (512, 0.15, 2048),
+    "flashcards": (768, 0.2, 3072),
+    "vocabulary": (512, 0.12, 2048),
+    "humanize": (256, 1.3, 4096),
+    "handwritten": (256, 1.4, 4096),
+    "mindmap": (512, 0.1, 1536),
+    "diagram": (512, 0.1, 1536),
+    "follow_up": (300, 0.0, 300)
+}
+TOKENS_PER_QUESTION = 120
+# Counts of prompts and chunks up to this size are memoized; whole documents
+# are counted afresh rather than kept alive by the cache
+TOKEN_COUNT_CACHE_MAX_CHARS = 8192
+
+_WORD_RE = re.compile(r"[A-Za-z]+")
+_DIGIT_RE = re.compile(r"\d")
+_SYMBOL_RE = re.compile(r"[^\w\s]")
+
+
+def _load_tokenizer():
+    """Loads a local Mixtral tokenizer if one is configured; `tokenizers` is optional"""
+    if not MIXTRAL_TOKENIZER_PATH:
+        return None
+    try:
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_file(MIXTRAL_TOKENIZER_PATH)
+        logger.info(f"Loaded Mixtral tokenizer from {MIXTRAL_TOKENIZER_PATH}")
+        return tokenizer
+    except Exception as e:
+        logger.warning(f"Mixtral tokenizer unavailable, using estimator: {str(e)}")
+        return None
+
+
+_tokenizer = _load_tokenizer()
+
+# Estimated vs. actual prompt tokens reported by Together; the running ratio
+# corrects the estimator for the kind of text users actually send
+usage_stats = {
+    "calls": 0,
+    "estimated_prompt_tokens": 0,
+    "actual_prompt_tokens": 0,
+    "completion_tokens": 0,
+    "max_tokens_requested": 0,
+    "correction": 1.0
+}
+
+
+def _raw_estimate(text: str) -> int:
+    """
+    Fast SentencePiece-style estimate: common English words are usually one
+    token and long words a few; Mistral splits every digit; symbols and
+    non-ASCII characters mostly cost a token each.
+    """
+    words = _WORD_RE.findall(text)
+    word_tokens = sum(1 + len(word) // 7 for word in words)
+    digits = len(_DIGIT_RE.findall(text))
+    symbols = len(_SYMBOL_RE.findall(text))
+    non_ascii = len(text) - len(text.encode("ascii", "ignore"))
+    return max(1, word_tokens + digits + symbols + non_ascii)
+
+
+def _tokenize_count(text: str) -> int:
+    return len(_tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+_cached_raw_estimate = lru_cache(maxsize=4096)(_raw_estimate)
+_cached_tokenize_count = lru_cache(maxsize=4096)(_tokenize_count)
+
+
+def count_tokens(text: str, calibrated: bool = True) -> int:
+    """
+    Token count from the Mixtral tokenizer when available, otherwise the
+    estimator. calibrated=False skips the usage-based correction, for callers
+    (like chunking) that need the same answer for the same text every time.
+    """
+    if not text:
+        return 0
+    cached = len(text) <= TOKEN_COUNT_CACHE_MAX_CHARS
+    if _tokenizer is not None:
+        return (_cached_tokenize_count if cached else _tokenize_count)(text)
+    correction = usage_stats["correction"] if calibrated else 1.0
+    return max(1, int((_cached_raw_estimate if cached else _raw_estimate)(text) * correction))
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, calibrated: bool = False) -> str:
+    """
+    Cuts text to at most max_tokens, preferring a sentence or word boundary.
+    Uncalibrated by default, so the same text is always cut at the same place
+    (extracted text feeds LLM cache keys); fit_to_context measures against
+    the real context window and asks for the calibrated count.
+    """
+    total = count_tokens(text, calibrated)
+    if total <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    if _tokenizer is not None:
+        encoding = _tokenizer.encode(text, add_special_tokens=False)
+        cut = encoding.offsets[max_tokens - 1][1]
+    else:
+        correction = usage_stats["correction"] if calibrated else 1.0
+        cut = int(len(text) * max_tokens / total)
+        # Uncached: every prefix tried here is a one-off
+        while cut > 0 and int(_raw_estimate(text[:cut]) * correction) > max_tokens:
+            cut = int(cut * 0.95)
+
+    cut = sentence_boundary(text, cut)
+    logger.warning(f"Text truncated to ~{max_tokens} tokens ({cut} characters)")
+    return text[:cut].rstrip()
+
+
+def output_budget(kind: str, text: str = "", items: Optional[int] = None) -> int:
+    """
+    max_tokens for an endpoint, scaled to how much output its input warrants.
+    Uses the uncalibrated count so the same text always gets the same budget
+    (max_tokens is part of the LLM cache key).
+    """
+    if kind == "questions":
+        return min(4096, max(512, TOKENS_PER_QUESTION * (items or 5) + 200))
+    floor, share, ceiling = OUTPUT_PROFILES[kind]
+    return int(min(ceiling, max(floor, count_tokens(text, calibrated=False) * share)))
+
+
+def fit_to_context(
+    messages: List[Dict[str, str]],
+    max_tokens: int,
+    context_tokens: int = MIXTRAL_CONTEXT_TOKENS
+) -> Tuple[List[Dict[str, str]], int]:
+    """
+    Makes a request fit the model's context window: first shrinks max_tokens
+    (down to MIN_OUTPUT_TOKENS), then trims the content of the last message.
+    """
+    available = context_tokens - CONTEXT_SAFETY_MARGIN
+    prompt_tokens = count_message_tokens(messages)
+    if prompt_tokens + max_tokens <= available:
+        return messages, max_tokens
+
+    min_output = min(max_tokens, MIN_OUTPUT_TOKENS)
+    if prompt_tokens + min_output <= available:
+        return messages, available - prompt_tokens
+
+    overflow = prompt_tokens + min_output - available
+    last = messages[-1]
+    trimmed = truncate_to_tokens(
+        last["content"], count_tokens(last["content"]) - overflow, calibrated=True
+    )
+    return messages[:-1] + [{**last, "content": trimmed}], min_output
+
+
+def record_usage(messages: List[Dict[str, str]], max_tokens: int, usage: Optional[Dict]) -> None:
+    """Records Together's reported usage against our estimate for the same prompt"""
+    if not usage or "prompt_tokens" not in usage:
+        return
+    estimated = count_message_tokens(messages)
+    actual = usage["prompt_tokens"]
+    usage_stats["calls"] += 1
+    usage_stats["estimated_prompt_tokens"] += estimated
+    usage_stats["actual_prompt_tokens"] += actual
+    usage_stats["completion_tokens"] += usage.get("completion_tokens", 0)
+    usage_stats["max_tokens_requested"] += max_tokens
+
+    if _tokenizer is None and estimated > 0:
+        # Exponential moving average of the actual/raw-estimate ratio
+        raw = estimated / usage_stats["correction"]
+        ratio = min(3.0, max(0.33, actual / raw))
+        usage_stats["correction"] = 0.9 * usage_stats["correction"] + 0.1 * ratio
+
+
+def budget_stats() -> Dict[str, float]:
+    calls = usage_stats["calls"]
+    return {
+        **usage_stats,
+        "correction": round(usage_stats["correction"], 3),
+        "tokenizer": "mixtral" if _tokenizer is not None else "estimator",
+        "estimate_error": round(
+            usage_stats["estimated_prompt_tokens"] / usage_stats["actual_prompt_tokens"] - 1, 3
+        ) if usage_stats["actual_prompt_tokens"] else None,
+        "output_utilization": round(
+            usage_stats["completion_tokens"] / usage_stats["max_tokens_requested"], 3
+        ) if calls else None
+    }
@@ -0,0 +1,88 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from two_tier_cache import TwoTierCache
+
+# --- Cache Configuration ---
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "1") == "1"
+TRANSCRIPT_CACHE_DB_PATH = os.getenv("TRANSCRIPT_CACHE_DB_PATH", "transcript_cache.sqlite3")
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "128"))  # lectures run to 100s of KB
+TRANSCRIPT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_DISK_MAX_ENTRIES", "20000"))
+# Captions are occasionally corrected after upload, so entries are refetched after this
+TRANSCRIPT_CACHE_TTL_SECONDS = int(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# Bump whenever the stored transcript format or caption parsing changes
+TRANSCRIPT_CACHE_VERSION = 1
+PRUNE_EVERY_N_WRITES = 200
+
+# Language key for "whatever track the fetcher picks by default"
+DEFAULT_LANGUAGE = "*"
+
+
+class TranscriptCache(TwoTierCache):
+    """
+    Video transcripts with their timestamped segments, keyed by video ID and
+    caption language. Entries older than ttl_seconds or from an earlier
+    TRANSCRIPT_CACHE_VERSION are refetched.
+    """
+
+    name = "Transcript"
+    schema = (
+        "CREATE TABLE IF NOT EXISTS transcripts ("
+        "video_id TEXT NOT NULL, language TEXT NOT NULL, value TEXT NOT NULL, "
+        "fetched_at REAL NOT NULL, PRIMARY KEY (video_id, language))",
+    )
+    prune_every = PRUNE_EVERY_N_WRITES
+
+    def __init__(
+        self,
+        db_path: Optional[str] = TRANSCRIPT_CACHE_DB_PATH,
+        max_entries: int = TRANSCRIPT_CACHE_MAX_ENTRIES,
+        disk_max_entries: int = TRANSCRIPT_CACHE_DISK_MAX_ENTRIES,
+        ttl_seconds: int = TRANSCRIPT_CACHE_TTL_SECONDS
+    ):
+        self.disk_max_entries = disk_max_entries
+        self.ttl_seconds = ttl_seconds
+        super().__init__(db_path, max_entries)
+
+    def _valid(self, entry: Dict[str, Any]) -> bool:
+        return (
+            entry.get("version") == TRANSCRIPT_CACHE_VERSION
+            and time.time() - entry.get("fetched_at", 0) < self.ttl_seconds
+        )
+
+    # --- Disk tier ---
+    def _disk_get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value FROM transcripts WHERE video_id = ? AND language = ?", key
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _disk_set(self, key: Tuple[str, str], entry: Dict[str, Any]) -> None:
+        self._disk_write(
+            "INSERT OR REPLACE INTO transcripts (video_id, language, value, fetched_at) VALUES (?, ?, ?, ?)",
+            (*key, json.dumps(entry, ensure_ascii=False), entry["fetched_at"])
+        )
+
+    def _prune(self) -> None:
+        self._db.execute(
+            "DELETE FROM transcripts WHERE fetched_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        self._db.execute(
+            "DELETE FROM transcripts WHERE rowid IN ("
+            "SELECT rowid FROM transcripts ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+
+    # --- Public API ---
+    async def get(self, video_id: str, language: str = DEFAULT_LANGUAGE) -> Optional[Dict[str, Any]]:
+        return await self._lookup((video_id, language))
+
+    async def set(self, video_id: str, language: str, transcript: Dict[str, Any]) -> None:
+        entry = {**transcript, "version": TRANSCRIPT_CACHE_VERSION, "fetched_at": time.time()}
+        await self._store((video_id, language), entry)
+
+
+transcript_cache = TranscriptCache() if TRANSCRIPT_CACHE_ENABLED else None
@@ -0,0 +1,132 @@
+import asyncio
+import sqlite3
+import threading
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TwoTierCache(ABC):
+    """
+    An in-process LRU in front of a SQLite table that survives restarts.
+    Disk access runs in a worker thread so lookups never block the event
+    loop, and a broken disk tier only costs hits, never a request.
+
+    Subclasses set `name`, `schema` and `prune_every`, and implement the
+    table-specific parts: `_disk_get` (a decoded entry or None),
+    `_disk_set` (usually through `_disk_write`) and `_prune`. They may
+    override `_valid` to reject stale entries from either tier and
+    `_entry_size` to bound memory by something other than entry count.
+    """
+
+    name = "Cache"
+    schema: Tuple[str, ...] = ()
+    prune_every = 200
+
+    def __init__(self, db_path: Optional[str], memory_limit: int):
+        self.memory_limit = memory_limit
+        self._memory: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._memory_size = 0
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                for statement in self.schema:
+                    self._db.execute(statement)
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"{self.name} cache disk tier disabled: {str(e)}")
+                self._db = None
+
+    def _valid(self, entry: Any) -> bool:
+        return True
+
+    def _entry_size(self, entry: Any) -> int:
+        return 1
+
+    # --- Memory tier ---
+    def _memory_pop(self, key: Hashable) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_size -= self._entry_size(entry)
+
+    def _memory_set(self, key: Hashable, entry: Any) -> None:
+        self._memory_pop(key)
+        self._memory[key] = entry
+        self._memory_size += self._entry_size(entry)
+        while self._memory_size > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= self._entry_size(evicted)
+
+    # --- Disk tier ---
+    @abstractmethod
+    def _disk_get(self, key: Hashable) -> Any:
+        """The decoded entry stored under key, or None"""
+
+    @abstractmethod
+    def _disk_set(self, key: Hashable, entry: Any) -> None:
+        """Stores entry under key, usually through _disk_write"""
+
+    @abstractmethod
+    def _prune(self) -> None:
+        """Runs under the database lock every prune_every writes"""
+
+    def _disk_write(self, sql: str, params: tuple) -> None:
+        with self._db_lock:
+            self._db.execute(sql, params)
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+            self._db.commit()
+
+    async def _disk_call(self, operation: str, fn: Callable, *args) -> Any:
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except sqlite3.Error as e:
+            logger.error(f"{self.name} cache {operation} failed: {str(e)}")
+            self.counters["errors"] += 1
+            return None
+
+    # --- Lookup and store ---
+    async def _lookup(self, key: Hashable) -> Any:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if self._valid(entry):
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry
+            self._memory_pop(key)
+
+        if self._db is not None:
+            entry = await self._disk_call("read", self._disk_get, key)
+            if entry is not None and self._valid(entry):
+                self.counters["disk_hits"] += 1
+                self._memory_set(key, entry)
+                return entry
+
+        self.counters["misses"] += 1
+        return None
+
+    async def _store(self, key: Hashable, entry: Any) -> None:
+        self._memory_set(key, entry)
+        self.counters["stores"] += 1
+        if self._db is not None:
+            await self._disk_call("write", self._disk_set, key, entry)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        return {
+            **self.counters,
+            "memory_entries": len(self._memory),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
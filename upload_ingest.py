@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Upload Configuration ---
+MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "10"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None  # None: system temp dir
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # boundaries and part headers around the file
+UPLOAD_BATCH_MAX_FILES = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "10"))
+# Files of one batch extracted at once; each PDF already fans out across the pool
+UPLOAD_BATCH_CONCURRENCY = int(os.getenv("UPLOAD_BATCH_CONCURRENCY", "4"))
+
+
+def file_size_limit_error(max_mb: int = MAX_FILE_SIZE_MB) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File size exceeds maximum allowed {max_mb}MB"
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that caps request bodies on upload routes while they are
+    still arriving. A Content-Length over the cap is rejected before any of
+    the body is read; otherwise bytes are counted as the server hands them
+    over and the request fails with 413 as soon as the cap is crossed, instead
+    of after the whole body has been spooled.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(send, limit)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning(f"Upload to {scope['path']} aborted after {received} bytes")
+                    raise file_size_limit_error(limit // (1024 * 1024))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(send, limit: int) -> None:
+        body = f'{{"detail":"File size exceeds maximum allowed {limit // (1024 * 1024)}MB"}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def upload_request_limit(max_files: int = 1, max_mb: int = MAX_FILE_SIZE_MB) -> int:
+    """Largest multipart body accepted for a route taking max_files files"""
+    return max_files * (max_mb * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES)
+
+
+class SpooledUpload:
+    """An upload copied to a named temp file that extraction workers can open and mmap"""
+
+    def __init__(self, path: str, size: int, filename: str, content_type: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.filename = filename
+        self.content_type = content_type
+        self.sha256: Optional[str] = None  # hex digest of the content, set once fully spooled
+
+    def close(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_chunk(handle, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+@asynccontextmanager
+async def spooled_upload(
+    upload: UploadFile,
+    max_bytes: int = MAX_FILE_SIZE_MB * 1024 * 1024
+) -> AsyncIterator[SpooledUpload]:
+    """
+    Streams an UploadFile to a named temp file in fixed-size chunks, hashing
+    it on the way, and fails with 413 as soon as it passes max_bytes. Memory
+    use stays at one chunk no matter how large the file is; the temp file is
+    removed on exit.
+    """
+    handle = tempfile.NamedTemporaryFile(prefix="upload-", dir=UPLOAD_SPOOL_DIR, delete=False)
+    spooled = SpooledUpload(handle.name, 0, upload.filename or "", upload.content_type)
+    digest = hashlib.sha256()
+    try:
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                spooled.size += len(chunk)
+                if spooled.size > max_bytes:
+                    raise file_size_limit_error(max_bytes // (1024 * 1024))
+                await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+        finally:
+            handle.close()
+        spooled.sha256 = digest.hexdigest()
+        yield spooled
+    finally:
+        spooled.close()
+
+
+
+def _write_file(path: str, body: bytes) -> None:
+    with open(path, "wb") as handle:
+        handle.write(body)
+
+
+@asynccontextmanager
+async def spooled_bytes(
+    body: bytes,
+    filename: str,
+    content_type: Optional[str] = None
+) -> AsyncIterator[SpooledUpload]:
+    """
+    A document already held in memory (e.g. fetched from a link) as a
+    SpooledUpload, so it goes through the same extraction path and cache as
+    an uploaded file. The temp file is removed on exit.
+    """
+    handle = tempfile.NamedTemporaryFile(prefix="upload-", dir=UPLOAD_SPOOL_DIR, delete=False)
+    handle.close()
+    spooled = SpooledUpload(handle.name, len(body), filename, content_type)
+    try:
+        await asyncio.to_thread(_write_file, spooled.path, body)
+        spooled.sha256 = hashlib.sha256(body).hexdigest()
+        yield spooled
+    finally:
+        spooled.close()
@@ -0,0 +1,368 @@
+import asyncio
+import io
+import os
+import re
+import time
+import zipfile
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+from fastapi import HTTPException
+
+from article_cache import article_cache, ARTICLE_CACHE_FRESH_SECONDS
+from singleflight import SingleFlight
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- URL Fetch Configuration ---
+URL_FETCH_MAX_BYTES = int(os.getenv("URL_FETCH_MAX_MB", "5")) * 1024 * 1024
+URL_FETCH_POOL_SIZE = int(os.getenv("URL_FETCH_POOL_SIZE", "32"))
+URL_FETCH_KEEPALIVE_CONNECTIONS = int(os.getenv("URL_FETCH_KEEPALIVE_CONNECTIONS", "16"))
+URL_FETCH_PER_HOST = int(os.getenv("URL_FETCH_PER_HOST", "4"))
+URL_FETCH_CONNECT_TIMEOUT = float(os.getenv("URL_FETCH_CONNECT_TIMEOUT", "5"))
+URL_FETCH_READ_TIMEOUT = float(os.getenv("URL_FETCH_READ_TIMEOUT", "10"))
+URL_FETCH_MAX_REDIRECTS = 5
+URL_FETCH_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+SNIFF_BYTES = 512
+URL_BATCH_MAX_URLS = int(os.getenv("URL_BATCH_MAX_URLS", "20"))
+# URLs of one batch fetched at once; URL_FETCH_PER_HOST still applies per site
+URL_BATCH_CONCURRENCY = int(os.getenv("URL_BATCH_CONCURRENCY", "8"))
+
+SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+# Query parameters that only track the click and never change the page
+TRACKING_PARAM_RE = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|mc_cid|mc_eid|igshid|_hsenc|_hsmi)$", re.IGNORECASE)
+# Declared types that say nothing about the body, so it is sniffed instead
+GENERIC_CONTENT_TYPES = frozenset({"", "application/octet-stream", "binary/octet-stream", "application/unknown", "text/plain"})
+ARTICLE_CONTENT_TYPES = frozenset({"text/html", "application/xhtml+xml", "text/plain"})
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+# Linked documents routed to the file extractors; plain zips are inspected
+DOCUMENT_CONTENT_TYPES = {
+    "application/pdf": "pdf",
+    DOCX_CONTENT_TYPE: "docx",
+    PPTX_CONTENT_TYPE: "pptx",
+    "application/zip": "zip"
+}
+LINKED_CONTENT_TYPES = ARTICLE_CONTENT_TYPES | frozenset(DOCUMENT_CONTENT_TYPES)
+
+_client: Optional[httpx.AsyncClient] = None
+counters = {"fetches": 0, "not_modified": 0, "bytes": 0, "too_large": 0, "wrong_type": 0,
+            "fresh_hits": 0, "revalidated": 0}
+
+
+def _with_scheme(url: str) -> str:
+    url = url.strip()
+    if not SCHEME_RE.match(url):
+        url = 'https://' + url
+    return url
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a page URL for caching: https:// added when no scheme
+    is given, lower-case scheme and host, default port, fragment and
+    tracking parameters dropped, remaining query parameters sorted.
+    Raises ValueError for anything that is not an http(s) URL with a host.
+    """
+    url = _with_scheme(url)
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if scheme not in ("http", "https") or not host:
+        raise ValueError(f"Not a web page URL: {url}")
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    port = parts.port
+    netloc = host if port is None or (scheme, port) in (("http", 80), ("https", 443)) else f"{host}:{port}"
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAM_RE.match(name)
+    ))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def sniff_content_type(declared: str, head: bytes) -> str:
+    """
+    The body's real type: magic bytes win over the Content-Type header, and
+    missing or generic headers fall back to looking for HTML markup
+    """
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"PK\x03\x04"):
+        # DOCX, PPTX and other OOXML packages
+        return declared if declared in (DOCX_CONTENT_TYPE, PPTX_CONTENT_TYPE) else "application/zip"
+    if declared not in GENERIC_CONTENT_TYPES:
+        return declared
+    start = head.lstrip()[:SNIFF_BYTES].lower()
+    if start.startswith((b"<!doctype html", b"<html")) or b"<head" in start or b"<body" in start:
+        return "text/html"
+    return declared or "application/octet-stream"
+
+
+class FetchResult:
+    """A fetched response body with the headers callers need"""
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        content_type: str,
+        charset: Optional[str],
+        body: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str]
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.content_type = content_type
+        self.charset = charset
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+
+class HostLimiter:
+    """
+    Caps concurrent fetches per host, so one slow or heavily requested site
+    cannot hold every pooled connection. Semaphores exist only while a host
+    has fetches in flight or waiting.
+    """
+
+    def __init__(self, per_host: int = URL_FETCH_PER_HOST):
+        self.per_host = per_host
+        self._hosts: Dict[str, List[Any]] = {}  # host -> [semaphore, fetches holding or waiting]
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._hosts[host]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_hosts": len(self._hosts),
+            "waiting": sum(max(0, users - self.per_host) for _, users in self._hosts.values())
+        }
+
+
+host_limiter = HostLimiter()
+article_singleflight = SingleFlight()
+
+
+def get_fetch_client() -> httpx.AsyncClient:
+    """Shared pooled client for fetching web pages, created lazily on the running event loop"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            max_redirects=URL_FETCH_MAX_REDIRECTS,
+            headers={'User-Agent': URL_FETCH_USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=URL_FETCH_POOL_SIZE,
+                max_keepalive_connections=URL_FETCH_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(URL_FETCH_READ_TIMEOUT, connect=URL_FETCH_CONNECT_TIMEOUT)
+        )
+        logger.info(f"Created URL fetch client (pool={URL_FETCH_POOL_SIZE}, per host={URL_FETCH_PER_HOST})")
+    return _client
+
+
+async def close_fetch_client() -> None:
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed URL fetch client")
+    _client = None
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    counters["too_large"] += 1
+    return HTTPException(
+        status_code=413,
+        detail=f"Page exceeds maximum allowed size of {max_bytes // (1024 * 1024)}MB"
+    )
+
+
+async def fetch_url(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    allowed_types: Optional[FrozenSet[str]] = None,
+    max_bytes: int = URL_FETCH_MAX_BYTES,
+    headers: Optional[Dict[str, str]] = None
+) -> FetchResult:
+    """
+    Streams a URL through the pooled client under its host's concurrency cap.
+    The body is abandoned as soon as it passes max_bytes (after decompression,
+    so gzip bombs are cut off too) or, once its first bytes are sniffed, turns
+    out not to be one of allowed_types. With etag/last_modified the request is
+    conditional, and a 304 comes back as a result with no body. headers are
+    sent on top of the client's defaults.
+    """
+    headers = dict(headers or {})
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    counters["fetches"] += 1
+    async with host_limiter.slot(urlsplit(url).hostname or ""):
+        async with get_fetch_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                counters["not_modified"] += 1
+                return FetchResult(str(response.url), 304, "", None, b"", etag, last_modified)
+            response.raise_for_status()
+
+            declared = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            content_length = response.headers.get("content-length", "")
+            if content_length.isdigit() and int(content_length) > max_bytes:
+                raise _too_large(max_bytes)
+
+            chunks = []
+            size = 0
+            content_type = None
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(max_bytes)
+                if content_type is None and size >= SNIFF_BYTES:
+                    content_type = sniff_content_type(declared, b"".join(chunks)[:SNIFF_BYTES])
+                    if allowed_types is not None and content_type not in allowed_types:
+                        break
+            body = b"".join(chunks)
+            if content_type is None:
+                content_type = sniff_content_type(declared, body[:SNIFF_BYTES])
+            if allowed_types is not None and content_type not in allowed_types:
+                counters["wrong_type"] += 1
+                raise HTTPException(status_code=415, detail=f"Unsupported content type at URL: {content_type}")
+
+            counters["bytes"] += size
+            return FetchResult(
+                str(response.url),
+                response.status_code,
+                content_type,
+                response.charset_encoding,
+                body,
+                response.headers.get("etag"),
+                response.headers.get("last-modified")
+            )
+
+
+def fetch_error(e: httpx.HTTPError) -> HTTPException:
+    """Maps an httpx failure to the HTTP error returned to the client"""
+    if isinstance(e, httpx.TimeoutException):
+        return HTTPException(status_code=408, detail="Request to URL timed out")
+    if isinstance(e, httpx.HTTPStatusError):
+        return HTTPException(
+            status_code=e.response.status_code,
+            detail=f"Error fetching URL: {e.response.status_code} {e.response.reason_phrase}"
+        )
+    if isinstance(e, httpx.ConnectError):
+        return HTTPException(status_code=503, detail="Could not connect to URL")
+    return HTTPException(status_code=500, detail=f"Failed to fetch URL: {str(e)}")
+
+
+async def _fetch_article(
+    url: str,
+    key: str,
+    extract: Callable[[FetchResult], Awaitable[str]],
+    allowed_types: FrozenSet[str],
+    max_bytes: int
+) -> Dict[str, Any]:
+    cached = await article_cache.get(key) if article_cache is not None else None
+    if cached is not None and cached.get("content_type") not in allowed_types:
+        # Cached by a caller that accepts more types (e.g. a linked PDF); this
+        # one must get the type check in fetch_url, so fetch without validators
+        cached = None
+    if cached is not None and time.time() - cached["validated_at"] < ARTICLE_CACHE_FRESH_SECONDS:
+        counters["fresh_hits"] += 1
+        return cached
+
+    result = await fetch_url(
+        url,
+        etag=cached.get("etag") if cached else None,
+        last_modified=cached.get("last_modified") if cached else None,
+        allowed_types=allowed_types,
+        max_bytes=max_bytes
+    )
+    if result.not_modified and cached is not None:
+        counters["revalidated"] += 1
+        cached = {**cached, "validated_at": time.time()}
+        await article_cache.set(key, cached)
+        return cached
+
+    entry = {
+        "text": await extract(result),
+        "content_type": result.content_type,
+        "etag": result.etag,
+        "last_modified": result.last_modified,
+        "validated_at": time.time()
+    }
+    if article_cache is not None and entry["text"]:
+        await article_cache.set(key, entry)
+    return entry
+
+
+async def fetch_article(
+    url: str,
+    extract: Callable[[FetchResult], Awaitable[str]],
+    allowed_types: FrozenSet[str] = ARTICLE_CONTENT_TYPES,
+    max_bytes: int = URL_FETCH_MAX_BYTES
+) -> Dict[str, Any]:
+    """
+    Extracted text for a URL, as {"text", "content_type", ...}. Cached text
+    is served as is while fresh and revalidated with a conditional GET after
+    that, so an unchanged page costs a 304 instead of a download and a parse.
+    Concurrent requests for the same normalized URL share one fetch. extract
+    should store the full text; callers cut it to their own budget.
+    """
+    key = normalize_url(url)
+    flight = f"{key} {','.join(sorted(allowed_types))}"
+    return await article_singleflight.do(
+        flight, lambda: _fetch_article(_with_scheme(url), key, extract, allowed_types, max_bytes)
+    )
+
+
+def document_kind(page: FetchResult) -> str:
+    """
+    Which extractor a fetched body needs: "html", "pdf", "docx" or "pptx".
+    Zip bodies served without an Office content type are told apart by
+    their main part, and page.content_type is corrected to match. Raises 415
+    for anything else.
+    """
+    if page.content_type in ARTICLE_CONTENT_TYPES:
+        return "html"
+    kind = DOCUMENT_CONTENT_TYPES.get(page.content_type)
+    if kind == "zip":
+        try:
+            names = set(zipfile.ZipFile(io.BytesIO(page.body)).namelist())
+        except zipfile.BadZipFile:
+            names = set()
+        kind = "docx" if "word/document.xml" in names else "pptx" if "ppt/presentation.xml" in names else None
+        if kind is not None:
+            page.content_type = DOCX_CONTENT_TYPE if kind == "docx" else PPTX_CONTENT_TYPE
+    if kind is None:
+        counters["wrong_type"] += 1
+        raise HTTPException(status_code=415, detail=f"Unsupported content type at URL: {page.content_type}")
+    return kind
+
+
+def url_fetch_stats() -> Dict[str, Any]:
+    return {**counters, **host_limiter.stats(), "singleflight": article_singleflight.stats()}
@@ -1,9 +1,14 @@
 from fastapi import Request, HTTPException, Depends
-from datetime import datetime, date
+from datetime import date
+import asyncio
 from supabase import create_client
 from supabase.lib.client_options import ClientOptions
 import os
 import logging
+from typing import Dict, List, Optional
+
+from jwt_verify import token_verifier
+from usage_reservations import usage_reservations
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -58,61 +63,100 @@ PLAN_LIMITS = {
     }
 }
 
+# PLAN_LIMITS as sent to the charge_usage RPC (supabase/migrations); null means unlimited
+PLAN_LIMITS_PAYLOAD = {
+    plan: {
+        feature: {"limit": None if rule["limit"] == float('inf') else rule["limit"], "period": rule["period"]}
+        for feature, rule in features.items()
+    }
+    for plan, features in PLAN_LIMITS.items()
+}
+
+def authenticate_jwt(request: Request) -> str:
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
+    
+    jwt = auth_header.split(" ")[1]
+    user = token_verifier.authenticate(jwt, supabase)
+    return user.id
+
+async def get_authenticated_user_id(request: Request) -> str:
+    """Authenticates the request without charging any feature usage"""
+    try:
+        return authenticate_jwt(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Authentication error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def charge_usage_rpc(user_id: str, features: List[str], amount: int = 1) -> List[dict]:
+    """
+    Checks, resets the period of and increments each feature's usage in one
+    atomic database call. One row per feature: plan, used_count,
+    usage_limit (None if unlimited), period (None if not in the plan), charged.
+    Empty if the user does not exist.
+    """
+    result = supabase.rpc("charge_usage", {
+        "p_user_id": user_id,
+        "p_features": features,
+        "p_limits": PLAN_LIMITS_PAYLOAD,
+        "p_today": date.today().isoformat(),
+        "p_amount": amount
+    }).execute()
+    return result.data or []
+
+def flush_reserved_usage(user_id: str, feature: str, amount: int) -> bool:
+    """Writes uses counted against a write-behind reservation"""
+    rows = charge_usage_rpc(user_id, [feature], amount)
+    return bool(rows) and rows[0]["charged"]
+
+def charge_usage_batch(user_id: str, features: List[str]) -> Dict[str, Optional[HTTPException]]:
+    """
+    Checks and charges one use of each feature with a single atomic
+    database call, so concurrent requests cannot both take the last use.
+    Features with a live write-behind reservation are charged in-process.
+    Returns a map of feature -> None if charged, or the HTTPException
+    explaining why that feature was refused.
+    """
+    outcome: Dict[str, Optional[HTTPException]] = {}
+    remote = []
+    for feature in dict.fromkeys(features):
+        if usage_reservations is not None and usage_reservations.take(user_id, feature):
+            outcome[feature] = None
+        else:
+            remote.append(feature)
+    if not remote:
+        return outcome
+    
+    rows = charge_usage_rpc(user_id, remote)
+    if not rows:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    for row in rows:
+        feature, plan = row["feature"], row["plan"]
+        if row["period"] is None:
+            outcome[feature] = HTTPException(status_code=403, detail="Feature not available for your plan")
+        elif not row["charged"]:
+            outcome[feature] = HTTPException(
+                status_code=429,
+                detail=f"{feature} limit reached for your {plan} plan ({row['used_count']}/{row['usage_limit']} {row['period']}ly). Upgrade for more capacity."
+            )
+        else:
+            outcome[feature] = None
+            if row["usage_limit"] is None and usage_reservations is not None:
+                usage_reservations.grant(user_id, feature)
+    
+    return outcome
+
 def enforce_usage_limit(feature: str):
     async def limiter(request: Request):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
-        
-        jwt = auth_header.split(" ")[1]
-        
         try:
-            user = supabase.auth.get_user(jwt)
-            if not user:
-                raise HTTPException(status_code=401, detail="Invalid user")
-            
-            user_id = user.user.id
-            
-            user_data = supabase.from_("users").select("plan").eq("id", user_id).single().execute()
-            if not user_data.data:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            plan = user_data.data.get("plan", "free")
-            feature_limit = PLAN_LIMITS.get(plan, {}).get(feature, {})
-            
-            if not feature_limit:
-                raise HTTPException(status_code=403, detail="Feature not available for your plan")
-            
-            today = date.today()
-            usage_data = supabase.from_("usage_limits").select("*").eq("user_id", user_id).eq("feature", feature).maybe_single().execute()
-            
-            reset_date = today
-            if feature_limit["period"] == "month":
-                reset_date = date(today.year, today.month, 1)
-            
-            if not usage_data.data or (usage_data.data.get("reset_at") and date.fromisoformat(usage_data.data.get("reset_at")) < reset_date):
-                supabase.from_("usage_limits").upsert({
-                    "user_id": user_id,
-                    "feature": feature,
-                    "used_count": 0,
-                    "reset_at": reset_date.isoformat()
-                }).execute()
-                used_count = 0
-            else:
-                used_count = usage_data.data.get("used_count", 0)
-            
-            if used_count >= feature_limit["limit"] and feature_limit["limit"] != float('inf'):
-                raise HTTPException(
-                    status_code=429, 
-                    detail=f"{feature} limit reached for your {plan} plan ({used_count}/{feature_limit['limit']} {feature_limit['period']}ly). Upgrade for more capacity."
-                )
-            
-            supabase.from_("usage_limits").upsert({
-                "user_id": user_id,
-                "feature": feature,
-                "used_count": used_count + 1,
-                "reset_at": reset_date.isoformat()
-            }).execute()
+            user_id = authenticate_jwt(request)
+            refused = (await asyncio.to_thread(charge_usage_batch, user_id, [feature]))[feature]
+            if refused is not None:
+                raise refused
             
             return user_id
             
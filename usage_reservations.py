@@ -0,0 +1,135 @@
+import asyncio
+import os
+import threading
+import time
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- Write-Behind Configuration ---
+USAGE_WRITE_BEHIND = os.getenv("USAGE_WRITE_BEHIND", "0") == "1"
+USAGE_RESERVATION_BLOCK = int(os.getenv("USAGE_RESERVATION_BLOCK", "100"))
+# A reservation is trusted this long before the plan is checked again (downgrades, cancellations)
+USAGE_RESERVATION_SECONDS = float(os.getenv("USAGE_RESERVATION_SECONDS", "300"))
+USAGE_FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "30"))
+
+UsageKey = Tuple[str, str]  # (user ID, feature)
+# Writes an aggregated count for one user and feature; False if the database refused it
+FlushFn = Callable[[str, str, int], bool]
+
+
+class UsageReservations:
+    """
+    Write-behind counting for features a user's plan allows without limit.
+    Once the database has confirmed that, a block of uses is reserved
+    in-process: the next `block` charges within `ttl` seconds are granted
+    without a database call and only counted, and the counts are written
+    every `interval` seconds as one increment per user and feature. A spent
+    or stale block sends the next charge back to the database, which checks
+    the plan again.
+
+    Limited plans never go through here. Counts not yet written when the
+    process dies are lost, so unlimited usage may be slightly under-counted.
+    Charges arrive from worker threads, hence the lock.
+    """
+
+    def __init__(
+        self,
+        block: int = USAGE_RESERVATION_BLOCK,
+        ttl: float = USAGE_RESERVATION_SECONDS,
+        interval: float = USAGE_FLUSH_SECONDS
+    ):
+        self.block = block
+        self.ttl = ttl
+        self.interval = interval
+        self._lock = threading.Lock()
+        # key -> [uses left, monotonic expiry]
+        self._blocks: Dict[UsageKey, list] = {}
+        self._pending: Dict[UsageKey, int] = {}
+        self._flush_fn: Optional[FlushFn] = None
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"local_charges": 0, "grants": 0, "flushes": 0, "flushed_uses": 0, "flush_errors": 0}
+
+    def take(self, user_id: str, feature: str) -> bool:
+        """Charges one use against a live reservation; False if there is none"""
+        key = (user_id, feature)
+        with self._lock:
+            reservation = self._blocks.get(key)
+            if reservation is None:
+                return False
+            if reservation[0] <= 0 or reservation[1] <= time.monotonic():
+                del self._blocks[key]
+                return False
+            reservation[0] -= 1
+            self._pending[key] = self._pending.get(key, 0) + 1
+            self.counters["local_charges"] += 1
+            return True
+
+    def grant(self, user_id: str, feature: str) -> None:
+        """Reserves a block of uses after the database charged an unlimited feature"""
+        with self._lock:
+            self._blocks[(user_id, feature)] = [self.block, time.monotonic() + self.ttl]
+            self.counters["grants"] += 1
+
+    def revoke(self, user_id: str, feature: str) -> None:
+        with self._lock:
+            self._blocks.pop((user_id, feature), None)
+
+    def _drain(self) -> Dict[UsageKey, int]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            return pending
+
+    def _restore(self, key: UsageKey, amount: int) -> None:
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+
+    async def flush(self) -> None:
+        """Writes the uses counted since the last flush"""
+        if self._flush_fn is None:
+            return
+        for key, amount in self._drain().items():
+            try:
+                written = await asyncio.to_thread(self._flush_fn, *key, amount)
+            except Exception as e:
+                logger.error(f"Usage write-behind flush failed for {key}: {str(e)}")
+                self.counters["flush_errors"] += 1
+                self._restore(key, amount)
+                continue
+            self.counters["flushes"] += 1
+            if written:
+                self.counters["flushed_uses"] += amount
+            else:
+                # The plan is no longer unlimited: stop granting locally
+                logger.warning(f"Usage write-behind refused for {key}; dropping {amount} uses")
+                self.revoke(*key)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def start(self, flush_fn: FlushFn) -> None:
+        self._flush_fn = flush_fn
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stops the periodic flush and writes whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self.counters,
+                "reservations": len(self._blocks),
+                "pending_uses": sum(self._pending.values())
+            }
+
+
+usage_reservations = UsageReservations() if USAGE_WRITE_BEHIND else None
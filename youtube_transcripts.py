@@ -0,0 +1,275 @@
+import json
+import os
+import re
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from singleflight import SingleFlight
+from text_normalize import normalize_text
+from token_budget import count_tokens
+from transcript_cache import transcript_cache, DEFAULT_LANGUAGE
+from url_fetch import fetch_url
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# --- YouTube Transcript Configuration ---
+TRANSCRIPT_CHUNK_TOKENS = int(os.getenv("TRANSCRIPT_CHUNK_TOKENS", "3000"))
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v={video_id}"
+YOUTUBE_PAGE_MAX_BYTES = 8 * 1024 * 1024
+# Skips the EU cookie consent interstitial, which has no player data
+YOUTUBE_HEADERS = {"Accept-Language": "en-US,en;q=0.8", "Cookie": "CONSENT=YES+1"}
+
+VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+# Path prefixes that carry the video ID as the next segment
+VIDEO_PATH_PREFIXES = ("embed", "shorts", "live", "v", "e")
+PLAYER_RESPONSE_RE = re.compile(r"ytInitialPlayerResponse\s*=\s*")
+# Caption lines that are only a sound cue: "[Music]", "[Applause]", "(laughs)"
+SOUND_CUE_RE = re.compile(r"^\s*[\[(][^\])]*[\])]\s*$")
+_SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*$")
+
+# Transcript: {"video_id", "language", "title", "duration", "segments": [Segment, ...]}
+# Segment: {"start": seconds, "duration": seconds, "text": str}
+Transcript = Dict[str, Any]
+
+
+class TranscriptUnavailable(Exception):
+    """The video exists but has no captions (in the requested language), or cannot be played"""
+
+
+def extract_video_id(url: str) -> str:
+    """
+    The 11-character video ID from any common YouTube URL form (watch?v=,
+    youtu.be/, /embed/, /shorts/, /live/, m./music./nocookie hosts) or a
+    bare ID. Raises ValueError for anything else.
+    """
+    value = url.strip()
+    if VIDEO_ID_RE.match(value):
+        return value
+    if "://" not in value:
+        value = "https://" + value
+
+    parts = urlparse(value)
+    host = (parts.hostname or "").lower()
+    path = [segment for segment in parts.path.split("/") if segment]
+    candidate = None
+    if host in ("youtu.be", "www.youtu.be"):
+        candidate = path[0] if path else None
+    elif host == "youtube.com" or host.endswith((".youtube.com", "youtube-nocookie.com")):
+        candidate = parse_qs(parts.query).get("v", [None])[0]
+        if candidate is None and len(path) >= 2 and path[0] in VIDEO_PATH_PREFIXES:
+            candidate = path[1]
+    else:
+        raise ValueError(f"Not a YouTube URL: {url}")
+
+    if not candidate or not VIDEO_ID_RE.match(candidate):
+        raise ValueError(f"No video ID in YouTube URL: {url}")
+    return candidate
+
+
+class TranscriptFetcher(ABC):
+    """
+    Retrieves the captions of one video. Swap in another implementation
+    through the get_transcript_fetcher dependency (app.dependency_overrides)
+    to serve transcripts from elsewhere, e.g. a local stand-in in tests.
+    """
+
+    @abstractmethod
+    async def fetch(self, video_id: str, language: Optional[str] = None) -> Transcript:
+        """The video's transcript, in language if given; raises TranscriptUnavailable"""
+
+
+class YouTubePageFetcher(TranscriptFetcher):
+    """
+    Reads the caption track list from the watch page's player data and
+    downloads the chosen track in YouTube's json3 timed-text format, both
+    through the shared pooled fetch client. Manually written tracks win over
+    automatic speech recognition.
+    """
+
+    async def fetch(self, video_id: str, language: Optional[str] = None) -> Transcript:
+        page = await fetch_url(
+            YOUTUBE_WATCH_URL.format(video_id=video_id),
+            allowed_types=frozenset({"text/html"}),
+            max_bytes=YOUTUBE_PAGE_MAX_BYTES,
+            headers=YOUTUBE_HEADERS
+        )
+        player = self._player_response(page.body.decode(page.charset or "utf-8", errors="replace"))
+
+        status = player.get("playabilityStatus", {})
+        if status.get("status") not in (None, "OK"):
+            raise TranscriptUnavailable(status.get("reason") or "Video is unavailable")
+        tracks = (
+            player.get("captions", {})
+            .get("playerCaptionsTracklistRenderer", {})
+            .get("captionTracks", [])
+        )
+        if not tracks:
+            raise TranscriptUnavailable("This video has no captions")
+        track = self._choose_track(tracks, language or self._default_language(player, tracks))
+
+        timed_text = await fetch_url(track["baseUrl"] + "&fmt=json3", headers=YOUTUBE_HEADERS)
+        try:
+            events = json.loads(timed_text.body)
+        except ValueError:
+            # YouTube answers with an empty body when it wants a proof-of-origin token
+            raise TranscriptUnavailable("YouTube did not return the caption track")
+        details = player.get("videoDetails", {})
+        return {
+            "video_id": video_id,
+            "language": track.get("languageCode", language or ""),
+            "title": details.get("title"),
+            "duration": float(details.get("lengthSeconds") or 0) or None,
+            "segments": self._segments(events)
+        }
+
+    @staticmethod
+    def _player_response(page: str) -> Dict[str, Any]:
+        match = PLAYER_RESPONSE_RE.search(page)
+        if match is None:
+            raise TranscriptUnavailable("Could not read the video page")
+        try:
+            player, _ = json.JSONDecoder().raw_decode(page, match.end())
+        except ValueError:
+            raise TranscriptUnavailable("Could not read the video page")
+        return player
+
+    @staticmethod
+    def _default_language(player: Dict[str, Any], tracks: List[Dict[str, Any]]) -> Optional[str]:
+        """The video's default caption track, else the spoken language (that of the ASR track)"""
+        renderer = player.get("captions", {}).get("playerCaptionsTracklistRenderer", {})
+        audio_tracks = renderer.get("audioTracks") or []
+        if audio_tracks:
+            audio = audio_tracks[min(renderer.get("defaultAudioTrackIndex", 0), len(audio_tracks) - 1)]
+            index = audio.get("defaultCaptionTrackIndex")
+            if isinstance(index, int) and 0 <= index < len(tracks):
+                return tracks[index].get("languageCode")
+        for track in tracks:
+            if track.get("kind") == "asr":
+                return track.get("languageCode")
+        return None
+
+    @staticmethod
+    def _choose_track(tracks: List[Dict[str, Any]], language: Optional[str]) -> Dict[str, Any]:
+        # Manual tracks first; within each kind keep YouTube's order
+        ordered = sorted(tracks, key=lambda track: track.get("kind") == "asr")
+        if not language:
+            return ordered[0]
+        wanted = language.lower()
+        for track in ordered:
+            code = track.get("languageCode", "").lower()
+            if code == wanted or code.split("-")[0] == wanted.split("-")[0]:
+                return track
+        available = ", ".join(sorted({track.get("languageCode", "?") for track in tracks}))
+        raise TranscriptUnavailable(f"No '{language}' captions for this video (available: {available})")
+
+    @staticmethod
+    def _segments(timed_text: Dict[str, Any]) -> List[Dict[str, Any]]:
+        segments = []
+        for event in timed_text.get("events", []):
+            text = "".join(seg.get("utf8", "") for seg in event.get("segs") or [])
+            text = " ".join(text.split())
+            if not text or SOUND_CUE_RE.match(text):
+                continue
+            segments.append({
+                "start": event.get("tStartMs", 0) / 1000,
+                "duration": event.get("dDurationMs", 0) / 1000,
+                "text": text
+            })
+        return segments
+
+
+transcript_fetcher = YouTubePageFetcher()
+transcript_singleflight = SingleFlight()
+
+
+def get_transcript_fetcher() -> TranscriptFetcher:
+    """FastAPI dependency for the transcript source; override it to plug in another fetcher"""
+    return transcript_fetcher
+
+
+async def _fetch_and_cache(video_id: str, language: Optional[str], fetcher: TranscriptFetcher) -> Transcript:
+    transcript = await fetcher.fetch(video_id, language)
+    transcript["segments"] = [
+        {**segment, "text": normalize_text(segment["text"])} for segment in transcript["segments"]
+    ]
+    if transcript_cache is not None and transcript["segments"]:
+        await transcript_cache.set(video_id, language or DEFAULT_LANGUAGE, transcript)
+        # A default-language fetch also answers later requests for that language by name
+        if not language and transcript.get("language"):
+            await transcript_cache.set(video_id, transcript["language"], transcript)
+    return transcript
+
+
+async def get_transcript(
+    video_id: str,
+    language: Optional[str] = None,
+    fetcher: Optional[TranscriptFetcher] = None
+) -> Transcript:
+    """
+    The transcript of a video, from the cache when it has been fetched
+    before. Concurrent requests for the same video and language share one
+    fetch.
+    """
+    language = (language or "").strip() or None
+    if transcript_cache is not None:
+        cached = await transcript_cache.get(video_id, language or DEFAULT_LANGUAGE)
+        if cached is not None:
+            return cached
+
+    fetcher = fetcher or transcript_fetcher
+    key = f"{video_id}:{language or DEFAULT_LANGUAGE}"
+    return await transcript_singleflight.do(key, lambda: _fetch_and_cache(video_id, language, fetcher))
+
+
+def transcript_text(transcript: Transcript) -> str:
+    return " ".join(segment["text"] for segment in transcript["segments"] if segment["text"])
+
+
+def chunk_segments(
+    segments: List[Dict[str, Any]],
+    max_tokens: int = TRANSCRIPT_CHUNK_TOKENS
+) -> List[Dict[str, Any]]:
+    """
+    Groups consecutive caption segments into chunks of at most max_tokens
+    for map-reduce summarization, each with the time span it covers. A chunk
+    closes early on a sentence end once it is half full, so chunks of
+    punctuated captions do not stop mid-sentence.
+    """
+    chunks: List[Dict[str, Any]] = []
+    current: List[Dict[str, Any]] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        last = current[-1]
+        chunks.append({
+            "start": current[0]["start"],
+            "end": last["start"] + last["duration"],
+            "text": " ".join(segment["text"] for segment in current)
+        })
+        current, current_tokens = [], 0
+
+    for segment in segments:
+        if not segment["text"]:
+            continue
+        size = count_tokens(segment["text"], calibrated=False)
+        if current and current_tokens + size > max_tokens:
+            flush()
+        current.append(segment)
+        current_tokens += size
+        if current_tokens >= max_tokens // 2 and _SENTENCE_END_RE.search(segment["text"]):
+            flush()
+
+    if current:
+        flush()
+    return chunks
+
+
+def youtube_stats() -> Dict[str, Any]:
+    return {
+        "cache": transcript_cache.stats() if transcript_cache is not None else "disabled",
+        "singleflight": transcript_singleflight.stats()
+    }